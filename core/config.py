@@ -20,3 +20,72 @@ CAMERA_INDEX = 0
 
 # crop
 CROP_PADDING = 20
+
+# OCR cache (detect + recognize) trên đĩa — bật bằng --ocr-cache
+OCR_CACHE_DIR = '~/.cache/medicineapp/ocr'
+OCR_CACHE_MAX_MB = 512
+
+# CPU thread budget cho torch / Paddle / OpenCV (core/shared/thread_budget.py).
+# None = chia đều os.cpu_count() cho số worker trên cùng máy.
+# Ghi đè bằng env MEDICINEAPP_THREADS / MEDICINEAPP_WORKERS.
+CPU_THREADS = None
+CPU_WORKERS = 1
+
+# Profile Paddle trên CPU (detector + orientation): 'default' | 'cpu_onednn'
+# (xem core/phase_a/s3_ocr/det_profiles.py — có self-test, lệch thì tự lùi)
+PADDLE_CPU_PROFILE = 'default'
+
+# Detect ở độ phân giải chọn theo chiều cao dòng chữ (det_scale.py).
+# Hữu ích cho ảnh lớn từ API (không qua MAX_DIM như run_pipeline.py).
+OCR_ADAPTIVE_DET = False
+
+# Scan rất lớn (cạnh dài > TILE_TRIGGER_SIDE) → detect theo tile chồng lấn
+# rồi ghép polygon (det_tiles.py); bộ nhớ không tăng theo kích thước ảnh.
+OCR_TILED_DET = False
+
+# Gộp polygon PaddleOCR tách rời trên cùng dòng, trong cùng cột, trước VietOCR
+# (line_merge.py) → ít lượt recognize hơn, group_by_stt ít phải ghép lại.
+OCR_MERGE_FRAGMENTS = False
+
+# Index DrugLookup dựng sẵn (mmap, core/phase_a/s6_drug_search/drug_index.py): tự dựng
+# lại khi checksum drug_db_vn_full.json đổi. None = parse JSON mỗi lần khởi động.
+DRUG_INDEX_PATH = '~/.cache/medicineapp/drug_index.bin'
+
+# DrugLookup: số key rapidfuzz chấm / query, chọn theo trigram chung
+# (core/phase_a/s6_drug_search/ngram_index.py). 0 = chấm toàn bộ key.
+DRUG_NGRAM_SHORTLIST = 300
+
+# Checkpoint NER: PhoBERT fine-tune (scripts/train_ner.py) hoặc student ít layer
+# distill từ nó (scripts/distill_ner.py → 'models/phobert_ner_student')
+NER_MODEL_PATH = 'models/phobert_ner_model'
+
+# NER: cache từ → subword ids PhoBERT dùng chung giữa các request (0 = tắt)
+NER_SUBWORD_CACHE_SIZE = 50000
+
+# Tách từ tiếng Việt (core/phase_a/s5_classify/segmenter.py): LRU theo dòng;
+# từ điển longest-match (scripts/build_segmenter_dict.py) chỉ dùng khi độ
+# khớp với underthesea trên tập validation ≥ SEGMENT_DICT_MIN_AGREEMENT.
+SEGMENT_CACHE_SIZE = 20000
+SEGMENT_DICT_PATH = 'models/segmenter_dict.json'
+SEGMENT_DICT_MIN_AGREEMENT = 0.98
+
+# NER memo: dòng nội dung → (drug_name, instruction, conf), tự bỏ khi đổi
+# checkpoint. NER_MEMO_PATH = file JSON để giữ memo qua các lần chạy (None = RAM).
+NER_MEMO_SIZE = 20000
+NER_MEMO_PATH = None
+
+# Backend PhoBERT NER: 'fp32' | 'int8' | 'onnx' (core/phase_a/s5_classify/ner_backends.py;
+# độ khớp + latency: scripts/benchmark_ner_backends.py)
+NER_BACKEND = 'fp32'
+# Nơi export ONNX khi thư mục checkpoint chỉ đọc (mặc định: <model_path>/onnx/)
+NER_ONNX_CACHE_DIR = '~/.cache/medicineapp/ner_onnx'
+
+# Gazetteer tên thuốc (Aho-Corasick trên catalog DrugLookup, bỏ dấu): dòng khớp
+# đúng 1 tên catalog (cả dấu) → lấy tên thuốc thẳng, không chạy PhoBERT
+# (core/phase_a/s5_classify/gazetteer.py)
+NER_GAZETTEER = False
+
+# Triage trước NER: header, ô số lượng / đơn vị, dòng hướng dẫn → "other" không
+# chạy PhoBERT (core/phase_a/s5_classify/triage.py; tỉ lệ bỏ qua + nhãn DRUG
+# bị mất trên tập test: scripts/report_ner_triage.py)
+NER_TRIAGE = False
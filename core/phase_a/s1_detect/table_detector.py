@@ -0,0 +1,83 @@
+"""
+table_detector.py — YOLO thứ 2 tìm vùng BẢNG THUỐC trong đơn (OCR ROI).
+
+Header (tên bệnh viện, thông tin bệnh nhân) và footer (lời dặn, chữ ký)
+chiếm phần lớn text lines nhưng không bao giờ chứa tên thuốc. Chạy
+Paddle detect + VietOCR chỉ trên bảng thuốc giảm mạnh số dòng cần nhận dạng.
+
+Nếu không có weights (TABLE_YOLO_WEIGHTS) hoặc không detect được bảng,
+caller fallback về OCR toàn ảnh.
+"""
+
+import logging
+import os
+from typing import Optional, Tuple
+
+import numpy as np
+
+from core.config import TABLE_CONF_THRESHOLD, TABLE_YOLO_WEIGHTS
+
+logger = logging.getLogger(__name__)
+
+# Padding quanh bảng (px) — giữ STT/số lượng sát mép bảng
+TABLE_ROI_PADDING = 20
+# ROI nhỏ hơn tỉ lệ này so với ảnh → coi như detect sai, dùng full ảnh
+MIN_ROI_AREA_RATIO = 0.05
+
+
+class TableRegionDetector:
+    def __init__(
+        self,
+        model_path: str = TABLE_YOLO_WEIGHTS,
+        conf: float = TABLE_CONF_THRESHOLD,
+        padding: int = TABLE_ROI_PADDING,
+    ) -> None:
+        """
+        Load YOLO table-region model.
+        Args:
+            model_path: Path to the table .pt weight file.
+            conf: Confidence threshold.
+            padding: Pixels added around the detected table.
+        """
+        from ultralytics import YOLO
+
+        self.model = YOLO(model_path)
+        self.conf = conf
+        self.padding = padding
+
+    @staticmethod
+    def weights_available(model_path: str = TABLE_YOLO_WEIGHTS) -> bool:
+        return bool(model_path) and os.path.isfile(model_path)
+
+    def locate(self, image: np.ndarray) -> Optional[Tuple[int, int, int, int]]:
+        """
+        Tìm bảng thuốc (box có confidence cao nhất).
+        Args:
+            image: Ảnh BGR sau preprocess.
+        Returns:
+            (x1, y1, x2, y2) đã cộng padding + clip, hoặc None.
+        """
+        results = self.model.predict(source=image, conf=self.conf, verbose=False)
+        if not results or results[0].boxes is None or len(results[0].boxes) == 0:
+            return None
+
+        boxes = results[0].boxes
+        best = int(boxes.conf.argmax())
+        x1, y1, x2, y2 = [float(v) for v in boxes.xyxy[best].tolist()]
+        return expand_roi((x1, y1, x2, y2), image.shape, self.padding)
+
+
+def expand_roi(box, image_shape, padding: int = TABLE_ROI_PADDING):
+    """Cộng padding, clip vào ảnh; trả None nếu ROI quá nhỏ."""
+    h, w = image_shape[:2]
+    x1, y1, x2, y2 = box
+    x1 = max(0, int(x1) - padding)
+    y1 = max(0, int(y1) - padding)
+    x2 = min(w, int(round(x2)) + padding)
+    y2 = min(h, int(round(y2)) + padding)
+    if x2 <= x1 or y2 <= y1:
+        return None
+    if (x2 - x1) * (y2 - y1) < MIN_ROI_AREA_RATIO * w * h:
+        logger.debug(f"Table ROI quá nhỏ ({x1},{y1},{x2},{y2}) → bỏ qua")
+        return None
+    return x1, y1, x2, y2
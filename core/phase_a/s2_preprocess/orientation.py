@@ -40,7 +40,8 @@ def _get_classifier(model_path: Optional[str] = None):
     if PADDLE_AVAILABLE is None:
         os.environ.setdefault("FLAGS_enable_pir_api", "0")
         try:
-            from paddleocr import DocImgOrientationClassification
+            # Probe: import thật (không chỉ find_spec) để bắt cả bản cài lỗi
+            from paddleocr import DocImgOrientationClassification  # noqa: F401
             PADDLE_AVAILABLE = True
         except Exception as e:
             PADDLE_AVAILABLE = False
@@ -50,8 +51,7 @@ def _get_classifier(model_path: Optional[str] = None):
     if not PADDLE_AVAILABLE:
         return None
     import paddle
-    from paddleocr import DocImgOrientationClassification
-    
+
     # Cỗ máy ưu tiên GPU: Thiết lập thiết bị ở mức hệ thống
     try:
         # Kiểm tra xem có thể dùng GPU không
@@ -61,31 +61,65 @@ def _get_classifier(model_path: Optional[str] = None):
         else:
             paddle.set_device('cpu')
             device_status = "CPU (No CUDA)"
-        
-        if model_path and os.path.exists(model_path):
-            _classifier_cache = DocImgOrientationClassification(
-                model_dir=model_path
-            )
-        else:
-            _classifier_cache = DocImgOrientationClassification(
-                model_name="PP-LCNet_x1_0_doc_ori"
-            )
+
+        _classifier_cache = _make_classifier(model_path)
         logger.info(f"Mô hình AI: PP-LCNet — Đã nạp thành công [{device_status}]")
     except Exception as e:
         logger.warning(f"Device load lỗi ({e}), lùi về [CPU] mặc định...")
         paddle.set_device('cpu')
-        if model_path and os.path.exists(model_path):
-            _classifier_cache = DocImgOrientationClassification(
-                model_dir=model_path
-            )
-        else:
-            _classifier_cache = DocImgOrientationClassification(
-                model_name="PP-LCNet_x1_0_doc_ori"
-            )
+        device_status = "CPU"
+        _classifier_cache = _make_classifier(model_path)
 
+    if device_status.startswith("CPU"):
+        _classifier_cache = _maybe_onednn(_classifier_cache, model_path)
     return _classifier_cache
 
 
+def _make_classifier(model_path: Optional[str] = None, enable_mkldnn: bool = False):
+    from paddleocr import DocImgOrientationClassification
+
+    kwargs = {"enable_mkldnn": True} if enable_mkldnn else {}
+    if model_path and os.path.exists(model_path):
+        return DocImgOrientationClassification(model_dir=model_path, **kwargs)
+    return DocImgOrientationClassification(model_name="PP-LCNet_x1_0_doc_ori", **kwargs)
+
+
+def _top_label(classifier, image: np.ndarray) -> Tuple[str, float]:
+    res = classifier.predict(image)[0]
+    if isinstance(res, dict):
+        return str(res["label_names"][0]), float(res["scores"][0])
+    return str(res.label_names[0]), float(res.scores[0])
+
+
+def _maybe_onednn(plain, model_path: Optional[str] = None):
+    """
+    PADDLE_CPU_PROFILE='cpu_onednn' → classifier bật oneDNN, nếu self-test
+    (nhãn + điểm trên trang mẫu xoay 0°/180°) khớp bản thường; lệch thì giữ plain.
+    """
+    from core.config import PADDLE_CPU_PROFILE
+    from core.phase_a.s3_ocr.det_profiles import resolve_det_profile, selftest_image
+
+    if not resolve_det_profile(PADDLE_CPU_PROFILE)["mkldnn"]:
+        return plain
+    try:
+        fast = _make_classifier(model_path, enable_mkldnn=True)
+        page = cv2.resize(selftest_image(), (600, 800), interpolation=cv2.INTER_AREA)
+        for img in (page, cv2.rotate(page, cv2.ROTATE_180)):
+            ref_label, ref_score = _top_label(plain, img)
+            label, score = _top_label(fast, img)
+            if label != ref_label or abs(score - ref_score) > 0.02:
+                logger.warning(
+                    f"Orientation oneDNN self-test lệch ({label}/{score:.3f} vs "
+                    f"{ref_label}/{ref_score:.3f}) → giữ bản thường"
+                )
+                return plain
+    except Exception as e:
+        logger.warning(f"Orientation oneDNN không dùng được ({e}) → giữ bản thường")
+        return plain
+    logger.info("Orientation classifier: oneDNN (self-test passed)")
+    return fast
+
+
 def force_portrait(
     image: np.ndarray,
     save_path: Optional[str] = None,
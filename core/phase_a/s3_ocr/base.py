@@ -7,33 +7,162 @@ OCR Engine: ocr_engine.py (PaddleOCR detect + VietOCR recognize)
 import json
 import os
 from abc import ABC, abstractmethod
-from dataclasses import dataclass, field
 from typing import List, Optional
 
 import cv2
 import numpy as np
 
 
-@dataclass
 class TextBlock:
-    """Một dòng/vùng text đã được nhận diện."""
-    text: str              # Nội dung text, ví dụ: "Paracetamol 500mg"
-    confidence: float      # Độ tin cậy 0.0-1.0
-    bbox: list             # [[x1,y1],[x2,y1],[x2,y2],[x1,y2]] — 4 góc vùng text
+    """Một dòng/vùng text đã được nhận diện (__slots__, không có __dict__)."""
+
+    __slots__ = ("text", "confidence", "bbox")
+
+    def __init__(self, text: str, confidence: float, bbox: list):
+        self.text = text              # Nội dung text, ví dụ: "Paracetamol 500mg"
+        self.confidence = confidence  # Độ tin cậy 0.0-1.0
+        self.bbox = bbox              # [[x1,y1],[x2,y1],[x2,y2],[x1,y2]] — 4 góc vùng text
+
+    def __repr__(self):
+        return (
+            f"TextBlock(text={self.text!r}, confidence={self.confidence!r}, "
+            f"bbox={self.bbox!r})"
+        )
+
+    def __eq__(self, other):
+        if other.__class__ is not self.__class__:
+            return NotImplemented
+        return (self.text, self.confidence, self.bbox) == (
+            other.text,
+            other.confidence,
+            other.bbox,
+        )
+
+    __hash__ = None
+
+
+def _quad_boxes(bboxes: list) -> np.ndarray:
+    """List bbox → (N, 4, 2) int32; polygon khác 4 điểm → boundingRect."""
+    if not bboxes:
+        return np.zeros((0, 4, 2), dtype=np.int32)
+    try:
+        arr = np.asarray(bboxes, dtype=np.float64)
+    except ValueError:
+        arr = None
+    if arr is None or arr.shape[1:] != (4, 2):
+        quads = []
+        for bbox in bboxes:
+            pts = np.asarray(bbox, dtype=np.float64).reshape(-1, 2)
+            (x1, y1), (x2, y2) = pts.min(axis=0), pts.max(axis=0)
+            quads.append([[x1, y1], [x2, y1], [x2, y2], [x1, y2]])
+        arr = np.asarray(quads, dtype=np.float64)
+    return np.rint(arr).astype(np.int32)
 
 
-@dataclass
 class OcrResult:
-    """Kết quả OCR toàn bộ ảnh."""
-    text_blocks: List[TextBlock] = field(default_factory=list)
-    raw_text: str = ""             # Toàn bộ text nối lại thành chuỗi
-    module_name: str = ""          # "paddle" hoặc "hybrid"
-    input_type: str = ""           # "bbox" hoặc "mask"
-    elapsed_ms: float = 0.0        # Thời gian xử lý (milliseconds)
+    """
+    Kết quả OCR toàn bộ ảnh, lưu theo cột.
+
+    Cột:
+        boxes:        (N, 4, 2) int32 — 4 góc mỗi vùng text
+        texts:        list[str] (N)
+        confidences:  (N,) float64
+    `text_blocks` (list[TextBlock]) và `raw_text` được tạo lazy từ các cột
+    để tương thích code cũ. Coi như bất biến sau khi tạo.
+    """
+
+    __slots__ = (
+        "boxes",
+        "texts",
+        "confidences",
+        "module_name",
+        "input_type",
+        "elapsed_ms",
+        "pruned_polys",
+        "_blocks",
+        "_raw_text",
+    )
+
+    def __init__(
+        self,
+        text_blocks: Optional[List[TextBlock]] = None,
+        raw_text: str = "",
+        module_name: str = "",         # "paddle" hoặc "hybrid"
+        input_type: str = "",          # "bbox" hoặc "mask"
+        elapsed_ms: float = 0.0,       # Thời gian xử lý (milliseconds)
+        pruned_polys: Optional[list] = None,
+        *,
+        boxes=None,
+        texts: Optional[List[str]] = None,
+        confidences=None,
+    ):
+        if text_blocks:
+            self._blocks = list(text_blocks)
+            boxes = _quad_boxes([b.bbox for b in self._blocks])
+            texts = [b.text for b in self._blocks]
+            confidences = [b.confidence for b in self._blocks]
+        else:
+            self._blocks = None
+        self.texts = list(texts or [])
+        if boxes is None:
+            boxes = np.zeros((len(self.texts), 4, 2), dtype=np.int32)
+        self.boxes = np.asarray(boxes, dtype=np.int32).reshape(-1, 4, 2)
+        if confidences is None:
+            confidences = np.ones(len(self.texts))
+        self.confidences = np.asarray(confidences, dtype=np.float64).reshape(-1)
+        if not (len(self.boxes) == len(self.texts) == len(self.confidences)):
+            raise ValueError(
+                f"OcrResult columns differ in length: boxes={len(self.boxes)}, "
+                f"texts={len(self.texts)}, confidences={len(self.confidences)}"
+            )
+        self.module_name = module_name
+        self.input_type = input_type
+        self.elapsed_ms = elapsed_ms
+        # Polygon bị line pruning bỏ qua (chưa nhận dạng) — xem
+        # HybridOcrModule.recognize_pruned()
+        self.pruned_polys = list(pruned_polys or [])
+        self._raw_text = raw_text or None
+
+    def __len__(self):
+        return len(self.texts)
+
+    def __repr__(self):
+        return (
+            f"OcrResult(blocks={len(self)}, module_name={self.module_name!r}, "
+            f"input_type={self.input_type!r}, elapsed_ms={self.elapsed_ms!r})"
+        )
+
+    @property
+    def text_blocks(self) -> List[TextBlock]:
+        """List TextBlock (tạo 1 lần, cache) — chỉ dùng cho code cần object."""
+        if self._blocks is None:
+            self._blocks = [
+                TextBlock(text, conf, box)
+                for text, conf, box in zip(
+                    self.texts, self.confidences.tolist(), self.boxes.tolist()
+                )
+            ]
+        return self._blocks
 
-    def __post_init__(self):
-        if not self.raw_text and self.text_blocks:
-            self.raw_text = "\n".join(b.text for b in self.text_blocks)
+    @property
+    def raw_text(self) -> str:
+        """Toàn bộ text nối lại thành chuỗi (lazy)."""
+        if self._raw_text is None:
+            self._raw_text = "\n".join(self.texts)
+        return self._raw_text
+
+    def rects(self) -> np.ndarray:
+        """(N, 4) int32 [x1, y1, x2, y2] — axis-aligned bbox mỗi vùng text."""
+        return np.concatenate([self.boxes.min(axis=1), self.boxes.max(axis=1)], axis=1)
+
+    def to_dicts(self) -> List[dict]:
+        """[{"text", "confidence", "bbox"}] cho JSON — confidence làm tròn 4 số."""
+        return [
+            {"text": text, "confidence": round(conf, 4), "bbox": box}
+            for text, conf, box in zip(
+                self.texts, self.confidences.tolist(), self.boxes.tolist()
+            )
+        ]
 
 
 class BaseOCR(ABC):
@@ -44,6 +173,10 @@ class BaseOCR(ABC):
         """Nhận diện text từ ảnh. Trả về OcrResult."""
         ...
 
+    def extract_many(self, images: list) -> list:
+        """Nhiều ảnh → list OcrResult. Mặc định gọi extract() từng ảnh."""
+        return [self.extract(image) for image in images]
+
     def save_results(
         self,
         result: OcrResult,
@@ -100,15 +233,15 @@ class BaseOCR(ABC):
             font = ImageFont.load_default()
 
         # Vẽ từng block
-        for block in result.text_blocks:
-            if block.bbox:
+        for text, bbox in zip(result.texts, result.boxes.tolist()):
+            if bbox:
                 # Vẽ khung viền bbox màu xanh mạ tươi (0, 255, 100) cho nổi bật trên tài liệu
-                flat_pts = [tuple(p) for p in block.bbox]
+                flat_pts = [tuple(p) for p in bbox]
                 draw.polygon(flat_pts, outline=(0, 255, 100), width=3)
                 
                 # Hiển thị toàn bộ chuỗi text được đọc ra (không cắt bớt)
-                label = f"{block.text}"
-                x, y = block.bbox[0]
+                label = f"{text}"
+                x, y = bbox[0]
                 
                 # Lấy kích thước đoạn text
                 try:
@@ -137,25 +270,18 @@ class BaseOCR(ABC):
         # --- 2. Raw text file ---
         with open(os.path.join(txt_dir, f"{stem}.txt"), "w", encoding="utf-8") as f:
             f.write(f"# Module: {result.module_name} | Input: {result.input_type}\n")
-            f.write(f"# Time: {result.elapsed_ms:.1f}ms | Blocks: {len(result.text_blocks)}\n")
+            f.write(f"# Time: {result.elapsed_ms:.1f}ms | Blocks: {len(result)}\n")
             f.write("-" * 40 + "\n")
-            for block in result.text_blocks:
-                f.write(f"{block.text}\n")
+            for text in result.texts:
+                f.write(f"{text}\n")
 
         # --- 3. JSON file ---
         data = {
             "module": result.module_name,
             "input_type": result.input_type,
             "elapsed_ms": result.elapsed_ms,
-            "block_count": len(result.text_blocks),
-            "blocks": [
-                {
-                    "text": b.text,
-                    "confidence": round(b.confidence, 4),
-                    "bbox": b.bbox
-                }
-                for b in result.text_blocks
-            ]
+            "block_count": len(result),
+            "blocks": result.to_dicts(),
         }
         with open(os.path.join(json_dir, f"{stem}.json"), "w", encoding="utf-8") as f:
             json.dump(data, f, ensure_ascii=False, indent=2)
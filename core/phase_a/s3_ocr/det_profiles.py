@@ -0,0 +1,190 @@
+"""
+det_profiles.py — Detector profiles cho PaddleOCR trên node CPU.
+
+Profiles (chọn qua `HybridOcrModule(det_profile=...)` hoặc PADDLE_CPU_PROFILE):
+    default     enable_mkldnn=False, kích thước input theo ảnh (giống trước đây)
+    cpu_onednn  oneDNN (mkldnn) + input cố định: ảnh được thu về cạnh dài
+                pin_side rồi pad thành canvas vuông pin_side × pin_side →
+                mọi ảnh cùng shape, primitive oneDNN compile 1 lần và được
+                tái sử dụng (mkldnn_cache_capacity).
+
+cpu_onednn chỉ áp dụng trên CPU. Khi load, self-test chạy cả 2 đường trên
+1 trang chữ render sẵn: polygon lệch nhau (IoU / số lượng) → tự lùi về
+default, có log cảnh báo. Detector đã load được cache theo process
+(load_detector), các HybridOcrModule dùng chung.
+"""
+
+import logging
+import threading
+
+import cv2
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+DETECTOR_PROFILES = {
+    "default": {"mkldnn": False, "pin_side": None},
+    "cpu_onednn": {"mkldnn": True, "pin_side": 960, "mkldnn_cache_capacity": 10},
+}
+
+# Self-test: polygon của đường nhanh phải khớp đường thường
+SELFTEST_MIN_IOU = 0.85
+SELFTEST_MAX_MISMATCH = 0.05
+
+_lock = threading.Lock()
+_detectors = {}  # (det_model, device, profile, cpu_threads) → (engine, profile)
+
+
+def resolve_det_profile(name: str) -> dict:
+    """Trả về cấu hình profile, ValueError nếu tên không hợp lệ."""
+    if name not in DETECTOR_PROFILES:
+        raise ValueError(
+            f"det_profile must be one of {tuple(DETECTOR_PROFILES)}, got {name!r}"
+        )
+    return dict(DETECTOR_PROFILES[name], name=name)
+
+
+def pin_input(image: np.ndarray, side: int):
+    """Thu ảnh về cạnh dài = side (không phóng to), pad trắng thành side × side."""
+    h, w = image.shape[:2]
+    scale = min(1.0, side / max(h, w))
+    if scale < 1.0:
+        image = cv2.resize(
+            image, (max(1, round(w * scale)), max(1, round(h * scale))),
+            interpolation=cv2.INTER_AREA,
+        )
+    canvas = np.full((side, side) + image.shape[2:], 255, dtype=image.dtype)
+    canvas[: image.shape[0], : image.shape[1]] = image
+    return canvas, scale
+
+
+def unpin_polys(polys: list, scale: float) -> list:
+    """Polygon trên ảnh đã scale → toạ độ ảnh gốc."""
+    if scale == 1.0:
+        return polys
+    return [[[int(round(x / scale)), int(round(y / scale))] for x, y in poly] for poly in polys]
+
+
+def parse_polys(results) -> list:
+    """Output TextDetection (list dict có 'dt_polys') → list polygon [[x, y], ...]."""
+    polys = []
+    for r in results:
+        for poly in r.get("dt_polys", []):
+            p = poly.tolist() if hasattr(poly, "tolist") else poly
+            polys.append([[int(pt[0]), int(pt[1])] for pt in p])
+    return polys
+
+
+def detect(engine, image: np.ndarray, profile: dict) -> list:
+    """Detect 1 ảnh theo profile (có pin input nếu profile yêu cầu)."""
+    side = profile.get("pin_side")
+    if not side:
+        return parse_polys(engine.predict(image))
+    canvas, scale = pin_input(image, side)
+    return unpin_polys(parse_polys(engine.predict(canvas)), scale)
+
+
+def _rect(poly):
+    pts = np.asarray(poly)
+    return pts[:, 0].min(), pts[:, 1].min(), pts[:, 0].max(), pts[:, 1].max()
+
+
+def polys_agree(
+    ref: list,
+    test: list,
+    min_iou: float = SELFTEST_MIN_IOU,
+    max_mismatch: float = SELFTEST_MAX_MISMATCH,
+) -> bool:
+    """True nếu gần như mọi polygon của ref có polygon test khớp (IoU bbox)."""
+    if not ref and not test:
+        return True
+    if abs(len(ref) - len(test)) > max(1, max_mismatch * len(ref)):
+        return False
+    if not test:
+        return False
+    a = np.array([_rect(p) for p in ref], dtype=np.float64)
+    b = np.array([_rect(p) for p in test], dtype=np.float64)
+    ix = np.clip(np.minimum(a[:, None, 2], b[None, :, 2]) - np.maximum(a[:, None, 0], b[None, :, 0]), 0, None)
+    iy = np.clip(np.minimum(a[:, None, 3], b[None, :, 3]) - np.maximum(a[:, None, 1], b[None, :, 1]), 0, None)
+    inter = ix * iy
+    area_a = (a[:, 2] - a[:, 0]) * (a[:, 3] - a[:, 1])
+    area_b = (b[:, 2] - b[:, 0]) * (b[:, 3] - b[:, 1])
+    iou = inter / np.maximum(area_a[:, None] + area_b[None, :] - inter, 1e-9)
+    unmatched = int((iou.max(axis=1) < min_iou).sum())
+    return unmatched <= max_mismatch * len(ref)
+
+
+def selftest_image() -> np.ndarray:
+    """Trang đơn thuốc render (deterministic) cho self-test."""
+    page = np.full((1600, 1200, 3), 255, np.uint8)
+    lines = [
+        "BENH VIEN DA KHOA TINH", "DON THUOC", "Ho ten: Nguyen Van A   Tuoi: 45",
+        "1  Paracetamol 500mg          20 Vien", "   Ngay uong 2 lan, moi lan 1 vien",
+        "2  Amoxicillin 250mg          14 Vien", "   Ngay uong 2 lan sau an",
+        "3  Omeprazol 20mg             7 Vien", "   Uong truoc an sang 30 phut",
+        "Loi dan: tai kham sau 7 ngay", "Bac si dieu tri",
+    ]
+    for i, text in enumerate(lines):
+        cv2.putText(page, text, (80, 120 + i * 110), cv2.FONT_HERSHEY_SIMPLEX, 1.2, (30, 30, 30), 2)
+    return page
+
+
+def build_detector(det_model: str, device: str, profile: dict, cpu_threads=None):
+    """Tạo PaddleOCR (chỉ detection) theo profile."""
+    from paddleocr import PaddleOCR
+
+    kwargs = dict(
+        text_detection_model_name=det_model,
+        use_doc_orientation_classify=False,
+        use_doc_unwarping=False,
+        use_textline_orientation=False,
+        device=device,
+        enable_mkldnn=bool(profile["mkldnn"]),
+    )
+    if profile["mkldnn"]:
+        kwargs["mkldnn_cache_capacity"] = profile["mkldnn_cache_capacity"]
+    if profile.get("pin_side"):
+        kwargs["text_det_limit_side_len"] = profile["pin_side"]
+        kwargs["text_det_limit_type"] = "max"
+    if cpu_threads is not None:
+        kwargs["cpu_threads"] = cpu_threads
+    return PaddleOCR(**kwargs)
+
+
+def load_detector(det_model: str, device: str, profile_name: str, cpu_threads=None):
+    """
+    Detector đã cache theo process; profile oneDNN chạy self-test trước.
+
+    Returns:
+        (engine, profile thực sự dùng)
+    """
+    key = (det_model, device, profile_name, cpu_threads)
+    with _lock:
+        if key in _detectors:
+            return _detectors[key]
+
+        profile = resolve_det_profile(profile_name)
+        plain = resolve_det_profile("default")
+        if device != "cpu" and profile["mkldnn"]:
+            logger.warning(f"det_profile={profile_name} chỉ dùng cho CPU → default")
+            profile = plain
+
+        engine = build_detector(det_model, device, profile, cpu_threads)
+        if profile["name"] != "default":
+            reference = build_detector(det_model, device, plain, cpu_threads)
+            page = selftest_image()
+            try:
+                ok = polys_agree(detect(reference, page, plain), detect(engine, page, profile))
+            except Exception as e:
+                logger.warning(f"Detector self-test error ({profile['name']}): {e}")
+                ok = False
+            if ok:
+                logger.info(f"Detector self-test passed → {profile['name']}")
+            else:
+                logger.warning(
+                    f"Detector self-test: {profile['name']} lệch polygon so với default → default"
+                )
+                engine, profile = reference, plain
+
+        _detectors[key] = (engine, profile)
+        return engine, profile
@@ -0,0 +1,59 @@
+"""
+det_scale.py — Chọn độ phân giải detect theo chiều cao dòng chữ.
+
+Ảnh từ API (không qua MAX_DIM như run_pipeline.py) có thể rất lớn. Thay vì
+detect ở độ phân giải gốc:
+    1. Probe: detect trên bản thu nhỏ (cạnh dài PROBE_SIDE) → median chiều
+       cao dòng, quy về toạ độ ảnh gốc.
+    2. Chọn scale đưa dòng chữ về ~TARGET_LINE_PX (vùng model PP-OCRv5 detect
+       tốt nhất), kẹp trong [MIN_DET_SCALE, MAX_DET_SCALE] và cạnh dài ≤
+       MAX_DET_SIDE. Scale gần với probe → dùng luôn kết quả probe. Probe
+       không thấy dòng nào → detect lại ở scale 1 (độ phân giải gốc).
+    3. Polygon được scale ngược về ảnh gốc → crop cho VietOCR vẫn lấy pixel
+       ở độ phân giải đầy đủ.
+"""
+
+from typing import Optional
+
+import cv2
+import numpy as np
+
+PROBE_SIDE = 960
+TARGET_LINE_PX = 32
+MIN_DET_SCALE = 0.25
+MAX_DET_SCALE = 2.0
+MAX_DET_SIDE = 4000
+# |scale - probe_scale| / probe_scale dưới ngưỡng này → không detect lần 2
+REUSE_TOLERANCE = 0.15
+# Dòng thấp hơn (px, toạ độ probe) là nhiễu, không tính median
+MIN_PROBE_LINE_PX = 3
+
+
+def probe_scale(shape) -> float:
+    """Scale của lần probe (≤ 1, cạnh dài = PROBE_SIDE)."""
+    return min(1.0, PROBE_SIDE / max(shape[:2]))
+
+
+def resize_by(image: np.ndarray, scale: float) -> np.ndarray:
+    if scale == 1.0:
+        return image
+    h, w = image.shape[:2]
+    interp = cv2.INTER_AREA if scale < 1.0 else cv2.INTER_CUBIC
+    return cv2.resize(
+        image, (max(1, round(w * scale)), max(1, round(h * scale))), interpolation=interp
+    )
+
+
+def median_line_height(polys: list) -> Optional[float]:
+    """Median chiều cao bbox các polygon (None nếu không có dòng hợp lệ)."""
+    heights = [
+        max(pt[1] for pt in poly) - min(pt[1] for pt in poly) for poly in polys
+    ]
+    heights = [h for h in heights if h >= MIN_PROBE_LINE_PX]
+    return float(np.median(heights)) if heights else None
+
+
+def choose_scale(line_height: float, shape) -> float:
+    """Scale (so với ảnh gốc) đưa dòng cao line_height px về TARGET_LINE_PX."""
+    scale = float(np.clip(TARGET_LINE_PX / max(line_height, 1.0), MIN_DET_SCALE, MAX_DET_SCALE))
+    return min(scale, MAX_DET_SIDE / max(shape[:2]))
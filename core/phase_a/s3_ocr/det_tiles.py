@@ -0,0 +1,199 @@
+"""
+det_tiles.py — Detect theo tile chồng lấn cho scan rất lớn.
+
+Scan 300 dpi / ảnh ghép nhiều trang vượt quá kích thước PP-OCRv5 detect
+được mà không thu nhỏ chữ. Ảnh được chia thành tile TILE_SIDE × TILE_SIDE
+chồng nhau TILE_OVERLAP px (> chiều cao 1 dòng), detect theo lô
+TILE_BATCH tile (Paddle chạy song song trong 1 lô; bộ nhớ chỉ phụ thuộc
+kích thước lô, không phụ thuộc kích thước ảnh — tile là view của ảnh gốc).
+
+Ghép: polygon dời về toạ độ ảnh gốc; các polygon chạm mép trong của tile
+được gộp khi trùng nhau (IoU / bị chứa) hoặc là 2 mảnh cùng 1 dòng
+(cùng hàng — chồng theo Y, chiều cao tương đương — và chồng theo X).
+Polygon nằm trọn trong tile giữ nguyên → kết quả giống detect 1 lần.
+"""
+
+import cv2
+import numpy as np
+
+TILE_SIDE = 960
+TILE_OVERLAP = 128
+TILE_BATCH = 4
+# Chỉ tile ảnh có cạnh dài vượt ngưỡng này (ảnh chụp thường → detect 1 lần)
+TILE_TRIGGER_SIDE = 4000
+# Polygon cách mép trong của tile ≤ EDGE_MARGIN px → có thể bị cắt
+EDGE_MARGIN = 4
+MERGE_IOU = 0.5
+MERGE_CONTAIN = 0.8
+# Cùng hàng: chồng Y / chiều cao nhỏ hơn, tỉ lệ chiều cao
+MIN_ROW_OVERLAP = 0.6
+MIN_HEIGHT_RATIO = 0.6
+
+
+def tile_grid(height: int, width: int, tile: int = TILE_SIDE, overlap: int = TILE_OVERLAP):
+    """List (x0, y0, x1, y1) phủ kín ảnh, các tile chồng nhau ≥ overlap px."""
+
+    def starts(size):
+        if size <= tile:
+            return [0]
+        step = tile - overlap
+        n = int(np.ceil((size - tile) / step)) + 1
+        return [min(i * step, size - tile) for i in range(n)]
+
+    return [
+        (x, y, min(x + tile, width), min(y + tile, height))
+        for y in starts(height)
+        for x in starts(width)
+    ]
+
+
+def _rects(polys):
+    pts = [np.asarray(p) for p in polys]
+    return np.array(
+        [[p[:, 0].min(), p[:, 1].min(), p[:, 0].max(), p[:, 1].max()] for p in pts],
+        dtype=np.float64,
+    ).reshape(-1, 4)
+
+
+def _overlap(a, b):
+    ix = min(a[2], b[2]) - max(a[0], b[0])
+    iy = min(a[3], b[3]) - max(a[1], b[1])
+    return ix, iy
+
+
+def _area(r):
+    return max(r[2] - r[0], 0.0) * max(r[3] - r[1], 0.0)
+
+
+def _should_merge(a, b, fragment: bool) -> bool:
+    """
+    a, b: rect [x1, y1, x2, y2]. fragment=True nếu ≥ 1 polygon chạm mép
+    trong của tile (có thể bị cắt).
+    """
+    ix, iy = _overlap(a, b)
+    if ix <= 0 or iy <= 0:
+        return False
+    inter = ix * iy
+    area_a, area_b = _area(a), _area(b)
+    if inter / max(area_a + area_b - inter, 1e-9) >= MERGE_IOU:
+        return True
+    if inter / max(min(area_a, area_b), 1e-9) >= MERGE_CONTAIN:
+        return True
+    if not fragment:
+        return False
+    # 2 mảnh của cùng 1 dòng: cùng hàng, chiều cao tương đương, chồng theo X
+    # (tile chồng nhau nên 2 mảnh luôn phủ chung vùng overlap)
+    low, high = sorted((max(a[3] - a[1], 1.0), max(b[3] - b[1], 1.0)))
+    return low / high >= MIN_HEIGHT_RATIO and iy / low >= MIN_ROW_OVERLAP
+
+
+def _merge_group(polys: list, rects: np.ndarray) -> list:
+    """Bản trùng (bị chứa trong polygon khác) → giữ polygon lớn nhất; mảnh → gộp."""
+    order = np.argsort([-_area(r) for r in rects], kind="stable")
+    kept = []
+    for i in order:
+        contained = False
+        for j in kept:
+            ix, iy = _overlap(rects[i], rects[j])
+            if ix > 0 and iy > 0 and ix * iy >= MERGE_CONTAIN * max(_area(rects[i]), 1e-9):
+                contained = True
+                break
+        if not contained:
+            kept.append(i)
+    if len(kept) == 1:
+        return polys[kept[0]]
+    pts = np.concatenate([np.asarray(polys[i], dtype=np.float32) for i in kept])
+    box = cv2.boxPoints(cv2.minAreaRect(pts))
+    return [[int(round(x)), int(round(y))] for x, y in box]
+
+
+def stitch(tile_polys: list, tiles: list, width: int, height: int) -> list:
+    """
+    Ghép polygon của các tile (toạ độ trong tile) → polygon ảnh gốc.
+
+    Args:
+        tile_polys: List polys theo tile (cùng thứ tự tiles).
+        tiles:      (x0, y0, x1, y1) của từng tile.
+    """
+    polys, at_edge = [], []
+    for (x0, y0, x1, y1), found in zip(tiles, tile_polys):
+        inner = (x0 > 0, y0 > 0, x1 < width, y1 < height)
+        for poly in found:
+            shifted = [[int(pt[0]) + x0, int(pt[1]) + y0] for pt in poly]
+            xs = [pt[0] for pt in shifted]
+            ys = [pt[1] for pt in shifted]
+            edge = (
+                (inner[0] and min(xs) <= x0 + EDGE_MARGIN)
+                or (inner[1] and min(ys) <= y0 + EDGE_MARGIN)
+                or (inner[2] and max(xs) >= x1 - EDGE_MARGIN)
+                or (inner[3] and max(ys) >= y1 - EDGE_MARGIN)
+            )
+            polys.append(shifted)
+            at_edge.append(edge)
+    if not polys:
+        return []
+
+    # Chỉ gộp cặp có ≥ 1 polygon chạm mép trong của tile hoặc nằm trong vùng
+    # chồng của ≥ 2 tile (được detect 2 lần); cặp khác giữ nguyên như detect
+    # 1 lần.
+    rects = _rects(polys)
+    at_edge = np.array(at_edge, dtype=bool)
+    tile_arr = np.array(tiles, dtype=np.float64)
+    covering = (
+        (tile_arr[None, :, 0] <= rects[:, None, 0])
+        & (tile_arr[None, :, 1] <= rects[:, None, 1])
+        & (rects[:, None, 2] <= tile_arr[None, :, 2])
+        & (rects[:, None, 3] <= tile_arr[None, :, 3])
+    ).sum(axis=1)
+    candidate = at_edge | (covering > 1)
+    order = np.argsort(rects[:, 1], kind="stable")
+
+    parent = list(range(len(polys)))
+
+    def find(i):
+        while parent[i] != i:
+            parent[i] = parent[parent[i]]
+            i = parent[i]
+        return i
+
+    # Sweep theo Y: chỉ so các cặp chồng nhau theo Y
+    for pos, i in enumerate(order):
+        for j in order[pos + 1 :]:
+            if rects[j, 1] >= rects[i, 3]:
+                break
+            if not (candidate[i] or candidate[j]) or find(i) == find(j):
+                continue
+            if _should_merge(rects[i], rects[j], bool(at_edge[i] or at_edge[j])):
+                parent[find(j)] = find(i)
+
+    groups = {}
+    for i in range(len(polys)):
+        groups.setdefault(find(i), []).append(i)
+    return [
+        polys[members[0]]
+        if len(members) == 1
+        else _merge_group([polys[i] for i in members], rects[members])
+        for members in sorted(groups.values(), key=min)
+    ]
+
+
+def detect_tiled(image: np.ndarray, detect_fn, tile: int = TILE_SIDE,
+                 overlap: int = TILE_OVERLAP, batch: int = TILE_BATCH):
+    """
+    Detect theo tile rồi ghép.
+
+    Args:
+        detect_fn: list ảnh → (list polys theo ảnh, ok).
+    Returns:
+        (polys theo toạ độ ảnh gốc, ok)
+    """
+    height, width = image.shape[:2]
+    tiles = tile_grid(height, width, tile, overlap)
+    tile_polys = []
+    for start in range(0, len(tiles), batch):
+        chunk = tiles[start : start + batch]
+        found, ok = detect_fn([image[y0:y1, x0:x1] for x0, y0, x1, y1 in chunk])
+        if not ok:
+            return [], False
+        tile_polys.extend(found)
+    return stitch(tile_polys, tiles, width, height), True
@@ -0,0 +1,239 @@
+"""
+fast_decode.py — Greedy decode có KV-cache cho VietOCR vgg_transformer.
+
+`vietocr.tool.translate.translate()` chạy lại toàn bộ decoder trên cả prefix
+ở mỗi bước → chi phí mỗi dòng tăng bậc hai theo độ dài text.
+
+CachedGreedyRecognizer:
+- Tính K/V của memory (cross-attention) 1 lần cho mỗi layer.
+- Cache K/V self-attention theo từng bước → mỗi bước chỉ decode 1 token.
+- Dừng từng sequence ngay khi sinh EOS, co batch (compact) lại khi có
+  sequence kết thúc.
+
+Kết quả khớp token-by-token với `translate()` (greedy, beamsearch=False).
+Interface giống `vietocr.tool.predictor.Predictor`: predict(), predict_batch().
+"""
+
+import logging
+import math
+from collections import defaultdict
+
+import torch
+import torch.nn.functional as F
+
+logger = logging.getLogger(__name__)
+
+MAX_SEQ_LENGTH = 128  # Giống default của vietocr translate()
+SOS_TOKEN = 1
+EOS_TOKEN = 2
+SPECIAL_TOKEN_MAX = 3  # pad/sos/eos/mask — không tính vào prob
+
+
+class CachedGreedyRecognizer:
+    """
+    Bọc `vietocr.tool.predictor.Predictor` bằng greedy decode có KV-cache.
+
+    Args:
+        predictor:      Predictor VietOCR đã load weights.
+        max_seq_length: Số bước decode tối đa (giống translate()).
+    """
+
+    def __init__(self, predictor, max_seq_length: int = MAX_SEQ_LENGTH):
+        self._predictor = predictor
+        self.model = predictor.model
+        self.vocab = predictor.vocab
+        self.config = predictor.config
+        self.device = predictor.device
+        self._max_seq_length = max_seq_length
+
+    @staticmethod
+    def supports(predictor) -> bool:
+        """Chỉ hỗ trợ seq_modeling='transformer' + greedy."""
+        model = getattr(predictor, "model", None)
+        config = getattr(predictor, "config", {}) or {}
+        if model is None or getattr(model, "seq_modeling", "") != "transformer":
+            return False
+        return not config.get("predictor", {}).get("beamsearch", False)
+
+    # ── Decode ────────────────────────────────────────────
+
+    def _layer_cross_kv(self, layer, memory):
+        """K/V cross-attention của memory: (N, H, S, D) — tính 1 lần."""
+        attn = layer.multihead_attn
+        embed_dim = attn.embed_dim
+        num_heads = attn.num_heads
+        head_dim = embed_dim // num_heads
+        w_kv = attn.in_proj_weight[embed_dim:]
+        b_kv = attn.in_proj_bias[embed_dim:] if attn.in_proj_bias is not None else None
+        kv = F.linear(memory, w_kv, b_kv)  # (S, N, 2E)
+        k, v = kv.chunk(2, dim=-1)
+        src_len, bsz = memory.shape[0], memory.shape[1]
+        k = k.reshape(src_len, bsz, num_heads, head_dim).permute(1, 2, 0, 3)
+        v = v.reshape(src_len, bsz, num_heads, head_dim).permute(1, 2, 0, 3)
+        return k.contiguous(), v.contiguous()
+
+    @staticmethod
+    def _attend(attn, q, k, v):
+        """q: (N, H, 1, D), k/v: (N, H, T, D) → (1, N, E) sau out_proj."""
+        out = F.scaled_dot_product_attention(q, k, v)
+        bsz = q.shape[0]
+        out = out.permute(2, 0, 1, 3).reshape(1, bsz, attn.embed_dim)
+        return F.linear(out, attn.out_proj.weight, attn.out_proj.bias)
+
+    def _step(self, x, layers, self_k, self_v, cross_kv, t):
+        """Decode 1 token (x: (1, N, E)) qua tất cả layers, cập nhật cache."""
+        for li, layer in enumerate(layers):
+            sa = layer.self_attn
+            embed_dim = sa.embed_dim
+            num_heads = sa.num_heads
+            head_dim = embed_dim // num_heads
+            bsz = x.shape[1]
+
+            # Self-attention: chỉ chiếu token mới, nối vào cache
+            qkv = F.linear(x, sa.in_proj_weight, sa.in_proj_bias)
+            q, k, v = qkv.chunk(3, dim=-1)
+            q = q.reshape(1, bsz, num_heads, head_dim).permute(1, 2, 0, 3)
+            k = k.reshape(1, bsz, num_heads, head_dim).permute(1, 2, 0, 3)
+            v = v.reshape(1, bsz, num_heads, head_dim).permute(1, 2, 0, 3)
+            self_k[li][:, :, t : t + 1] = k
+            self_v[li][:, :, t : t + 1] = v
+            sa_out = self._attend(
+                sa, q, self_k[li][:, :, : t + 1], self_v[li][:, :, : t + 1]
+            )
+            x = layer.norm1(x + layer.dropout1(sa_out))
+
+            # Cross-attention với memory K/V đã tính sẵn
+            ca = layer.multihead_attn
+            w_q = ca.in_proj_weight[:embed_dim]
+            b_q = ca.in_proj_bias[:embed_dim] if ca.in_proj_bias is not None else None
+            q = F.linear(x, w_q, b_q)
+            q = q.reshape(1, bsz, num_heads, head_dim).permute(1, 2, 0, 3)
+            mem_k, mem_v = cross_kv[li]
+            ca_out = self._attend(ca, q, mem_k, mem_v)
+            x = layer.norm2(x + layer.dropout2(ca_out))
+
+            # Feed-forward (gọi module → tương thích quantize_dynamic)
+            ff = layer.linear2(layer.dropout(layer.activation(layer.linear1(x))))
+            x = layer.norm3(x + layer.dropout3(ff))
+        return x
+
+    def translate(self, img):
+        """
+        Greedy decode có KV-cache.
+
+        Args:
+            img: Tensor (N, C, H, W) cùng width.
+        Returns:
+            (sentences, probs): token ids (có SOS, kết thúc ở EOS nếu có)
+            và prob trung bình các ký tự trước EOS của mỗi dòng.
+        """
+        model = self.model
+        model.eval()
+        lt = model.transformer
+        decoder = lt.transformer.decoder
+        layers = list(decoder.layers)
+        scale = math.sqrt(lt.d_model)
+        max_steps = self._max_seq_length + 1
+
+        with torch.no_grad():
+            src = model.cnn(img)
+            memory = lt.forward_encoder(src)  # (S, N, E)
+            bsz = memory.shape[1]
+            device = memory.device
+
+            cross_kv = [self._layer_cross_kv(layer, memory) for layer in layers]
+            sa0 = layers[0].self_attn
+            num_heads = sa0.num_heads
+            head_dim = sa0.embed_dim // num_heads
+            dtype = memory.dtype
+            self_k = [
+                torch.empty(bsz, num_heads, max_steps, head_dim, device=device, dtype=dtype)
+                for _ in layers
+            ]
+            self_v = [
+                torch.empty(bsz, num_heads, max_steps, head_dim, device=device, dtype=dtype)
+                for _ in layers
+            ]
+
+            sentences = [[SOS_TOKEN] for _ in range(bsz)]
+            char_probs = [[] for _ in range(bsz)]
+            active = list(range(bsz))  # row → index gốc trong batch
+            last_tokens = torch.full((bsz,), SOS_TOKEN, dtype=torch.long, device=device)
+
+            for t in range(max_steps):
+                emb = lt.embed_tgt(last_tokens).unsqueeze(0) * scale  # (1, N, E)
+                x = lt.pos_enc.dropout(emb + lt.pos_enc.pe[t : t + 1])
+                x = self._step(x, layers, self_k, self_v, cross_kv, t)
+                if decoder.norm is not None:
+                    x = decoder.norm(x)
+                logits = lt.fc(x[0])  # (N, V)
+                probs = torch.softmax(logits, dim=-1)
+                values, indices = probs.max(dim=-1)
+
+                idx_list = indices.tolist()
+                val_list = values.tolist()
+                keep_rows = []
+                for row, (orig, tok, p) in enumerate(zip(active, idx_list, val_list)):
+                    sentences[orig].append(tok)
+                    if tok == EOS_TOKEN:
+                        continue
+                    if tok > SPECIAL_TOKEN_MAX:
+                        char_probs[orig].append(p)
+                    keep_rows.append(row)
+
+                if not keep_rows:
+                    break
+                if len(keep_rows) < len(active):
+                    # Compact batch: bỏ các sequence đã gặp EOS
+                    sel = torch.tensor(keep_rows, dtype=torch.long, device=device)
+                    active = [active[r] for r in keep_rows]
+                    indices = indices.index_select(0, sel)
+                    cross_kv = [
+                        (k.index_select(0, sel), v.index_select(0, sel))
+                        for k, v in cross_kv
+                    ]
+                    self_k = [c.index_select(0, sel) for c in self_k]
+                    self_v = [c.index_select(0, sel) for c in self_v]
+                last_tokens = indices
+
+        probs_out = [sum(p) / len(p) if p else 0.0 for p in char_probs]
+        return sentences, probs_out
+
+    # ── Predictor-compatible API ──────────────────────────
+
+    def _process(self, img):
+        from vietocr.tool.translate import process_input
+
+        ds = self.config["dataset"]
+        return process_input(
+            img, ds["image_height"], ds["image_min_width"], ds["image_max_width"]
+        )
+
+    def predict(self, img, return_prob=False):
+        batch = self._process(img).to(self.device)
+        sents, probs = self.translate(batch)
+        s = self.vocab.decode(sents[0])
+        return (s, probs[0]) if return_prob else s
+
+    def predict_batch(self, imgs, return_prob=False):
+        """Giống Predictor.predict_batch: bucket theo width sau resize."""
+        bucket = defaultdict(list)
+        bucket_idx = defaultdict(list)
+        sents, probs = [""] * len(imgs), [0.0] * len(imgs)
+
+        for i, img in enumerate(imgs):
+            tensor = self._process(img)
+            bucket[tensor.shape[-1]].append(tensor)
+            bucket_idx[tensor.shape[-1]].append(i)
+
+        for width, tensors in bucket.items():
+            batch = torch.cat(tensors, 0).to(self.device)
+            ids, prob = self.translate(batch)
+            texts = self.vocab.batch_decode(ids)
+            for j, i in enumerate(bucket_idx[width]):
+                sents[i] = texts[j]
+                probs[i] = prob[j]
+
+        if return_prob:
+            return sents, probs
+        return sents
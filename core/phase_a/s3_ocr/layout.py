@@ -0,0 +1,233 @@
+"""
+layout.py — Layout engine dạng mảng cho group_by_stt.
+
+Toàn bộ polygon được nạp vào 1 mảng (N, 4, 2) đúng 1 lần; tâm/biên tính
+vector hoá, gán cột và band bằng np.searchsorted. Kết quả giống hệt bản
+list-based (`ocr_engine._group_by_stt_lists`, vẫn dùng làm fallback khi
+polygon không phải 4 điểm).
+"""
+
+import logging
+import re
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+NUM_COLS = 4
+# Fallback tương đối (v2 cũ) khi không dò được ranh giới cột
+FALLBACK_BOUNDS = np.array([0.13, 0.75, 0.88])
+# Block rộng hơn (px) không tham gia dò gap giữa các cột
+MAX_GAP_BLOCK_WIDTH = 500
+# Block có y-center cao hơn anchor đầu quá mức này → header
+HEADER_MARGIN = 20
+# Khoảng cách tối thiểu giữa 2 title để tách band thiếu anchor
+MIN_TITLE_GAP = 52.0
+
+STT_RE = re.compile(r"^\d+$")
+
+
+class BlockLayout:
+    """Biên + tâm của N polygon 4 điểm, tính 1 lần từ mảng (N, 4, 2)."""
+
+    __slots__ = ("x_min", "x_max", "y_min", "y_max", "xc", "yc")
+
+    def __init__(self, pts: np.ndarray):
+        xs = pts[:, :, 0]
+        ys = pts[:, :, 1]
+        self.x_min = xs.min(axis=1)
+        self.x_max = xs.max(axis=1)
+        self.y_min = ys.min(axis=1)
+        self.y_max = ys.max(axis=1)
+        self.xc = (self.x_min + self.x_max) / 2.0
+        self.yc = (self.y_min + self.y_max) / 2.0
+
+    @classmethod
+    def from_blocks(cls, blocks):
+        """None nếu có polygon không phải 4 điểm [x, y]."""
+        try:
+            pts = np.asarray([b.bbox for b in blocks])
+        except ValueError:
+            return None
+        if pts.ndim != 3 or pts.shape[1:] != (4, 2) or pts.dtype == object:
+            return None
+        return cls(pts)
+
+
+def col_bounds(x_min: np.ndarray, x_max: np.ndarray, num_cols: int = NUM_COLS):
+    """Bản vector của `_detect_dynamic_col_bounds` (top gap theo trục X)."""
+    if len(x_min) < num_cols:
+        return None
+    narrow = (x_max - x_min) < MAX_GAP_BLOCK_WIDTH
+    if int(narrow.sum()) < num_cols:
+        return None
+
+    order = np.argsort(x_min[narrow], kind="stable")
+    starts = x_min[narrow][order]
+    ends = x_max[narrow][order]
+    running_max = np.maximum.accumulate(ends)[:-1]
+    next_min = starts[1:]
+    has_gap = next_min > running_max
+    sizes = (next_min - running_max)[has_gap]
+    centers = ((next_min + running_max) / 2.0)[has_gap]
+    if len(sizes) < num_cols - 1:
+        return None
+
+    top = np.argsort(-sizes, kind="stable")[: num_cols - 1]
+    bounds = sorted(float(c) for c in centers[top])
+    logger.debug(f"Dynamic Column Bounds (Absolute X): {bounds}")
+    return bounds
+
+
+def _split_band(idx, col, text_col, layout, texts):
+    """
+    Bản mảng của `_split_band_on_missing_anchor` (cùng ngưỡng, cùng kết quả).
+
+    Returns:
+        Mảng sub-band id (0..k) cho từng phần tử của idx, hoặc None nếu không tách.
+    """
+    from core.phase_a.s3_ocr.ocr_engine import _is_drug_title_candidate
+
+    text_idx = idx[col[idx] == text_col]
+    yc = layout.yc
+    title_idx = np.array(
+        [i for i in text_idx.tolist() if _is_drug_title_candidate(texts[i])],
+        dtype=np.intp,
+    )
+    if len(title_idx) < 2:
+        return None
+    title_idx = title_idx[np.argsort(yc[title_idx], kind="stable")]
+    if np.diff(yc[title_idx]).max() < MIN_TITLE_GAP:
+        return None
+    text_idx = text_idx[np.argsort(yc[text_idx], kind="stable")]
+    text_ycs = yc[text_idx]
+
+    heights = np.maximum(1, layout.y_max[text_idx] - layout.y_min[text_idx])
+    min_title_gap = max(MIN_TITLE_GAP, float(np.median(heights)) * 1.15)
+
+    split_bounds = set()
+    for prev_title, curr_title in zip(title_idx[:-1], title_idx[1:]):
+        if yc[curr_title] - yc[prev_title] < min_title_gap:
+            continue
+        # Block cột text cuối cùng nằm trên title hiện tại
+        k = int(np.searchsorted(text_ycs, yc[curr_title], side="left")) - 1
+        prev_text = text_idx[k] if k >= 0 else prev_title
+        prev_bottom = layout.y_max[prev_text]
+        curr_top = layout.y_min[curr_title]
+        if curr_top > prev_bottom:
+            split_bounds.add(float((prev_bottom + curr_top) / 2.0))
+        else:
+            split_bounds.add(float((yc[prev_text] + yc[curr_title]) / 2.0))
+
+    if not split_bounds:
+        return None
+    return np.searchsorted(np.array(sorted(split_bounds)), yc[idx], side="left")
+
+
+def group_by_stt_array(texts: list, confidence_at, layout: BlockLayout, block_at):
+    """
+    group_by_stt trên các cột — xem `ocr_engine.group_by_stt`.
+
+    Args:
+        texts:       Text mỗi block.
+        confidence_at: i → confidence (float) của block i.
+        layout:      BlockLayout của các block.
+        block_at:    i → TextBlock gốc (chỉ gọi cho header).
+    Returns:
+        List TextBlock đã gộp, hoặc None nếu không có STT anchor.
+    """
+    from core.phase_a.s3_ocr.base import TextBlock
+
+    n = len(texts)
+    stripped = [t.strip() for t in texts]
+    yc = layout.yc
+
+    abs_col_bounds = col_bounds(layout.x_min, layout.x_max, NUM_COLS)
+    if abs_col_bounds:
+        col = np.searchsorted(np.array(abs_col_bounds), layout.xc, side="left")
+    else:
+        min_x = layout.x_min.min()
+        board_width = max(layout.x_max.max() - min_x, 1)
+        col = np.searchsorted(FALLBACK_BOUNDS, (layout.xc - min_x) / board_width)
+
+    # 1. Anchor STT
+    anchor_idx = [i for i in np.flatnonzero(col == 0).tolist() if STT_RE.match(stripped[i])]
+    if not anchor_idx:
+        logger.warning("group_by_stt: Không tìm thấy STT anchor → trả về blocks gốc.")
+        return None
+    anchor_ycs = np.sort(yc[anchor_idx], kind="stable")
+    num_bands = len(anchor_ycs)
+
+    # 2. Band theo Y-midpoint giữa các anchor; header = -1
+    boundaries = (anchor_ycs[:-1] + anchor_ycs[1:]) / 2.0
+    band = np.searchsorted(boundaries, yc, side="left")
+    band[yc < anchor_ycs[0] - HEADER_MARGIN] = -1
+
+    # Tách band khi thiếu anchor — chỉ band có ≥ 2 block cột text cách nhau
+    # đủ xa (≥ MIN_TITLE_GAP) mới có thể tách.
+    num_cols = len(abs_col_bounds) + 1 if abs_col_bounds else NUM_COLS
+    text_col = 1 if num_cols > 1 else 0
+    sub = np.zeros(n, dtype=np.intp)
+    in_text = (col == text_col) & (band >= 0)
+    text_band = band[in_text]
+    counts = np.bincount(text_band, minlength=num_bands)
+    lo = np.full(num_bands, np.inf)
+    hi = np.full(num_bands, -np.inf)
+    np.minimum.at(lo, text_band, yc[in_text])
+    np.maximum.at(hi, text_band, yc[in_text])
+    by_band = np.argsort(band, kind="stable")
+    band_starts = np.searchsorted(band[by_band], np.arange(num_bands + 1))
+    for b in np.flatnonzero((counts >= 2) & (hi - lo >= MIN_TITLE_GAP)).tolist():
+        members = by_band[band_starts[b] : band_starts[b + 1]]
+        sub_ids = _split_band(members, col, text_col, layout, texts)
+        if sub_ids is not None:
+            sub[members] = sub_ids
+
+    # 3. Header giữ nguyên block, sort theo Y
+    headers = np.flatnonzero(band < 0)
+    merged = [block_at(i) for i in headers[np.argsort(yc[headers], kind="stable")].tolist()]
+
+    # 4-5. Logical band = (band, sub): sort 1 lần theo (band, sub, cột, Y)
+    body = np.flatnonzero(band >= 0)
+    if len(body):
+        order = body[np.lexsort((yc[body], col[body], sub[body], band[body]))]
+        key = band[order] * (n + 1) + sub[order]
+        starts = np.flatnonzero(np.r_[True, key[1:] != key[:-1]])
+        x1s = np.minimum.reduceat(layout.x_min[order], starts).tolist()
+        y1s = np.minimum.reduceat(layout.y_min[order], starts).tolist()
+        x2s = np.maximum.reduceat(layout.x_max[order], starts).tolist()
+        y2s = np.maximum.reduceat(layout.y_max[order], starts).tolist()
+        ends = np.r_[starts[1:], len(order)].tolist()
+        order_l = order.tolist()
+        col_l = col[order].tolist()
+
+        for g, (start, end) in enumerate(zip(starts.tolist(), ends)):
+            members = order_l[start:end]
+            parts, current, current_col = [], [], col_l[start]
+            for i, c in zip(members, col_l[start:end]):
+                if c != current_col:
+                    if current:
+                        parts.append(" ".join(current))
+                    current, current_col = [], c
+                if stripped[i]:
+                    current.append(stripped[i])
+            if current:
+                parts.append(" ".join(current))
+
+            # Cộng confidence theo thứ tự block gốc (giống bản list)
+            avg_conf = sum(confidence_at(i) for i in sorted(members)) / len(members)
+            x1, y1, x2, y2 = x1s[g], y1s[g], x2s[g], y2s[g]
+            merged.append(
+                TextBlock(
+                    text=" | ".join(parts).strip(),
+                    confidence=round(avg_conf, 4),
+                    bbox=[[x1, y1], [x2, y1], [x2, y2], [x1, y2]],
+                )
+            )
+
+    mode = "Dynamic" if abs_col_bounds else "StaticFallback"
+    logger.info(
+        f"group_by_stt [{mode}]: {n} blocks → {len(merged)} lines "
+        f"(Found {len(anchor_idx)} STTs)"
+    )
+    return merged
@@ -0,0 +1,162 @@
+"""
+line_cache.py — Cache nhận dạng theo perceptual hash của từng crop dòng.
+
+Đơn thuốc cùng bệnh viện lặp lại nhiều dòng in sẵn (tên bệnh viện,
+"Đơn thuốc", "BHYT", "Họ tên", header cột...). Mỗi crop được chuẩn hoá
+(xám, cắt sát vùng mực, cao HASH_HEIGHT px, rộng theo tỉ lệ khung) rồi
+băm kiểu dHash 2 chiều (sáng→tối, tối→sáng). Crop có hash trùng tuyệt đối
+dùng lại text cũ, không qua VietOCR.
+
+Mặc định KHÔNG dùng hit gần trùng: đo trên dòng render, 1 ký tự khác nhau
+("Methylprednisolon"/"Methylprednisolan", "2 lần"/"3 lần") chỉ lệch 0.016-0.06
+(Jaccard trên các bit cạnh), trong khi cùng 1 dòng có nhiễu / lệch box lệch
+tới ~0.04 → không ngưỡng nào tách được. max_distance > 0 bật lại tra gần
+đúng (cùng nhóm tỉ lệ khung, bỏ qua dòng có chữ số) — chỉ nên dùng khi text
+cache không chứa tên thuốc.
+
+Chỉ lưu kết quả có confidence ≥ min_confidence để lỗi nhận dạng không bị
+lan sang các ảnh sau. Giới hạn số entry bằng LRU, có thống kê hit-rate.
+"""
+
+import logging
+import threading
+from typing import Optional
+
+import cv2
+import numpy as np
+
+from core.shared.lru import LruCache
+
+logger = logging.getLogger(__name__)
+
+# Chiều cao crop sau chuẩn hoá (px) và số cột hash cho mỗi "ô vuông"
+HASH_HEIGHT = 16
+COLS_PER_HEIGHT = 8
+# Tỉ lệ rộng/cao tối đa (dòng dài hơn bị gộp vào nhóm cuối)
+MAX_ASPECT = 40
+# Chênh lệch xám (sau chuẩn hoá 0..255) tối thiểu để tính là cạnh
+EDGE_MARGIN = 24
+# Khoảng cách Jaccard tối đa cho hit gần đúng; 0 = chỉ hit khi hash trùng
+# tuyệt đối (xem docstring module — 1 ký tự khác nhau có thể chỉ lệch 0.016)
+MAX_DISTANCE = 0.0
+MIN_CONFIDENCE = 0.9
+
+
+def _trim_to_ink(gray: np.ndarray) -> np.ndarray:
+    """Cắt sát vùng mực (Otsu) — padding/lệch box vài px không đổi hash."""
+    if gray.size == 0:
+        return gray
+    _, ink = cv2.threshold(gray, 0, 255, cv2.THRESH_BINARY_INV + cv2.THRESH_OTSU)
+    ys, xs = np.nonzero(ink)
+    if len(xs) == 0:
+        return gray
+    return gray[ys.min() : ys.max() + 1, xs.min() : xs.max() + 1]
+
+
+def line_hash(crop: np.ndarray) -> Optional[tuple]:
+    """
+    Perceptual hash của 1 crop dòng (BGR hoặc xám).
+
+    Returns:
+        (aspect, bytes) — aspect là nhóm tỉ lệ khung; None nếu crop quá nhỏ.
+    """
+    gray = cv2.cvtColor(crop, cv2.COLOR_BGR2GRAY) if crop.ndim == 3 else crop
+    gray = _trim_to_ink(gray)
+    h, w = gray.shape[:2]
+    if h < 2 or w < 2:
+        return None
+    aspect = int(np.clip(round(w / h), 1, MAX_ASPECT))
+    small = cv2.resize(
+        gray, (aspect * COLS_PER_HEIGHT + 1, HASH_HEIGHT), interpolation=cv2.INTER_AREA
+    ).astype(np.float32)
+    lo, hi = float(small.min()), float(small.max())
+    small = (small - lo) * (255.0 / max(hi - lo, 1.0))
+    diff = small[:, 1:] - small[:, :-1]
+    bits = np.concatenate([diff > EDGE_MARGIN, diff < -EDGE_MARGIN], axis=None)
+    return aspect, np.packbits(bits).tobytes()
+
+
+def _popcount(packed: np.ndarray) -> np.ndarray:
+    return np.unpackbits(packed, axis=-1).sum(axis=-1)
+
+
+class LineRecognitionCache:
+    """
+    Cache (text, confidence) theo line_hash, LRU (+ tra gần đúng tuỳ chọn).
+
+    Args:
+        max_entries:    Số dòng tối đa giữ trong cache.
+        max_distance:   Ngưỡng khoảng cách Jaccard cho hit gần đúng, chỉ với
+                        dòng không có chữ số (0 = mặc định, chỉ hit khi hash
+                        trùng tuyệt đối). Không an toàn cho tên thuốc.
+        min_confidence: Chỉ lưu kết quả có confidence ≥ ngưỡng này.
+    """
+
+    def __init__(
+        self,
+        max_entries: int = 2048,
+        max_distance: float = MAX_DISTANCE,
+        min_confidence: float = MIN_CONFIDENCE,
+    ):
+        self.max_distance = max_distance
+        self.min_confidence = min_confidence
+        self._lru = LruCache(max_entries, on_evict=self._drop)
+        self._lock = threading.Lock()
+        # aspect → {key: mảng bit packed} cho tra gần đúng (dòng không có số)
+        self._buckets = {}
+        self.near_hits = 0
+
+    def __len__(self) -> int:
+        return len(self._lru)
+
+    def _drop(self, key, _value) -> None:
+        with self._lock:
+            bucket = self._buckets.get(key[0])
+            if bucket is not None:
+                bucket.pop(key, None)
+
+    def _nearest(self, key) -> Optional[tuple]:
+        with self._lock:
+            bucket = self._buckets.get(key[0])
+            if not bucket:
+                return None
+            keys = list(bucket)
+            stacked = np.stack([bucket[k] for k in keys])
+        query = np.frombuffer(key[1], dtype=np.uint8)
+        union = _popcount(stacked | query)
+        dist = _popcount(stacked ^ query) / np.maximum(union, 1)
+        best = int(np.argmin(dist))
+        if dist[best] <= self.max_distance:
+            return keys[best]
+        return None
+
+    def lookup(self, key) -> Optional[tuple]:
+        """(text, confidence) nếu key (từ line_hash) trùng/gần trùng, else None."""
+        if key is None:
+            self._lru.record(hit=False)
+            return None
+        value = self._lru.peek(key)
+        if value is None and self.max_distance > 0:
+            near = self._nearest(key)
+            if near is not None:
+                value = self._lru.peek(near)
+                if value is not None:
+                    self.near_hits += 1
+                    key = near
+        self._lru.record(hit=value is not None)
+        if value is not None:
+            self._lru.touch(key)
+        return value
+
+    def store(self, key, text: str, confidence: float) -> None:
+        if key is None or not text or confidence < self.min_confidence:
+            return
+        if self.max_distance > 0 and not any(ch.isdigit() for ch in text):
+            with self._lock:
+                self._buckets.setdefault(key[0], {})[key] = np.frombuffer(
+                    key[1], dtype=np.uint8
+                )
+        self._lru.put(key, (text, float(confidence)))
+
+    def stats(self) -> dict:
+        return {**self._lru.stats(), "near_hits": self.near_hits}
@@ -0,0 +1,176 @@
+"""
+line_merge.py — Gộp polygon bị PaddleOCR tách rời trên cùng 1 dòng, TRƯỚC
+khi VietOCR.
+
+PaddleOCR đôi khi tách 1 dòng logic thành nhiều polygon (vd. "Paracetamol"
+và "500mg"). Mỗi mảnh tốn 1 lượt VietOCR, rồi group_by_stt lại phải ghép
+lại. Pass này chỉ dùng hình học:
+    1. Spatial index: lưới ô vuông cạnh CELL_RATIO × median chiều cao dòng
+       → mỗi polygon chỉ so với polygon ở các ô lân cận (không O(n²)).
+    2. Cặp được gộp khi cùng hàng (chồng theo Y ≥ MIN_ROW_OVERLAP, chiều cao
+       tương đương), khe X ≤ MAX_GAP_RATIO × chiều cao và KHÔNG có ranh giới
+       cột (_detect_dynamic_col_bounds_polys; không dò được → FALLBACK_BOUNDS
+       tương đối như group_by_stt) nằm giữa 2 mảnh → tên thuốc, số lượng vẫn
+       là các crop riêng.
+    3. Ô STT (polygon hẹp ở cột 0, như STT candidates của line_pruning) không
+       bao giờ bị gộp: bảng 5 cột có thể không có ranh giới STT→tên trong
+       top gap, mà crop "1 Paracetamol" không còn khớp anchor ^\\d+$.
+    4. Nhóm (union-find) → 1 polygon minAreaRect bao các mảnh (giữ độ nghiêng).
+"""
+
+from collections import defaultdict
+
+import cv2
+import numpy as np
+
+from core.phase_a.s3_ocr.layout import FALLBACK_BOUNDS
+from core.phase_a.s3_ocr.line_pruning import STT_MAX_ASPECT
+
+# Cùng hàng: chồng Y / chiều cao nhỏ hơn, tỉ lệ chiều cao nhỏ / lớn
+MIN_ROW_OVERLAP = 0.6
+MIN_HEIGHT_RATIO = 0.6
+# Khe X tối đa giữa 2 mảnh (× chiều cao dòng lớn hơn); khe giữa 2 từ ~0.3-0.5
+MAX_GAP_RATIO = 0.8
+# Cạnh ô lưới spatial index (× median chiều cao)
+CELL_RATIO = 4.0
+
+
+def _boxes(polys):
+    pts = [np.asarray(p) for p in polys]
+    return np.array(
+        [[p[:, 0].min(), p[:, 1].min(), p[:, 0].max(), p[:, 1].max()] for p in pts],
+        dtype=np.float64,
+    ).reshape(-1, 4)
+
+
+def _same_line(a, b) -> bool:
+    """a, b: [x1, y1, x2, y2]."""
+    ha, hb = max(a[3] - a[1], 1.0), max(b[3] - b[1], 1.0)
+    low, high = min(ha, hb), max(ha, hb)
+    if low / high < MIN_HEIGHT_RATIO:
+        return False
+    iy = min(a[3], b[3]) - max(a[1], b[1])
+    if iy / low < MIN_ROW_OVERLAP:
+        return False
+    gap = max(a[0], b[0]) - min(a[2], b[2])  # < 0 nếu chồng theo X
+    return gap <= MAX_GAP_RATIO * high
+
+
+def _crosses_bound(a, b, col_bounds) -> bool:
+    """True nếu có ranh giới cột nằm giữa tâm X của 2 mảnh."""
+    if not col_bounds:
+        return False
+    left, right = sorted(((a[0] + a[2]) / 2.0, (b[0] + b[2]) / 2.0))
+    return any(left < bound < right for bound in col_bounds)
+
+
+def _union_poly(polys: list) -> list:
+    pts = np.concatenate([np.asarray(p, dtype=np.float32) for p in polys])
+    box = cv2.boxPoints(cv2.minAreaRect(pts))
+    return [[int(round(x)), int(round(y))] for x, y in box]
+
+
+def _fallback_bounds(boxes) -> list:
+    """FALLBACK_BOUNDS (tỉ lệ theo bề rộng bảng) → X tuyệt đối."""
+    min_x = boxes[:, 0].min()
+    board_width = max(boxes[:, 2].max() - min_x, 1.0)
+    return [float(min_x + r * board_width) for r in FALLBACK_BOUNDS]
+
+
+def _stt_cells(boxes, col_bounds) -> set:
+    """Polygon hẹp (width ≤ STT_MAX_ASPECT × height) có tâm X ở cột 0."""
+    xc = (boxes[:, 0] + boxes[:, 2]) / 2.0
+    widths = boxes[:, 2] - boxes[:, 0]
+    heights = np.maximum(boxes[:, 3] - boxes[:, 1], 1.0)
+    narrow = (xc <= col_bounds[0]) & (widths <= STT_MAX_ASPECT * heights)
+    return set(np.flatnonzero(narrow).tolist())
+
+
+def merge_groups(polys: list, col_bounds=None, protected=()) -> list:
+    """
+    Nhóm các polygon cùng dòng, cùng cột.
+
+    Args:
+        col_bounds: Ranh giới cột (X tuyệt đối); mảnh 2 bên không gộp.
+        protected:  Index polygon luôn đứng riêng (ô STT).
+
+    Returns:
+        List nhóm index (mỗi nhóm sắp theo X), theo thứ tự index nhỏ nhất.
+    """
+    if len(polys) < 2:
+        return [[i] for i in range(len(polys))]
+    boxes = _boxes(polys)
+    heights = boxes[:, 3] - boxes[:, 1]
+    cell = CELL_RATIO * max(float(np.median(heights)), 1.0)
+
+    # Spatial index: ô lưới → index polygon (polygon nới rộng theo khe tối đa)
+    grid = defaultdict(list)
+    spans = []
+    for i, (x1, y1, x2, y2) in enumerate(boxes):
+        reach = MAX_GAP_RATIO * max(y2 - y1, 1.0)
+        span = (
+            int((x1 - reach) // cell), int(y1 // cell),
+            int((x2 + reach) // cell), int(y2 // cell),
+        )
+        spans.append(span)
+        for gx in range(span[0], span[2] + 1):
+            for gy in range(span[1], span[3] + 1):
+                grid[gx, gy].append(i)
+
+    protected = set(protected)
+    parent = list(range(len(polys)))
+
+    def find(i):
+        while parent[i] != i:
+            parent[i] = parent[parent[i]]
+            i = parent[i]
+        return i
+
+    for i, (gx1, gy1, gx2, gy2) in enumerate(spans):
+        if i in protected:
+            continue
+        near = {
+            j
+            for gx in range(gx1, gx2 + 1)
+            for gy in range(gy1, gy2 + 1)
+            for j in grid[gx, gy]
+            if j > i and j not in protected
+        }
+        for j in sorted(near):
+            if find(i) == find(j):
+                continue
+            if _same_line(boxes[i], boxes[j]) and not _crosses_bound(
+                boxes[i], boxes[j], col_bounds
+            ):
+                parent[find(j)] = find(i)
+
+    groups = defaultdict(list)
+    for i in range(len(polys)):
+        groups[find(i)].append(i)
+    return [
+        sorted(members, key=lambda i: boxes[i, 0])
+        for members in sorted(groups.values(), key=min)
+    ]
+
+
+def merge_fragments(polys: list, num_cols: int = 4):
+    """
+    Gộp mảnh cùng dòng trong 1 cột; ô STT giữ nguyên.
+
+    Returns:
+        (polys đã gộp, groups) — groups[k] = index polys gốc tạo nên polygon k.
+    """
+    from core.phase_a.s3_ocr.ocr_engine import _detect_dynamic_col_bounds_polys
+
+    if len(polys) < 2:
+        return list(polys), [[i] for i in range(len(polys))]
+    boxes = _boxes(polys)
+    col_bounds = _detect_dynamic_col_bounds_polys(polys, num_cols=num_cols)
+    if not col_bounds:
+        col_bounds = _fallback_bounds(boxes)
+    groups = merge_groups(polys, col_bounds, protected=_stt_cells(boxes, col_bounds))
+    merged = [
+        polys[g[0]] if len(g) == 1 else _union_poly([polys[i] for i in g])
+        for g in groups
+    ]
+    return merged, groups
@@ -0,0 +1,136 @@
+"""
+line_pruning.py — Loại polygon không thuộc bảng thuốc TRƯỚC khi VietOCR.
+
+Phần lớn dòng PaddleOCR detect được nằm ngoài bảng thuốc: header (bệnh viện,
+thông tin bệnh nhân), footer (lời dặn, chữ ký) và các đốm nhiễu nhỏ. Text
+của chúng bị NerPostFilter.HEADER_RE loại sau NER, nên nhận dạng là lãng phí.
+
+Pass này chỉ dùng hình học + layout (không cần text):
+    1. Speck: cao < MIN_LINE_HEIGHT px. Không lọc theo diện tích: ô STT /
+       số lượng 1-2 chữ số nhỏ hơn ô tên thuốc, header hàng chục lần.
+    2. STT candidates: polygon hẹp ở cột 0 (ranh giới cột như group_by_stt)
+       → caller nhận dạng trước để tìm anchor STT.
+    3. Có anchor: bỏ dòng phía trên anchor đầu (header) và các dòng sau khoảng
+       trống lớn bên dưới anchor cuối (footer/chữ ký).
+       Không có anchor → chỉ bỏ specks (group_by_stt cũng sẽ fallback).
+"""
+
+import re
+from dataclasses import dataclass, field
+
+import numpy as np
+
+# Dòng thấp hơn (px) → đốm nhiễu / gạch chân
+MIN_LINE_HEIGHT = 8
+# STT: width ≤ tỉ lệ này × height ("1".."20")
+STT_MAX_ASPECT = 3.0
+# Fallback cột 0 khi không dò được ranh giới cột (giống group_by_stt)
+STT_FALLBACK_COL_RATIO = 0.13
+# Header: y-center < anchor đầu − margin (≥ 20px như group_by_stt)
+HEADER_MARGIN_RATIO = 1.0
+# Footer: khoảng trống dọc > tỉ lệ này × median height sau anchor cuối
+FOOTER_GAP_RATIO = 2.5
+
+STT_RE = re.compile(r"^\d+$")
+
+
+@dataclass
+class PrunePlan:
+    """Chỉ số polygon theo nhóm (index vào list polys gốc)."""
+
+    specks: list = field(default_factory=list)
+    candidates: list = field(default_factory=list)  # STT cột 0 — nhận dạng trước
+    rest: list = field(default_factory=list)
+    median_height: float = 0.0
+
+
+def _poly_box(poly):
+    xs = [pt[0] for pt in poly]
+    ys = [pt[1] for pt in poly]
+    return min(xs), min(ys), max(xs), max(ys)
+
+
+def plan_pruning(polys: list) -> PrunePlan:
+    """Tách specks + STT candidates khỏi phần còn lại."""
+    from core.phase_a.s3_ocr.ocr_engine import _detect_dynamic_col_bounds_polys
+
+    plan = PrunePlan()
+    if not polys:
+        return plan
+
+    boxes = [_poly_box(p) for p in polys]
+    heights = np.array([y2 - y1 for _, y1, _, y2 in boxes], dtype=np.float64)
+
+    kept = []
+    for i in range(len(polys)):
+        if heights[i] < MIN_LINE_HEIGHT:
+            plan.specks.append(i)
+        else:
+            kept.append(i)
+    if not kept:
+        return plan
+    plan.median_height = float(np.median(heights[kept]))
+
+    col_bounds = _detect_dynamic_col_bounds_polys([polys[i] for i in kept], num_cols=4)
+    min_x = min(boxes[i][0] for i in kept)
+    board_width = max(max(boxes[i][2] for i in kept) - min_x, 1)
+
+    for i in kept:
+        x1, y1, x2, y2 = boxes[i]
+        xc = (x1 + x2) / 2.0
+        if col_bounds:
+            in_col0 = xc <= col_bounds[0]
+        else:
+            in_col0 = (xc - min_x) / board_width <= STT_FALLBACK_COL_RATIO
+        if in_col0 and (x2 - x1) <= STT_MAX_ASPECT * max(y2 - y1, 1):
+            plan.candidates.append(i)
+        else:
+            plan.rest.append(i)
+    return plan
+
+
+def table_band(polys: list, plan: PrunePlan, anchor_idx: list):
+    """
+    Chia plan.rest thành (keep, pruned) theo vị trí so với anchor STT.
+
+    Args:
+        polys:      Polygon gốc.
+        plan:       Kết quả plan_pruning().
+        anchor_idx: Index các candidate nhận dạng ra số nguyên thuần.
+    Returns:
+        (keep, pruned) — list index; specks luôn nằm trong pruned.
+    """
+    if not anchor_idx:
+        return list(plan.rest), list(plan.specks)
+
+    def _yc(i):
+        _, y1, _, y2 = _poly_box(polys[i])
+        return (y1 + y2) / 2.0
+
+    anchor_ycs = sorted(_yc(i) for i in anchor_idx)
+    margin = max(20.0, HEADER_MARGIN_RATIO * plan.median_height)
+    top = anchor_ycs[0] - margin
+
+    # Footer: đi xuống từ anchor cuối, cắt tại khoảng trống lớn đầu tiên
+    bottom = float("inf")
+    below = sorted(
+        (_poly_box(polys[i]) for i in plan.rest if _yc(i) > anchor_ycs[-1]),
+        key=lambda box: box[1],
+    )
+    last_anchor = max(anchor_idx, key=_yc)
+    current_bottom = _poly_box(polys[last_anchor])[3]
+    max_gap = FOOTER_GAP_RATIO * max(plan.median_height, 1.0)
+    for _, y1, _, y2 in below:
+        if y1 - current_bottom > max_gap:
+            bottom = y1
+            break
+        current_bottom = max(current_bottom, y2)
+
+    keep, pruned = [], list(plan.specks)
+    for i in plan.rest:
+        _, y1, _, _ = _poly_box(polys[i])
+        if _yc(i) < top or y1 >= bottom:
+            pruned.append(i)
+        else:
+            keep.append(i)
+    return keep, pruned
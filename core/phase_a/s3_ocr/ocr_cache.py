@@ -0,0 +1,154 @@
+"""
+ocr_cache.py — Cache kết quả detect/recognize trên đĩa, key theo nội dung ảnh.
+
+Key = hash(ảnh đã preprocess) + fingerprint model (tên model, profile,
+mtime weights, ...) → đổi model/weights là tự miss, không cần xoá tay.
+
+Mỗi entry là 1 file JSON nhỏ trong `<cache_dir>/<2 ký tự đầu>/<key>.json`.
+Tổng dung lượng bị chặn bởi max_bytes: vượt ngưỡng thì xoá entry có mtime
+cũ nhất (get() cập nhật mtime → LRU) cho tới khi còn ~90% ngưỡng.
+
+Dùng để lặp nhanh trên grouping/NER/lookup với cùng bộ ảnh data/input
+(`--ocr-cache` trong run_pipeline.py / benchmark_pipeline.py).
+"""
+
+import hashlib
+import json
+import logging
+import os
+import tempfile
+import threading
+from typing import Optional
+
+import numpy as np
+
+from core.config import OCR_CACHE_DIR, OCR_CACHE_MAX_MB
+
+logger = logging.getLogger(__name__)
+
+# Sau eviction giữ lại tỉ lệ này của max_bytes (tránh evict mỗi lần put)
+EVICT_TARGET_RATIO = 0.9
+
+
+def image_digest(image: np.ndarray) -> str:
+    """Hash nội dung ảnh (shape + dtype + bytes)."""
+    h = hashlib.blake2b(digest_size=20)
+    h.update(f"{image.shape}|{image.dtype}".encode())
+    h.update(np.ascontiguousarray(image).data)
+    return h.hexdigest()
+
+
+class OcrDiskCache:
+    """
+    Cache JSON trên đĩa với eviction theo dung lượng (LRU theo mtime).
+
+    Args:
+        cache_dir: Thư mục cache (mặc định OCR_CACHE_DIR).
+        max_mb:    Dung lượng tối đa (MB).
+    """
+
+    def __init__(self, cache_dir: str = OCR_CACHE_DIR, max_mb: float = OCR_CACHE_MAX_MB):
+        self.cache_dir = os.path.expanduser(cache_dir)
+        self.max_bytes = int(max_mb * 1024 * 1024)
+        self._lock = threading.Lock()
+        self._size = None  # bytes, tính lazy ở lần put đầu
+        os.makedirs(self.cache_dir, exist_ok=True)
+
+    @staticmethod
+    def make_key(*parts) -> str:
+        h = hashlib.blake2b(digest_size=20)
+        for part in parts:
+            h.update(str(part).encode("utf-8"))
+            h.update(b"\0")
+        return h.hexdigest()
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.cache_dir, key[:2], f"{key}.json")
+
+    def get(self, key: str):
+        path = self._path(key)
+        try:
+            with open(path, encoding="utf-8") as f:
+                value = json.load(f)
+        except FileNotFoundError:
+            return None
+        except (OSError, ValueError) as e:
+            logger.warning(f"OCR cache entry unreadable ({path}): {e}")
+            return None
+        try:
+            os.utime(path)
+        except OSError:
+            pass
+        return value
+
+    def put(self, key: str, value) -> None:
+        path = self._path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        data = json.dumps(value, ensure_ascii=False).encode("utf-8")
+        fd, tmp = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(data)
+            old = os.path.getsize(path) if os.path.exists(path) else 0
+            os.replace(tmp, path)
+        except OSError as e:
+            logger.warning(f"OCR cache write failed ({path}): {e}")
+            if os.path.exists(tmp):
+                os.remove(tmp)
+            return
+
+        with self._lock:
+            if self._size is None:
+                self._size = self._scan_size()
+            else:
+                self._size += len(data) - old
+            if self._size > self.max_bytes:
+                self._evict()
+
+    def _entries(self):
+        for root, _, files in os.walk(self.cache_dir):
+            for name in files:
+                if name.endswith(".json"):
+                    path = os.path.join(root, name)
+                    try:
+                        st = os.stat(path)
+                    except OSError:
+                        continue
+                    yield st.st_mtime, st.st_size, path
+
+    def _scan_size(self) -> int:
+        return sum(size for _, size, _ in self._entries())
+
+    def _evict(self) -> None:
+        target = int(self.max_bytes * EVICT_TARGET_RATIO)
+        entries = sorted(self._entries())
+        size = sum(e[1] for e in entries)
+        removed = 0
+        for _, entry_size, path in entries:
+            if size <= target:
+                break
+            try:
+                os.remove(path)
+            except OSError:
+                continue
+            size -= entry_size
+            removed += 1
+        self._size = size
+        logger.info(f"OCR cache evicted {removed} entries → {size / 1e6:.1f}MB")
+
+    def clear(self) -> None:
+        with self._lock:
+            for _, _, path in list(self._entries()):
+                try:
+                    os.remove(path)
+                except OSError:
+                    pass
+            self._size = 0
+
+
+def weights_stamp(path: Optional[str]) -> str:
+    """mtime + size của file weights (rỗng nếu không có file local)."""
+    if path and os.path.isfile(path):
+        st = os.stat(path)
+        return f"{int(st.st_mtime)}:{st.st_size}"
+    return ""
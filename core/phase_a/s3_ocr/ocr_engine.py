@@ -11,6 +11,23 @@ Improvements v5:
 - C3: PaddleOCR PP-OCRv5 thay CRAFT (line-level, tách STT riêng)
 - C2: Crop padding ±5px (giữ nét biên chữ)
 - C1: VietOCR beamsearch=False (tránh hallucination)
+- R1: Greedy decode có KV-cache (fast_decode.py), khớp token-by-token
+- R2: Line pruning trước recognize (line_pruning.py, opt-in prune_lines)
+- R3: Confidence thật từ greedy; beam search chọn lọc cho tên thuốc
+      confidence thấp (rerecognize.py, opt-in rerec_threshold)
+- R4: Cache detect/recognize trên đĩa theo hash ảnh + fingerprint model
+      (ocr_cache.py, opt-in cache_dir)
+- D1: Detector profile cpu_onednn (oneDNN + input cố định, self-test
+      so với đường thường; det_profiles.py, opt-in det_profile)
+- D2: Detect ở độ phân giải theo chiều cao dòng, polygon scale về ảnh gốc
+      (det_scale.py, opt-in adaptive_det)
+- D3: Scan rất lớn → detect theo tile chồng lấn, ghép polygon bị cắt ở mép
+      tile (det_tiles.py, opt-in tiled_det)
+- D4: Gộp polygon bị tách trên cùng dòng, trong cùng cột, trước recognize
+      (line_merge.py, opt-in merge_fragments)
+- R5: Cache nhận dạng theo perceptual hash crop dòng cho text in sẵn lặp
+      lại giữa các đơn (line_cache.py, opt-in line_cache_size)
+- extract_many(): nhiều trang → 1 lần detect + batch recognize chung
 """
 
 import json
@@ -43,16 +60,17 @@ def _order_points(pts: np.ndarray) -> np.ndarray:
     return rect
 
 
-def _crop_polygon(image: np.ndarray, poly_pts: list) -> Optional[np.ndarray]:
+def _crop_polygon(
+    image: np.ndarray, poly_pts: list, pad: int = CROP_PADDING
+) -> Optional[np.ndarray]:
     """Crop vùng text theo bbox polygon.
 
     - 4 điểm: dùng Perspective Transform (chính xác cho chữ nghiêng).
     - Khác 4 điểm: fallback về boundingRect.
-    - Có padding ±CROP_PADDING px.
+    - Có padding ±pad px (mặc định CROP_PADDING).
     """
     try:
         pts = np.array(poly_pts, dtype=np.float32)
-        pad = CROP_PADDING
 
         if len(pts) == 4:
             # ── Perspective Transform (VĐ1 fix) ──
@@ -111,26 +129,81 @@ def _crop_polygon(image: np.ndarray, poly_pts: list) -> Optional[np.ndarray]:
             return None
 
 
+def _offset_polys(polys: list, dx: int, dy: int) -> list:
+    return [[[pt[0] + dx, pt[1] + dy] for pt in poly] for poly in polys]
+
+
 class HybridOcrModule(BaseOCR):
     """
     Hybrid OCR: PaddleOCR detect + VietOCR recognize (batch).
 
     Args:
         device:         'cpu' hoặc 'gpu'
-        vietocr_model:  'vgg_transformer' (mặc định)
+        vietocr_model:  None = model của rec_profile ('vgg_transformer' với
+                        'fp32'); truyền khác model của profile ≠ 'fp32'
+                        → ValueError
         batch_size:     Số region VietOCR xử lý cùng lúc
         det_model:      PaddleOCR detection model name
+        rec_decoder:    'kv_cache' (mặc định, greedy có KV-cache) hoặc
+                        'vietocr' (translate() gốc của VietOCR)
+        rec_profile:    'fp32' | 'int8' | 'seq2seq' | 'onnx_cnn' | 'cpu_fast'
+                        (xem rec_profiles.py). Profile 'seq2seq' dùng
+                        'vgg_seq2seq'.
+        prune_lines:    True → chỉ nhận dạng dòng thuộc bảng thuốc (theo
+                        anchor STT); dòng bị bỏ lưu ở result.pruned_polys.
+        rerec_threshold:    Confidence dưới ngưỡng này → dòng tên thuốc được
+                            thử lại bằng beam search / crop rộng hơn
+                            (None = tắt).
+        rerec_max_fraction: Tối đa tỉ lệ dòng được nhận dạng lại mỗi ảnh.
+        det_profile:    'default' | 'cpu_onednn' (xem det_profiles.py);
+                        None = PADDLE_CPU_PROFILE trong config.
+        adaptive_det:   True → chọn độ phân giải detect theo chiều cao dòng
+                        (det_scale.py); None = OCR_ADAPTIVE_DET trong config.
+        tiled_det:      True → ảnh có cạnh dài > TILE_TRIGGER_SIDE được detect
+                        theo tile chồng lấn rồi ghép (det_tiles.py);
+                        None = OCR_TILED_DET trong config.
+        merge_fragments: True → gộp mảnh cùng dòng/cùng cột sau detect
+                        (line_merge.py) → ít crop hơn, dài hơn cho VietOCR;
+                        None = OCR_MERGE_FRAGMENTS trong config.
+        cache_dir:      Thư mục cache detect/recognize trên đĩa (None = tắt).
+                        Cache hit thì không cần load PaddleOCR/VietOCR.
+        cache_max_mb:   Dung lượng tối đa của cache (MB).
+        line_cache_size: Số dòng tối đa trong cache nhận dạng theo
+                        perceptual hash (0 = tắt). Dùng chung giữa các ảnh.
     """
 
+    REC_DECODERS = ("kv_cache", "vietocr")
+
     def __init__(
         self,
-        vietocr_model: str = "vgg_transformer",
+        vietocr_model: Optional[str] = None,
         device: str = "gpu",
         batch_size: int = 32,
         det_model: str = "PP-OCRv5_mobile_det",
+        rec_decoder: str = "kv_cache",
+        rec_profile: str = "fp32",
+        prune_lines: bool = False,
+        rerec_threshold: Optional[float] = None,
+        rerec_max_fraction: float = 0.1,
+        det_profile: Optional[str] = None,
+        adaptive_det: Optional[bool] = None,
+        tiled_det: Optional[bool] = None,
+        merge_fragments: Optional[bool] = None,
+        cache_dir: Optional[str] = None,
+        cache_max_mb: Optional[float] = None,
+        line_cache_size: int = 0,
     ):
         import torch
 
+        from core.config import (
+            OCR_ADAPTIVE_DET,
+            OCR_MERGE_FRAGMENTS,
+            OCR_TILED_DET,
+            PADDLE_CPU_PROFILE,
+        )
+        from core.phase_a.s3_ocr.det_profiles import resolve_det_profile
+        from core.phase_a.s3_ocr.rec_profiles import resolve_profile
+
         if device in ("cuda", "gpu"):
             self._use_gpu = torch.cuda.is_available()
             self._torch_device = "cuda" if self._use_gpu else "cpu"
@@ -139,38 +212,107 @@ class HybridOcrModule(BaseOCR):
             self._torch_device = "cpu"
         self._paddle_device = "gpu" if self._use_gpu else "cpu"
 
+        if rec_decoder not in self.REC_DECODERS:
+            raise ValueError(
+                f"rec_decoder must be one of {self.REC_DECODERS}, got {rec_decoder!r}"
+            )
+        self._rec_decoder = rec_decoder
+        self._rec_profile = resolve_profile(rec_profile)
+        profile_model = self._rec_profile["model"]
+        if vietocr_model is None:
+            vietocr_model = profile_model
+        elif rec_profile != "fp32" and vietocr_model != profile_model:
+            raise ValueError(
+                f"vietocr_model={vietocr_model!r} conflicts with "
+                f"rec_profile={rec_profile!r} (uses {profile_model!r})"
+            )
         self._vietocr_model_name = vietocr_model
         self._batch_size = batch_size
         self._det_model = det_model
+        self._det_profile = resolve_det_profile(det_profile or PADDLE_CPU_PROFILE)
+        # Profile cấu hình (không đổi khi self-test lùi về default) — khoá cache
+        self._det_profile_name = self._det_profile["name"]
+        self._adaptive_det = OCR_ADAPTIVE_DET if adaptive_det is None else adaptive_det
+        if self._adaptive_det and self._det_profile.get("pin_side"):
+            logger.warning(
+                f"adaptive_det bị bỏ qua: det_profile={self._det_profile['name']}"
+                f" cố định kích thước input"
+            )
+            self._adaptive_det = False
+        self._tiled_det = OCR_TILED_DET if tiled_det is None else tiled_det
+        self._merge_fragments = (
+            OCR_MERGE_FRAGMENTS if merge_fragments is None else merge_fragments
+        )
+        self._prune_lines = prune_lines
+        self._rerec_threshold = rerec_threshold
+        self._rerec_max_fraction = rerec_max_fraction
         self._rec_engine = None  # VietOCR (lazy)
         self._det_engine = None  # PaddleOCR (lazy)
+        self._cache = None
+        if cache_dir:
+            from core.phase_a.s3_ocr.ocr_cache import OcrDiskCache
+
+            kwargs = {} if cache_max_mb is None else {"max_mb": cache_max_mb}
+            self._cache = OcrDiskCache(cache_dir, **kwargs)
+            logger.info(f"OCR cache: {self._cache.cache_dir}")
+        self._line_cache = None
+        if line_cache_size > 0:
+            from core.phase_a.s3_ocr.line_cache import LineRecognitionCache
+
+            self._line_cache = LineRecognitionCache(max_entries=line_cache_size)
         logger.info(
             f"HybridOcrModule init: "
-            f"det={det_model}, rec={vietocr_model}, "
+            f"det={det_model}, rec={vietocr_model} "
+            f"({rec_profile}, {rec_decoder}), "
             f"device={self._paddle_device}"
         )
 
     # ── PaddleOCR Detection (C3) ──────────────────────────
 
     def _ensure_detector(self):
-        """Lazy load PaddleOCR PP-OCRv5 detection."""
+        """Lazy load PaddleOCR PP-OCRv5 detection (theo det_profile, cache theo process)."""
         if self._det_engine is not None:
             return
 
         os.environ["PADDLE_PDX_DISABLE_MODEL_SOURCE_CHECK"] = "True"
 
-        from paddleocr import PaddleOCR
+        from core.phase_a.s3_ocr.det_profiles import load_detector
+        from core.shared.thread_budget import paddle_cpu_threads
+
+        cpu_threads = None if self._use_gpu else paddle_cpu_threads()
+        logger.info(
+            f"Loading PaddleOCR: {self._det_model} on {self._paddle_device}"
+            f" (profile={self._det_profile['name']})"
+        )
+        self._det_engine, self._det_profile = load_detector(
+            self._det_model, self._paddle_device, self._det_profile_name, cpu_threads
+        )
+        logger.info(f"PaddleOCR detector ready (profile={self._det_profile['name']}).")
+
+    # ── Disk cache (R4) ───────────────────────────────────
+
+    def _det_fingerprint(self) -> str:
+        from importlib.metadata import PackageNotFoundError, version
+
+        try:
+            paddle_version = version("paddleocr")
+        except PackageNotFoundError:
+            paddle_version = ""
+        return (
+            f"det|{self._det_model}|{self._det_profile_name}"
+            f"|adaptive={self._adaptive_det}|tiled={self._tiled_det}"
+            f"|paddleocr={paddle_version}"
+        )
 
-        logger.info(f"Loading PaddleOCR: {self._det_model} on {self._paddle_device}")
-        self._det_engine = PaddleOCR(
-            text_detection_model_name=self._det_model,
-            use_doc_orientation_classify=False,
-            use_doc_unwarping=False,
-            use_textline_orientation=False,
-            device=self._paddle_device,
-            enable_mkldnn=False,
+    def _rec_fingerprint(self) -> str:
+        """Model + profile + decoder + weights local — không cần load VietOCR."""
+        from core.phase_a.s3_ocr.ocr_cache import weights_stamp
+
+        weights = os.path.expanduser(f"~/.config/vietocr/{self._vietocr_model_name}.pth")
+        return (
+            f"rec|{self._vietocr_model_name}|{self._rec_profile['name']}"
+            f"|{self._rec_decoder}|{weights_stamp(weights)}|pad={CROP_PADDING}"
         )
-        logger.info("PaddleOCR detector ready.")
 
     def _detect_polys(self, image: np.ndarray) -> list:
         """PaddleOCR TextDetection → line-level polygons.
@@ -178,22 +320,152 @@ class HybridOcrModule(BaseOCR):
         Line-level: 1 dòng text = 1 box.
         Không cần merge.
         """
+        polys = self._detect_polys_many([image])[0]
+        logger.info(f"PaddleOCR detected {len(polys)} text regions")
+        return polys
+
+    def _detect_polys_many(self, images: list) -> list:
+        """Detect nhiều ảnh bằng 1 lần predict của PaddleOCR → list polys theo ảnh."""
+        out = [None] * len(images)
+        keys = [None] * len(images)
+        if self._cache is not None:
+            from core.phase_a.s3_ocr.ocr_cache import image_digest
+
+            fingerprint = self._det_fingerprint()
+            for k, image in enumerate(images):
+                keys[k] = self._cache.make_key(fingerprint, image_digest(image))
+                out[k] = self._cache.get(keys[k])
+            hits = sum(polys is not None for polys in out)
+            if hits:
+                logger.info(f"PaddleOCR detect: cache hit {hits}/{len(images)} images")
+
+        todo = [k for k, polys in enumerate(out) if polys is None]
+        if not todo:
+            return out
+        tiled = []
+        if self._tiled_det:
+            from core.phase_a.s3_ocr.det_tiles import TILE_TRIGGER_SIDE
+
+            tiled = [k for k in todo if max(images[k].shape[:2]) > TILE_TRIGGER_SIDE]
+        whole = [k for k in todo if k not in tiled]
+        ok = True
+        if whole:
+            inputs = [images[k] for k in whole]
+            if self._adaptive_det:
+                detected, ok = self._detect_adaptive(inputs)
+            else:
+                detected, ok = self._detect_raw(inputs)
+            for k, polys in zip(whole, detected):
+                out[k] = polys
+        for k in tiled:
+            out[k], tile_ok = self._detect_tiled(images[k])
+            ok = ok and tile_ok
+
+        if self._cache is not None and ok:
+            for k in todo:
+                self._cache.put(keys[k], out[k])  # không cache kết quả lỗi
+        return out
+
+    def _detect_raw(self, images: list):
+        """1 lần predict PaddleOCR trên list ảnh → (list polys, ok)."""
+        from core.phase_a.s3_ocr.det_profiles import parse_polys, pin_input, unpin_polys
+
         self._ensure_detector()
-        polys = []
+        scales = [1.0] * len(images)
+        pin_side = self._det_profile.get("pin_side")
+        if pin_side:
+            # cpu_onednn: mọi ảnh cùng shape → primitive oneDNN được tái sử dụng
+            images, scales = zip(*(pin_input(image, pin_side) for image in images))
         try:
-            results = list(self._det_engine.predict(image))
-            for r in results:
-                # TextDetection output: list of dicts with 'dt_polys'
-                dt_polys = r.get("dt_polys", [])
-                for poly in dt_polys:
-                    p = poly.tolist() if hasattr(poly, "tolist") else poly
-                    pts = [[int(pt[0]), int(pt[1])] for pt in p]
-                    polys.append(pts)
+            if len(images) == 1:
+                grouped = [list(self._det_engine.predict(images[0]))]
+            else:
+                results = list(self._det_engine.predict(list(images)))
+                if len(results) != len(images):
+                    raise RuntimeError(f"{len(results)} results for {len(images)} images")
+                grouped = [[r] for r in results]
+            # TextDetection output: list of dicts with 'dt_polys'
+            return [
+                unpin_polys(parse_polys(results), scale)
+                for scale, results in zip(scales, grouped)
+            ], True
         except Exception as e:
             logger.error(f"PaddleOCR detect error: {e}")
+            return [[] for _ in images], False
 
-        logger.info(f"PaddleOCR detected {len(polys)} text regions")
-        return polys
+    def _detect_adaptive(self, images: list):
+        """
+        D2: probe nhỏ → median chiều cao dòng → detect ở scale đưa dòng về
+        TARGET_LINE_PX; polygon trả về theo toạ độ ảnh gốc (det_scale.py).
+        """
+        from core.phase_a.s3_ocr.det_profiles import unpin_polys
+        from core.phase_a.s3_ocr.det_scale import (
+            REUSE_TOLERANCE,
+            choose_scale,
+            median_line_height,
+            probe_scale,
+            resize_by,
+        )
+
+        probe_scales = [probe_scale(image.shape) for image in images]
+        probes, ok = self._detect_raw(
+            [resize_by(image, s) for image, s in zip(images, probe_scales)]
+        )
+        if not ok:
+            return probes, False
+
+        out = [unpin_polys(polys, s) for polys, s in zip(probes, probe_scales)]
+        second = []
+        for k, (image, polys, s) in enumerate(zip(images, probes, probe_scales)):
+            height = median_line_height(polys)
+            if height is None:
+                # Probe không thấy dòng nào (chữ nhỏ trên scan rất lớn) → detect
+                # 1 lần ở độ phân giải gốc như khi tắt adaptive_det
+                scale = 1.0
+                logger.info(f"Adaptive det: probe {s:.2f} found no lines → scale 1.00")
+            else:
+                scale = choose_scale(height / s, image.shape)
+                logger.info(
+                    f"Adaptive det: line height {height / s:.0f}px → scale {scale:.2f}"
+                    f" (probe {s:.2f})"
+                )
+            if abs(scale - s) > REUSE_TOLERANCE * s:
+                second.append((k, scale))
+        if second:
+            detected, ok = self._detect_raw(
+                [resize_by(images[k], scale) for k, scale in second]
+            )
+            if not ok:
+                return detected, False
+            for (k, scale), polys in zip(second, detected):
+                out[k] = unpin_polys(polys, scale)
+        return out, True
+
+    def _detect_tiled(self, image: np.ndarray):
+        """D3: tile chồng lấn, detect theo lô TILE_BATCH tile, ghép polygon."""
+        from core.phase_a.s3_ocr.det_tiles import detect_tiled
+
+        h, w = image.shape[:2]
+        polys, ok = detect_tiled(image, self._detect_raw)
+        logger.info(f"Tiled det: {w}x{h} → {len(polys)} regions")
+        return polys, ok
+
+    def _consolidate(self, polys: list) -> list:
+        """D4: gộp mảnh cùng dòng trong 1 cột (no-op nếu merge_fragments tắt)."""
+        if not self._merge_fragments or len(polys) < 2:
+            return polys
+        from core.phase_a.s3_ocr.line_merge import merge_fragments
+
+        merged, _ = merge_fragments(polys)
+        if len(merged) < len(polys):
+            logger.info(f"Merged fragments: {len(polys)} → {len(merged)} regions")
+        return merged
+
+    def _detect_polys_roi(self, image: np.ndarray, roi) -> list:
+        """Detect chỉ trong ROI (x1, y1, x2, y2), trả polys theo toạ độ ảnh gốc."""
+        x1, y1, x2, y2 = roi
+        polys = self._detect_polys(image[y1:y2, x1:x2])
+        return _offset_polys(polys, x1, y1)
 
     # ── VietOCR Recognition (C1: beamsearch) ──────────────
 
@@ -219,63 +491,175 @@ class HybridOcrModule(BaseOCR):
         else:
             logger.info("Downloading VietOCR weights...")
 
-        self._rec_engine = Predictor(config)
+        predictor = Predictor(config)
+
+        from core.phase_a.s3_ocr.rec_profiles import apply_profile
+
+        predictor = apply_profile(
+            predictor,
+            self._rec_profile,
+            weights_path=config["weights"],
+            use_gpu=self._use_gpu,
+        )
+        decoder = "vietocr"
+        if self._rec_decoder == "kv_cache":
+            from core.phase_a.s3_ocr.fast_decode import CachedGreedyRecognizer
+
+            if CachedGreedyRecognizer.supports(predictor):
+                predictor = CachedGreedyRecognizer(predictor)
+                decoder = "kv_cache"
+            else:
+                logger.info("KV-cache decode không hỗ trợ model này → translate() gốc")
+        self._rec_engine = predictor
         logger.info(
             f"VietOCR loaded: {self._vietocr_model_name}"
-            f" on {self._torch_device} (beamsearch=False)"
+            f" on {self._torch_device} (beamsearch=False, decoder={decoder},"
+            f" profile={self._rec_profile['name']})"
         )
 
     def _recognize_batch(self, image: np.ndarray, polys: list) -> list[TextBlock]:
         """
         Crop regions (C2: padding) + VietOCR batch recognize.
         """
+        return [block for _, block in self._recognize_indexed(image, polys)]
+
+    def _recognize_indexed(self, image: np.ndarray, polys: list) -> list:
+        """Như _recognize_batch, trả [(index trong polys, TextBlock)]."""
+        return self._recognize_indexed_many([image], [polys])[0]
+
+    def _recognize_indexed_many(self, images: list, polys_list: list) -> list:
+        """
+        Nhận dạng polys của nhiều ảnh, crop mọi ảnh gộp chung batch VietOCR.
+
+        Returns:
+            List theo ảnh, mỗi phần tử [(index trong polys, TextBlock)].
+        """
         from PIL import Image as PILImage
 
-        # Step 1: Crop tất cả regions
-        crops = []
-        crop_indices = []
-        for i, poly_pts in enumerate(polys):
-            cropped = _crop_polygon(image, poly_pts)
-            if cropped is not None:
-                try:
-                    rgb = cv2.cvtColor(cropped, cv2.COLOR_BGR2RGB)
-                    pil_img = PILImage.fromarray(rgb)
-                    crops.append(pil_img)
-                    crop_indices.append(i)
-                except Exception as e:
-                    logger.debug(f"Crop convert error idx={i}: {e}")
+        from core.phase_a.s3_ocr.line_cache import line_hash
 
-        if not crops:
-            return []
+        out = [None] * len(images)
+        keys = [None] * len(images)
+        if self._cache is not None:
+            from core.phase_a.s3_ocr.ocr_cache import image_digest
 
-        # Step 2: VietOCR batch predict
-        try:
-            texts = self._rec_engine.predict_batch(crops)
-        except Exception as e:
-            logger.warning(f"predict_batch failed, falling back: {e}")
-            # Fallback: predict one by one
-            texts = []
-            for pil_img in crops:
-                try:
-                    t = self._rec_engine.predict(pil_img)
-                    texts.append(str(t).strip() if t else "")
-                except Exception:
-                    texts.append("")
+            fingerprint = self._rec_fingerprint()
+            for k, (image, polys) in enumerate(zip(images, polys_list)):
+                if not polys:
+                    continue
+                keys[k] = self._cache.make_key(
+                    fingerprint, image_digest(image), json.dumps(polys, default=int)
+                )
+                cached = self._cache.get(keys[k])
+                if cached is not None:
+                    out[k] = [
+                        (idx, TextBlock(text=text, confidence=conf, bbox=polys[idx]))
+                        for idx, text, conf in cached
+                    ]
+
+        # Step 1: Crop tất cả regions (của mọi ảnh chưa có trong cache)
+        crops = []
+        owners = []  # (ảnh k, index trong polys)
+        line_keys = []
+        for k, (image, polys) in enumerate(zip(images, polys_list)):
+            if out[k] is not None:
+                continue
+            for i, poly_pts in enumerate(polys):
+                cropped = _crop_polygon(image, poly_pts)
+                if cropped is not None:
+                    try:
+                        rgb = cv2.cvtColor(cropped, cv2.COLOR_BGR2RGB)
+                        pil_img = PILImage.fromarray(rgb)
+                    except Exception as e:
+                        logger.debug(f"Crop convert error idx={i}: {e}")
+                        continue
+                    # Key None (hash lỗi) = bỏ qua cache, giữ line_keys thẳng hàng với crops
+                    line_key = None
+                    if self._line_cache is not None:
+                        try:
+                            line_key = line_hash(cropped)
+                        except Exception as e:
+                            logger.debug(f"Line hash error idx={i}: {e}")
+                    crops.append(pil_img)
+                    owners.append((k, i))
+                    line_keys.append(line_key)
+
+        # R5: dòng in sẵn đã gặp → lấy text từ cache, không qua VietOCR
+        hits = {}
+        if self._line_cache is not None:
+            for j, line_key in enumerate(line_keys):
+                hit = self._line_cache.lookup(line_key)
+                if hit is not None:
+                    hits[j] = hit
+        todo = [j for j in range(len(crops)) if j not in hits]
+
+        # Step 2: VietOCR batch predict (R3: kèm prob trung bình ký tự)
+        texts, probs = [None] * len(crops), [None] * len(crops)
+        for j, (text, prob) in hits.items():
+            texts[j], probs[j] = text, prob
+        if todo:
+            new_texts, new_probs, batch_ok = self._predict_crops([crops[j] for j in todo])
+            if not batch_ok:
+                keys = [None] * len(images)  # fallback từng ảnh — không cache disk
+            for j, text, prob in zip(todo, new_texts, new_probs):
+                texts[j], probs[j] = text, prob
+                if self._line_cache is not None:
+                    self._line_cache.store(line_keys[j], str(text).strip(), float(prob))
+        if self._line_cache is not None and crops:
+            stats = self._line_cache.stats()
+            logger.info(
+                f"Line cache: {len(hits)}/{len(crops)} hits "
+                f"(total hit rate {stats['hit_rate']:.1%}, {stats['size']} entries)"
+            )
 
         # Step 3: Build TextBlocks
-        text_blocks = []
-        for idx, text in zip(crop_indices, texts):
+        fresh = [k for k in range(len(images)) if out[k] is None]
+        for k in fresh:
+            out[k] = []
+        for (k, idx), text, prob in zip(owners, texts, probs):
             text = str(text).strip() if text else ""
             if text:
-                text_blocks.append(
-                    TextBlock(
-                        text=text,
-                        confidence=1.0,
-                        bbox=polys[idx],
+                out[k].append(
+                    (
+                        idx,
+                        TextBlock(
+                            text=text,
+                            confidence=float(prob),
+                            bbox=polys_list[k][idx],
+                        ),
                     )
                 )
 
-        return text_blocks
+        for k in fresh:
+            if keys[k] is not None:
+                self._cache.put(
+                    keys[k], [[idx, block.text, block.confidence] for idx, block in out[k]]
+                )
+        return out
+
+    def _predict_crops(self, crops: list):
+        """VietOCR batch → (texts, probs, batch_ok); lỗi batch thì predict từng ảnh."""
+        self._ensure_recognizer()
+        try:
+            texts, probs = self._rec_engine.predict_batch(crops, return_prob=True)
+            return texts, probs, True
+        except Exception as e:
+            logger.warning(f"predict_batch failed, falling back: {e}")
+        # Fallback: predict one by one
+        texts, probs = [], []
+        for pil_img in crops:
+            try:
+                t, p = self._rec_engine.predict(pil_img, return_prob=True)
+                texts.append(str(t).strip() if t else "")
+                probs.append(p)
+            except Exception:
+                texts.append("")
+                probs.append(0.0)
+        return texts, probs, False
+
+    def line_cache_stats(self) -> Optional[dict]:
+        """Thống kê hit-rate của line cache (None nếu tắt)."""
+        return self._line_cache.stats() if self._line_cache is not None else None
 
     # ── Main Entry Point ──────────────────────────────────
 
@@ -284,6 +668,7 @@ class HybridOcrModule(BaseOCR):
         image: np.ndarray,
         input_type: str = "",
         paddle_json_path: Optional[str] = None,
+        roi: Optional[tuple] = None,
     ) -> OcrResult:
         """
         PaddleOCR detect → VietOCR recognize.
@@ -292,22 +677,37 @@ class HybridOcrModule(BaseOCR):
             image:            Ảnh BGR numpy array.
             input_type:       Ghi vào kết quả.
             paddle_json_path: Load polys từ JSON (skip detect).
+            roi:              (x1, y1, x2, y2) vùng bảng thuốc — chỉ detect
+                              + recognize trong ROI, bbox vẫn theo ảnh gốc.
         """
-        self._ensure_recognizer()
+        if self._cache is None:
+            self._ensure_recognizer()
         t_start = time.time()
 
         # Step 1: Get polygons
         if paddle_json_path:
             polys = self._load_polys_from_json(paddle_json_path)
+        elif roi is not None:
+            t_det = time.time()
+            polys = self._detect_polys_roi(image, roi)
+            det_ms = (time.time() - t_det) * 1000
+            logger.info(f"Detection (ROI {roi}): {len(polys)} regions in {det_ms:.0f}ms")
         else:
             t_det = time.time()
             polys = self._detect_polys(image)
             det_ms = (time.time() - t_det) * 1000
             logger.info(f"Detection: {len(polys)} regions in {det_ms:.0f}ms")
+        polys = self._consolidate(polys)
 
         # Step 2: Batch recognize
         t_rec = time.time()
-        text_blocks = self._recognize_batch(image, polys)
+        pruned_polys = []
+        if self._prune_lines:
+            text_blocks, pruned_polys = self._recognize_table_lines(image, polys)
+        else:
+            text_blocks = self._recognize_batch(image, polys)
+        if self._rerec_threshold is not None:
+            self._rerecognize(image, text_blocks)
         rec_ms = (time.time() - t_rec) * 1000
         logger.info(f"Recognition: {len(text_blocks)} blocks in {rec_ms:.0f}ms")
 
@@ -322,6 +722,182 @@ class HybridOcrModule(BaseOCR):
             module_name="hybrid",
             input_type=input_type,
             elapsed_ms=elapsed,
+            pruned_polys=pruned_polys,
+        )
+
+    def extract_many(
+        self,
+        images: list,
+        input_type: str = "",
+        rois: Optional[list] = None,
+    ) -> list:
+        """
+        Nhiều ảnh/trang: PaddleOCR predict 1 lần trên cả list, crop của mọi
+        trang gộp chung batch VietOCR, rồi tách lại thành OcrResult theo ảnh.
+
+        Args:
+            images:     List ảnh BGR.
+            input_type: Ghi vào mọi kết quả.
+            rois:       List (x1, y1, x2, y2) hoặc None cho từng ảnh (xem extract).
+        Returns:
+            List OcrResult theo thứ tự images. elapsed_ms mỗi ảnh = thời gian
+            detect chia đều + thời gian recognize chia theo số region.
+        """
+        if not images:
+            return []
+        if self._cache is None:
+            self._ensure_recognizer()
+        rois = list(rois) if rois is not None else [None] * len(images)
+        if len(rois) != len(images):
+            raise ValueError(f"{len(rois)} rois for {len(images)} images")
+
+        # Step 1: Detect (1 lần predict cho cả list)
+        t_det = time.time()
+        det_inputs = [
+            image if roi is None else image[roi[1] : roi[3], roi[0] : roi[2]]
+            for image, roi in zip(images, rois)
+        ]
+        polys_list = [
+            self._consolidate(
+                polys if roi is None else _offset_polys(polys, roi[0], roi[1])
+            )
+            for polys, roi in zip(self._detect_polys_many(det_inputs), rois)
+        ]
+        det_ms = (time.time() - t_det) * 1000
+        total_regions = sum(len(polys) for polys in polys_list)
+        logger.info(
+            f"Detection: {total_regions} regions / {len(images)} images in {det_ms:.0f}ms"
+        )
+
+        # Step 2: Recognize (batch chung cho mọi ảnh)
+        t_rec = time.time()
+        if self._prune_lines:
+            recognized = self._recognize_table_lines_many(images, polys_list)
+        else:
+            recognized = [
+                ([block for _, block in blocks], [])
+                for blocks in self._recognize_indexed_many(images, polys_list)
+            ]
+        if self._rerec_threshold is not None:
+            for image, (text_blocks, _) in zip(images, recognized):
+                self._rerecognize(image, text_blocks)
+        rec_ms = (time.time() - t_rec) * 1000
+        logger.info(
+            f"Recognition: {sum(len(b) for b, _ in recognized)} blocks"
+            f" / {len(images)} images in {rec_ms:.0f}ms"
+        )
+
+        results = []
+        for polys, (text_blocks, pruned_polys) in zip(polys_list, recognized):
+            share = len(polys) / total_regions if total_regions else 1 / len(images)
+            results.append(
+                OcrResult(
+                    text_blocks=text_blocks,
+                    module_name="hybrid",
+                    input_type=input_type,
+                    elapsed_ms=det_ms / len(images) + rec_ms * share,
+                    pruned_polys=pruned_polys,
+                )
+            )
+        return results
+
+    def _recognize_table_lines(self, image: np.ndarray, polys: list):
+        """
+        R2: nhận dạng STT candidates trước, rồi chỉ các dòng trong bảng thuốc.
+
+        Returns:
+            (text_blocks theo thứ tự detect, pruned_polys)
+        """
+        return self._recognize_table_lines_many([image], [polys])[0]
+
+    def _recognize_table_lines_many(self, images: list, polys_list: list) -> list:
+        """_recognize_table_lines cho nhiều ảnh — mỗi giai đoạn 1 batch chung."""
+        from core.phase_a.s3_ocr.line_pruning import STT_RE, plan_pruning, table_band
+
+        plans = [plan_pruning(polys) for polys in polys_list]
+        stage1 = self._recognize_indexed_many(
+            images,
+            [[polys[i] for i in plan.candidates] for polys, plan in zip(polys_list, plans)],
+        )
+        recognized, bands = [], []
+        for polys, plan, blocks in zip(polys_list, plans, stage1):
+            found = [(plan.candidates[j], block) for j, block in blocks]
+            anchors = [i for i, block in found if STT_RE.match(block.text)]
+            recognized.append(found)
+            bands.append((len(anchors), *table_band(polys, plan, anchors)))
+
+        stage2 = self._recognize_indexed_many(
+            images,
+            [[polys[i] for i in keep] for polys, (_, keep, _) in zip(polys_list, bands)],
+        )
+        out = []
+        for polys, plan, found, (n_anchors, keep, pruned), blocks in zip(
+            polys_list, plans, recognized, bands, stage2
+        ):
+            found += [(keep[j], block) for j, block in blocks]
+            found.sort(key=lambda item: item[0])
+            logger.info(
+                f"Line pruning: {n_anchors} STT anchors, "
+                f"recognized {len(plan.candidates) + len(keep)}/{len(polys)} regions "
+                f"({len(pruned)} pruned)"
+            )
+            out.append(([block for _, block in found], [polys[i] for i in sorted(pruned)]))
+        return out
+
+    def _rerecognize(self, image: np.ndarray, text_blocks: list) -> None:
+        """R3: beam search / crop rộng hơn cho tên thuốc confidence thấp (in-place)."""
+        from PIL import Image as PILImage
+
+        from core.phase_a.s3_ocr.rerecognize import SelectiveReRecognizer, select_lines
+
+        picked = select_lines(
+            text_blocks, self._rerec_threshold, self._rerec_max_fraction
+        )
+        if not picked:
+            return
+        self._ensure_recognizer()
+        refiner = SelectiveReRecognizer(self._rec_engine)
+        changed = 0
+        for i in picked:
+            block = text_blocks[i]
+            crops = []
+            for pad in (CROP_PADDING, CROP_PADDING * 2):
+                cropped = _crop_polygon(image, block.bbox, pad=pad)
+                if cropped is not None:
+                    crops.append(
+                        PILImage.fromarray(cv2.cvtColor(cropped, cv2.COLOR_BGR2RGB))
+                    )
+            if not crops:
+                continue
+            try:
+                text, conf = refiner.refine(crops, block.text, block.confidence)
+            except Exception as e:
+                logger.warning(f"Re-recognition failed for {block.text!r}: {e}")
+                continue
+            if text != block.text:
+                logger.debug(
+                    f"Re-recognized {block.text!r} ({block.confidence:.3f})"
+                    f" → {text!r} ({conf:.3f})"
+                )
+                changed += 1
+            block.text, block.confidence = text, conf
+        logger.info(
+            f"Re-recognition: {len(picked)}/{len(text_blocks)} lines, {changed} changed"
+        )
+
+    def recognize_pruned(self, image: np.ndarray, result: OcrResult) -> OcrResult:
+        """Nhận dạng (lazy) các dòng đã bị prune, gộp vào result theo trục Y."""
+        if not result.pruned_polys:
+            return result
+        self._ensure_recognizer()
+        extra = self._recognize_batch(image, result.pruned_polys)
+        blocks = sorted(result.text_blocks + extra, key=lambda b: _bbox_min_y(b.bbox))
+        logger.info(f"Recognized {len(extra)} pruned regions on demand")
+        return OcrResult(
+            text_blocks=blocks,
+            module_name=result.module_name,
+            input_type=result.input_type,
+            elapsed_ms=result.elapsed_ms,
         )
 
     def _load_polys_from_json(self, json_path: str) -> list:
@@ -353,17 +929,18 @@ def _detect_dynamic_col_bounds(blocks, num_cols=4):
     Tự động tìm (num_cols - 1) ranh giới cột dựa trên khoảng trống (gap)
     lớn nhất theo trục X. (Khắc phục việc hardcode tỉ lệ cứng).
     """
-    import logging
+    return _detect_dynamic_col_bounds_polys([b.bbox for b in blocks], num_cols)
 
-    logger = logging.getLogger(__name__)
 
-    if len(blocks) < num_cols:
+def _detect_dynamic_col_bounds_polys(polys, num_cols=4):
+    """Như _detect_dynamic_col_bounds nhưng nhận polygon (chưa cần text)."""
+    if len(polys) < num_cols:
         return None
 
     # Thu thập tất cả hộp bao (bounding boxes)
     all_x_bounds = []
-    for b in blocks:
-        xs = [pt[0] for pt in b.bbox]
+    for poly in polys:
+        xs = [pt[0] for pt in poly]
         min_x = min(xs)
         max_x = max(xs)
         # Chỉ xét block ngắn (ví dụ <500px) để dò gap tốt hơn
@@ -518,6 +1095,9 @@ def group_by_stt(blocks: list) -> list:
     Thứ tự đầu ra mỗi ô thuốc:
         STT | [Tên thuốc ↓ Hướng dẫn dùng] | Số lượng | Đơn vị
 
+    Tính toán trên mảng (N, 4, 2) — xem layout.py; polygon không phải
+    4 điểm dùng bản list (_group_by_stt_lists).
+
     Thuật toán (Dynamic):
         1. Tìm ranh giới cột bằng cách nhận diện các khoảng trống lớn trên trục X.
            (Nếu thất bại do ảnh mờ/lộn xộn, fallback về tỉ lệ tương đối 0.13, 0.75, 0.88).
@@ -528,10 +1108,44 @@ def group_by_stt(blocks: list) -> list:
         6. Ghép các cột từ trái sang phải, phân cách bằng " | ".
 
     Args:
-        blocks: Danh sách TextBlock từ OCR.
+        blocks: Danh sách TextBlock từ OCR, hoặc OcrResult (dùng thẳng các cột).
     Returns:
         Danh sách TextBlock đã gộp theo thứ tự ngữ nghĩa đúng.
     """
+    from core.phase_a.s3_ocr.layout import BlockLayout, group_by_stt_array
+
+    if isinstance(blocks, OcrResult):
+        result = blocks
+        if not len(result):
+            return []
+        merged = group_by_stt_array(
+            result.texts,
+            result.confidences.tolist().__getitem__,
+            BlockLayout(result.boxes),
+            lambda i: TextBlock(
+                result.texts[i],
+                float(result.confidences[i]),
+                result.boxes[i].tolist(),
+            ),
+        )
+        return result.text_blocks if merged is None else merged
+
+    if not blocks:
+        return []
+    layout = BlockLayout.from_blocks(blocks)
+    if layout is None:
+        return _group_by_stt_lists(blocks)
+    merged = group_by_stt_array(
+        [b.text for b in blocks],
+        lambda i: blocks[i].confidence,
+        layout,
+        blocks.__getitem__,
+    )
+    return blocks if merged is None else merged
+
+
+def _group_by_stt_lists(blocks: list) -> list:
+    """group_by_stt bản list-based gốc (bbox bất kỳ số điểm)."""
     import re
     from core.phase_a.s3_ocr.base import TextBlock
     import logging
@@ -0,0 +1,152 @@
+"""
+rec_profiles.py — Recognizer profiles cho VietOCR trên node CPU.
+
+Profiles (chọn qua `HybridOcrModule(rec_profile=...)`):
+    fp32      vgg_transformer fp32 (mặc định, giống trước đây)
+    int8      vgg_transformer + dynamic int8 quantization cho nn.Linear
+              của transformer (encoder/decoder FFN + fc)
+    seq2seq   vgg_seq2seq (GRU + attention, nhẹ hơn transformer)
+    onnx_cnn  vgg_transformer, CNN backbone chạy bằng ONNX Runtime
+    cpu_fast  int8 + onnx_cnn
+
+Quantization / ONNX chỉ áp dụng khi chạy CPU; trên GPU profile tự lùi về
+phần PyTorch tương ứng (có log cảnh báo).
+"""
+
+import logging
+import os
+
+import torch
+from torch import nn
+
+logger = logging.getLogger(__name__)
+
+RECOGNIZER_PROFILES = {
+    "fp32": {"model": "vgg_transformer", "int8": False, "onnx_cnn": False},
+    "int8": {"model": "vgg_transformer", "int8": True, "onnx_cnn": False},
+    "seq2seq": {"model": "vgg_seq2seq", "int8": False, "onnx_cnn": False},
+    "onnx_cnn": {"model": "vgg_transformer", "int8": False, "onnx_cnn": True},
+    "cpu_fast": {"model": "vgg_transformer", "int8": True, "onnx_cnn": True},
+}
+
+
+def resolve_profile(name: str) -> dict:
+    """Trả về cấu hình profile, ValueError nếu tên không hợp lệ."""
+    if name not in RECOGNIZER_PROFILES:
+        raise ValueError(
+            f"rec_profile must be one of {tuple(RECOGNIZER_PROFILES)}, got {name!r}"
+        )
+    return dict(RECOGNIZER_PROFILES[name], name=name)
+
+
+class OnnxCnnBackbone(nn.Module):
+    """Thay `model.cnn` bằng ONNX Runtime session (output (W, N, C) như Vgg)."""
+
+    def __init__(self, onnx_path: str, num_threads: int = 0):
+        super().__init__()
+        import onnxruntime as ort
+
+        opts = ort.SessionOptions()
+        if num_threads > 0:
+            opts.intra_op_num_threads = num_threads
+        self._session = ort.InferenceSession(
+            onnx_path, sess_options=opts, providers=["CPUExecutionProvider"]
+        )
+        self._input_name = self._session.get_inputs()[0].name
+        self.onnx_path = onnx_path
+
+    def forward(self, x):
+        out = self._session.run(None, {self._input_name: x.detach().cpu().numpy()})[0]
+        return torch.from_numpy(out).to(x.device)
+
+
+class _VggExport(nn.Module):
+    """Vgg.forward với permute index dương (ORT từ chối perm âm khi load)."""
+
+    def __init__(self, vgg):
+        super().__init__()
+        self.vgg = vgg
+
+    def forward(self, x):
+        conv = self.vgg.features(x)
+        conv = self.vgg.last_conv_1x1(conv)
+        conv = conv.transpose(2, 3).flatten(2)
+        return conv.permute(2, 0, 1)
+
+
+def export_cnn_onnx(model, onnx_path: str, image_height: int = 32) -> str:
+    """Export CNN backbone (N, 3, H, W) → (W', N, C), dynamic batch + width."""
+    os.makedirs(os.path.dirname(onnx_path) or ".", exist_ok=True)
+    cnn = model.cnn.eval()
+    if hasattr(cnn.model, "last_conv_1x1"):
+        cnn = _VggExport(cnn.model).eval()
+    dummy = torch.zeros(1, 3, image_height, 128)
+    with torch.no_grad():
+        torch.onnx.export(
+            cnn,
+            dummy,
+            onnx_path,
+            input_names=["images"],
+            output_names=["features"],
+            dynamic_axes={
+                "images": {0: "batch", 3: "width"},
+                "features": {0: "seq", 1: "batch"},
+            },
+            opset_version=17,
+            dynamo=False,
+        )
+    logger.info(f"Exported VietOCR CNN → {onnx_path}")
+    return onnx_path
+
+
+def quantize_transformer_int8(model) -> None:
+    """Dynamic int8 quantization cho nn.Linear trong phần sequence model."""
+    from torch.ao.quantization import quantize_dynamic
+
+    model.transformer = quantize_dynamic(
+        model.transformer, {nn.Linear}, dtype=torch.qint8
+    )
+
+
+def apply_profile(predictor, profile: dict, weights_path: str = "", use_gpu=False):
+    """
+    Áp dụng profile lên Predictor VietOCR đã load weights (in-place).
+
+    Args:
+        predictor:    vietocr Predictor.
+        profile:      dict từ resolve_profile().
+        weights_path: File .pth — dùng để đặt tên/invalidate file ONNX cache.
+        use_gpu:      True → bỏ qua int8/ONNX (chỉ tối ưu cho CPU).
+    """
+    if not (profile.get("int8") or profile.get("onnx_cnn")):
+        return predictor
+    if use_gpu:
+        logger.warning(
+            f"rec_profile={profile['name']} chỉ dành cho CPU → dùng fp32 trên GPU"
+        )
+        return predictor
+
+    model = predictor.model
+    if profile.get("onnx_cnn"):
+        onnx_path = _onnx_cache_path(profile["model"], weights_path)
+        if not os.path.isfile(onnx_path):
+            export_cnn_onnx(
+                model, onnx_path, predictor.config["dataset"]["image_height"]
+            )
+        model.cnn = OnnxCnnBackbone(onnx_path, num_threads=torch.get_num_threads())
+        logger.info(f"VietOCR CNN → ONNX Runtime ({onnx_path})")
+    if profile.get("int8"):
+        quantize_transformer_int8(model)
+        logger.info("VietOCR transformer → dynamic int8")
+    return predictor
+
+
+def _onnx_cache_path(model_name: str, weights_path: str) -> str:
+    """File ONNX nằm cạnh weights; đổi tên theo mtime để tự export lại."""
+    base_dir = os.path.dirname(weights_path) if weights_path else ""
+    if not base_dir or weights_path.startswith("http"):
+        base_dir = os.path.expanduser("~/.config/vietocr")
+    stamp = ""
+    if weights_path and os.path.isfile(weights_path):
+        stamp = f"_{int(os.path.getmtime(weights_path))}"
+    return os.path.join(base_dir, f"{model_name}_cnn{stamp}.onnx")
@@ -0,0 +1,124 @@
+"""
+rerecognize.py — Nhận dạng lại CHỌN LỌC các dòng tên thuốc confidence thấp.
+
+Greedy (C1) vẫn chạy cho toàn bộ dòng. Chỉ dòng `_is_drug_title_candidate`
+có confidence < threshold mới thử thêm 2 ứng viên:
+    - beam search trên cùng crop,
+    - greedy trên crop có padding rộng hơn (dấu tiếng Việt sát mép).
+
+Mỗi ứng viên được chấm bằng prob trung bình ký tự dưới chính model đó
+(teacher forcing — cùng thang với confidence greedy). Chỉ thay text khi ứng
+viên có score cao hơn greedy → beam không thể "bịa" chuỗi mà model kém tin
+hơn (lý do C1 tắt beamsearch toàn cục).
+
+Số dòng nhận dạng lại bị chặn bởi max_fraction × tổng số dòng.
+"""
+
+import logging
+import math
+
+import torch
+
+from core.phase_a.s3_ocr.fast_decode import EOS_TOKEN, SOS_TOKEN, SPECIAL_TOKEN_MAX
+
+logger = logging.getLogger(__name__)
+
+BEAM_SIZE = 4
+
+
+def select_lines(blocks: list, threshold: float, max_fraction: float) -> list:
+    """
+    Index các block là tên thuốc có confidence < threshold.
+
+    Thấp nhất trước, tối đa ceil(max_fraction × len(blocks)) dòng.
+    """
+    from core.phase_a.s3_ocr.ocr_engine import _is_drug_title_candidate
+
+    picked = [
+        i
+        for i, b in enumerate(blocks)
+        if b.confidence < threshold and _is_drug_title_candidate(b.text)
+    ]
+    picked.sort(key=lambda i: blocks[i].confidence)
+    budget = math.ceil(max_fraction * len(blocks))
+    return picked[:budget]
+
+
+class SelectiveReRecognizer:
+    """
+    Beam search + rescoring cho 1 dòng, dùng model của recognizer greedy.
+
+    Args:
+        engine:    Predictor VietOCR hoặc CachedGreedyRecognizer (cần
+                   .model, .vocab, .config, .device, predict()).
+        beam_size: Beam width cho translate_beam_search.
+    """
+
+    def __init__(self, engine, beam_size: int = BEAM_SIZE):
+        self._engine = engine
+        self.model = engine.model
+        self.vocab = engine.vocab
+        self.config = engine.config
+        self.device = engine.device
+        self._beam_size = beam_size
+
+    def _tensor(self, pil_img):
+        from vietocr.tool.translate import process_input
+
+        ds = self.config["dataset"]
+        img = process_input(
+            pil_img, ds["image_height"], ds["image_min_width"], ds["image_max_width"]
+        )
+        return img.to(self.device)
+
+    def beam(self, img) -> list:
+        """Token ids (có SOS, không có EOS) từ beam search."""
+        from vietocr.tool.translate import translate_beam_search
+
+        return translate_beam_search(img, self.model, beam_size=self._beam_size)
+
+    def score(self, img, ids: list) -> float:
+        """Prob trung bình các ký tự của `ids` (teacher forcing)."""
+        target = [t for t in ids[1:] if t != EOS_TOKEN] + [EOS_TOKEN]
+        probs = []
+        self.model.eval()
+        with torch.no_grad():
+            memory = self.model.transformer.forward_encoder(self.model.cnn(img))
+            prefix = [SOS_TOKEN]
+            for token in target:
+                tgt = torch.LongTensor(prefix).unsqueeze(1).to(self.device)
+                output, memory = self.model.transformer.forward_decoder(tgt, memory)
+                p = torch.softmax(output[0, -1].float(), dim=-1)[token].item()
+                if token > SPECIAL_TOKEN_MAX:
+                    probs.append(p)
+                prefix.append(token)
+        return sum(probs) / len(probs) if probs else 0.0
+
+    def refine(self, crops: list, text: str, confidence: float):
+        """
+        Chọn text tốt nhất giữa greedy gốc và các ứng viên.
+
+        Args:
+            crops:      [crop gốc, crop padding rộng, ...] (PIL RGB).
+            text:       Text greedy trên crop gốc.
+            confidence: Prob greedy trên crop gốc.
+        Returns:
+            (text, confidence) — giữ nguyên nếu không ứng viên nào tốt hơn.
+        """
+        best_text, best_conf = text, float(confidence)
+
+        img = self._tensor(crops[0])
+        ids = self.beam(img)
+        beam_text = self.vocab.decode(ids).strip()
+        if beam_text and beam_text != best_text:
+            beam_conf = self.score(img, ids)
+            if beam_conf > best_conf:
+                best_text, best_conf = beam_text, beam_conf
+
+        for crop in crops[1:]:
+            alt_text, alt_conf = self._engine.predict(crop, return_prob=True)
+            alt_text = str(alt_text).strip()
+            if alt_text and float(alt_conf) > best_conf:
+                best_text, best_conf = alt_text, float(alt_conf)
+
+        return best_text, best_conf
@@ -0,0 +1,131 @@
+"""
+distill.py — Distill PhoBERT NER (teacher) → student ít layer cho CPU.
+
+Student cùng kiến trúc token classification với teacher, chỉ ít layer hơn:
+    - embeddings + classifier copy từ teacher; layer của student khởi tạo
+      từ các layer cách đều của teacher (12 → 4: 0, 4, 7, 11).
+    - cùng tokenizer + id2label, lưu bằng save_pretrained như checkpoint
+      thường → NerExtractor(model_path=...) / NER_MODEL_PATH dùng luôn,
+      classify() không đổi.
+Loss = alpha · KL(soft label teacher ‖ student, nhiệt độ T) · T²
+     + (1 − alpha) · CE(nhãn gold), chỉ trên subword đầu của mỗi từ.
+Workflow + báo cáo speedup / F1: scripts/distill_ner.py.
+"""
+
+import copy
+import logging
+import re
+
+import torch
+import torch.nn.functional as F
+
+logger = logging.getLogger(__name__)
+
+_LAYER_RE = re.compile(r"\.encoder\.layer\.(\d+)\.")
+
+
+def student_layer_map(teacher_layers: int, student_layers: int) -> list:
+    """Layer teacher dùng để khởi tạo từng layer student (cách đều, giữ layer cuối)."""
+    if student_layers >= teacher_layers:
+        return list(range(teacher_layers))
+    if student_layers == 1:
+        return [teacher_layers - 1]
+    step = (teacher_layers - 1) / (student_layers - 1)
+    return [round(i * step) for i in range(student_layers)]
+
+
+def make_student(teacher, num_layers: int):
+    """Bản copy của teacher chỉ giữ num_layers layer encoder."""
+    layer_map = student_layer_map(teacher.config.num_hidden_layers, num_layers)
+    config = copy.deepcopy(teacher.config)
+    config.num_hidden_layers = len(layer_map)
+    student = type(teacher)(config)
+
+    state = {}
+    for key, value in teacher.state_dict().items():
+        m = _LAYER_RE.search(key)
+        if m is None:
+            state[key] = value
+            continue
+        for s_idx, t_idx in enumerate(layer_map):
+            if t_idx == int(m.group(1)):
+                state[f"{key[: m.start(1)]}{s_idx}{key[m.end(1) :]}"] = value.clone()
+    student.load_state_dict(state)
+    logger.info(f"Student: {len(layer_map)} layers ← teacher layers {layer_map}")
+    return student.eval()
+
+
+def distill_loss(student_logits, teacher_logits, labels, temperature: float = 2.0, alpha: float = 0.5):
+    """KD (soft label, T²) + CE gold trên vị trí labels != -100."""
+    mask = labels != -100
+    s, t = student_logits[mask], teacher_logits[mask]
+    kd = F.kl_div(
+        F.log_softmax(s / temperature, dim=-1),
+        F.softmax(t / temperature, dim=-1),
+        reduction="batchmean",
+    ) * temperature**2
+    ce = F.cross_entropy(s, labels[mask])
+    return alpha * kd + (1 - alpha) * ce
+
+
+def encode_samples(ner, samples, label2id: dict) -> list:
+    """
+    Sample {tokens, ner_tags} → (input_ids, label_ids) theo đúng cách
+    NerExtractor encode lúc suy luận (subword đầu mang nhãn, còn lại -100).
+    """
+    encoded = []
+    for sample in samples:
+        words = sample["tokens"]
+        input_ids, word_map = ner._build_input(ner._subwords(words))
+        labels = [label2id[sample["ner_tags"][w]] if w >= 0 else -100 for w in word_map]
+        encoded.append((input_ids, labels))
+    return encoded
+
+
+def _collate(batch, pad_id: int):
+    max_len = max(len(ids) for ids, _ in batch)
+    ids = torch.full((len(batch), max_len), pad_id, dtype=torch.long)
+    mask = torch.zeros(len(batch), max_len, dtype=torch.long)
+    labels = torch.full((len(batch), max_len), -100, dtype=torch.long)
+    for row, (input_ids, label_ids) in enumerate(batch):
+        ids[row, : len(input_ids)] = torch.tensor(input_ids)
+        mask[row, : len(input_ids)] = 1
+        labels[row, : len(label_ids)] = torch.tensor(label_ids)
+    return ids, mask, labels
+
+
+def distill(
+    teacher,
+    student,
+    encoded: list,
+    pad_id: int,
+    epochs: int = 5,
+    batch_size: int = 16,
+    lr: float = 5e-5,
+    temperature: float = 2.0,
+    alpha: float = 0.5,
+    seed: int = 0,
+) -> list:
+    """Train student theo soft label của teacher. Trả về loss trung bình / epoch."""
+    generator = torch.Generator().manual_seed(seed)
+    optimizer = torch.optim.AdamW(student.parameters(), lr=lr, weight_decay=0.01)
+    teacher.eval()
+    history = []
+    for epoch in range(epochs):
+        student.train()
+        order = torch.randperm(len(encoded), generator=generator).tolist()
+        total = 0.0
+        for start in range(0, len(order), batch_size):
+            ids, mask, labels = _collate([encoded[i] for i in order[start : start + batch_size]], pad_id)
+            with torch.no_grad():
+                teacher_logits = teacher(input_ids=ids, attention_mask=mask).logits
+            student_logits = student(input_ids=ids, attention_mask=mask).logits
+            loss = distill_loss(student_logits, teacher_logits, labels, temperature, alpha)
+            optimizer.zero_grad()
+            loss.backward()
+            optimizer.step()
+            total += loss.item() * len(ids)
+        history.append(total / max(len(encoded), 1))
+        logger.info(f"Distill epoch {epoch + 1}/{epochs}: loss {history[-1]:.4f}")
+    student.eval()
+    return history
@@ -0,0 +1,201 @@
+"""
+gazetteer.py — Gắn nhãn tên thuốc theo catalog trước PhoBERT NER.
+
+Phần lớn dòng thuốc chứa nguyên văn 1 tên biệt dược / hoạt chất trong drug
+DB (tenThuoc, tenHoatChat — cùng nguồn DrugLookup). Gazetteer:
+    - Aho-Corasick trên tên đã bỏ dấu (fold) → quét 1 lượt / dòng, tuyến
+      tính theo độ dài dòng, không phụ thuộc số tên trong catalog.
+    - Match phải đứng ở ranh giới từ; chồng lấn → lấy leftmost-longest.
+    - Dòng "chắc chắn" (đúng 1 tên, khớp cả dấu, đủ dài, không phải header)
+      → (drug_name, instruction) lấy thẳng từ span + hàm lượng theo sau,
+      bỏ qua PhoBERT. Dòng còn lại vẫn qua NER; tên catalog khớp được gắn
+      vào extracted["catalog_match"].
+"""
+
+import logging
+import re
+import threading
+import unicodedata
+from dataclasses import dataclass
+
+logger = logging.getLogger(__name__)
+
+# Tên ngắn hơn (sau fold) không đưa vào automaton ("sắt", "kẽm" ≈ từ thường)
+MIN_KEY_LEN = 4
+# Dòng chỉ được bỏ qua NER khi tên khớp dài ≥ ngưỡng này
+MIN_CONFIDENT_LEN = 5
+# Hàm lượng ngay sau tên thuốc thuộc drug_name (như nhãn DRUG của NER)
+_STRENGTH_TAIL_RE = re.compile(
+    r"(?:\s*/?\s*(?:\d+(?:[.,/]\d+)*\s*(?:mg|mcg|µg|ml|g|iu|ui|%)?|mg|mcg|µg|ml|g|iu|ui|%)(?!\w))*",
+    re.IGNORECASE,
+)
+
+_fold_cache = {}
+_lock = threading.Lock()
+_shared = None
+
+
+def _fold_char(ch: str) -> str:
+    folded = _fold_cache.get(ch)
+    if folded is None:
+        if ch in "đĐ":
+            folded = "d"
+        else:
+            base = unicodedata.normalize("NFD", ch)[0].lower()
+            folded = base[0] if base else ch
+        _fold_cache[ch] = folded
+    return folded
+
+
+def fold(text: str) -> str:
+    """Bỏ dấu + lowercase, giữ nguyên độ dài (1 ký tự NFC → 1 ký tự)."""
+    return "".join(_fold_char(ch) for ch in text)
+
+
+def _normalize(text: str) -> str:
+    return " ".join(unicodedata.normalize("NFC", text).split())
+
+
+@dataclass
+class CatalogMatch:
+    start: int
+    end: int
+    name: str     # tên trong catalog (lowercase)
+    exact: bool   # khớp cả dấu (không chỉ sau khi fold)
+
+
+@dataclass
+class GazetteerTag:
+    drug_name: str
+    instruction: str
+    catalog_name: str
+    confident: bool
+
+
+class Gazetteer:
+    """
+    Args:
+        names: Tên thuốc / hoạt chất trong catalog (DrugLookup.catalog_names()).
+    """
+
+    def __init__(self, names):
+        self._keys = []      # key_id → tên đã fold
+        self._names = []     # key_id → tên catalog đầu tiên có cùng fold
+        self._exact = []     # key_id → các cách viết (lowercase) trong catalog
+        index = {}
+        for name in names:
+            name = _normalize(name).lower()
+            key = fold(name)
+            if len(key) < MIN_KEY_LEN:
+                continue
+            kid = index.get(key)
+            if kid is None:
+                kid = index[key] = len(self._keys)
+                self._keys.append(key)
+                self._names.append(name)
+                self._exact.append(set())
+            self._exact[kid].add(name)
+        self._build()
+        self._stats = {"lines": 0, "matched": 0, "confident": 0}
+
+    def __len__(self) -> int:
+        return len(self._keys)
+
+    def _build(self) -> None:
+        """Trie + fail links (BFS); out[node] = key_id kết thúc tại node."""
+        goto, out = [{}], [()]
+        for kid, key in enumerate(self._keys):
+            node = 0
+            for ch in key:
+                nxt = goto[node].get(ch)
+                if nxt is None:
+                    nxt = goto[node][ch] = len(goto)
+                    goto.append({})
+                    out.append(())
+                node = nxt
+            out[node] = out[node] + (kid,)
+
+        fail = [0] * len(goto)
+        queue = list(goto[0].values())
+        for node in queue:
+            for ch, child in goto[node].items():
+                f = fail[node]
+                while f and ch not in goto[f]:
+                    f = fail[f]
+                fail[child] = goto[f].get(ch, 0)
+                out[child] = out[child] + out[fail[child]]
+                queue.append(child)
+        self._goto, self._fail, self._out = goto, fail, out
+
+    def find(self, text: str) -> list:
+        """CatalogMatch (không chồng lấn, leftmost-longest) trên dòng đã chuẩn hoá."""
+        folded = fold(text)
+        goto, fail, out = self._goto, self._fail, self._out
+        hits, node = [], 0
+        for i, ch in enumerate(folded):
+            while node and ch not in goto[node]:
+                node = fail[node]
+            node = goto[node].get(ch, 0)
+            for kid in out[node]:
+                end = i + 1
+                start = end - len(self._keys[kid])
+                if (start == 0 or not folded[start - 1].isalnum()) and (
+                    end == len(folded) or not folded[end].isalnum()
+                ):
+                    hits.append((start, end, kid))
+
+        hits.sort(key=lambda h: (h[0], h[0] - h[1]))
+        matches, last_end = [], 0
+        for start, end, kid in hits:
+            if start < last_end:
+                continue
+            matches.append(
+                CatalogMatch(
+                    start, end, self._names[kid], text[start:end].lower() in self._exact[kid]
+                )
+            )
+            last_end = end
+        return matches
+
+    def tag(self, text: str):
+        """GazetteerTag cho 1 dòng (None nếu không có tên catalog nào)."""
+        from core.phase_a.s5_classify.post_filter import NerPostFilter
+
+        line = _normalize(text)
+        matches = self.find(line)
+        self._stats["lines"] += 1
+        if not matches:
+            return None
+        self._stats["matched"] += 1
+
+        first = matches[0]
+        end = first.end + len(_STRENGTH_TAIL_RE.match(line, first.end).group(0).rstrip())
+        confident = (
+            len(matches) == 1
+            and first.exact
+            and first.end - first.start >= MIN_CONFIDENT_LEN
+            and not NerPostFilter.HEADER_RE.search(line)
+        )
+        if confident:
+            self._stats["confident"] += 1
+        return GazetteerTag(
+            drug_name=line[first.start : end].strip(),
+            instruction=" ".join((line[: first.start] + " " + line[end:]).split()),
+            catalog_name=first.name,
+            confident=confident,
+        )
+
+    def stats(self) -> dict:
+        return dict(self._stats, names=len(self))
+
+
+def shared_gazetteer() -> Gazetteer:
+    """Gazetteer dùng chung trong process, dựng từ catalog của DrugLookup."""
+    global _shared
+    with _lock:
+        if _shared is None:
+            from core.phase_a.s6_drug_search.drug_lookup import DrugLookup
+
+            _shared = Gazetteer(DrugLookup().catalog_names())
+            logger.info(f"Gazetteer: {len(_shared)} catalog names")
+        return _shared
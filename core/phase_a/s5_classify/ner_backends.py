@@ -0,0 +1,170 @@
+"""
+ner_backends.py — Backend chạy PhoBERT NER trên node CPU.
+
+Backends (chọn qua `NerExtractor(backend=...)` hoặc NER_BACKEND):
+    fp32   AutoModelForTokenClassification PyTorch fp32 (mặc định, như trước)
+    int8   fp32 + dynamic int8 quantization cho mọi nn.Linear (attention,
+           FFN, classifier head)
+    onnx   Export ONNX (dynamic batch + seq) → ONNX Runtime CPU; file .onnx
+           cache trong `<model_path>/onnx/`, tên theo fingerprint checkpoint
+           → đổi weights là tự export lại. Checkpoint mount chỉ đọc → export
+           vào NER_ONNX_CACHE_DIR; không ghi được đâu cả → fp32 + warning.
+
+Độ khớp nhãn / F1 tên thuốc so với fp32 + latency từng backend:
+scripts/benchmark_ner_backends.py (trên data/ner_dataset/test.json).
+"""
+
+import logging
+import os
+from types import SimpleNamespace
+
+import torch
+from torch import nn
+
+logger = logging.getLogger(__name__)
+
+NER_BACKENDS = ("fp32", "int8", "onnx")
+
+
+def resolve_backend(name: str) -> str:
+    """ValueError nếu tên backend không hợp lệ."""
+    if name not in NER_BACKENDS:
+        raise ValueError(f"backend must be one of {NER_BACKENDS}, got {name!r}")
+    return name
+
+
+def quantize_int8(model):
+    """Dynamic int8 quantization cho nn.Linear (trả về model mới)."""
+    from torch.ao.quantization import quantize_dynamic
+
+    return quantize_dynamic(model, {nn.Linear}, dtype=torch.qint8)
+
+
+class _LogitsOnly(nn.Module):
+    """forward(input_ids, attention_mask) → logits (tensor, không ModelOutput)."""
+
+    def __init__(self, model):
+        super().__init__()
+        self.model = model
+
+    def forward(self, input_ids, attention_mask):
+        return self.model(input_ids=input_ids, attention_mask=attention_mask).logits
+
+
+def export_onnx(model, onnx_path: str) -> str:
+    """Export token classifier: (N, L) ids + mask → (N, L, num_labels) logits."""
+    os.makedirs(os.path.dirname(onnx_path) or ".", exist_ok=True)
+    dummy = torch.full((2, 8), 5, dtype=torch.long)
+    # Dummy có pad → nhánh attention mask không bị trace thành hằng
+    mask = torch.ones_like(dummy)
+    mask[1, 5:] = 0
+    # Wrapper phải eval: export khôi phục train/eval của module gốc sau khi
+    # trace (wrapper train → model PyTorch bị bật dropout)
+    wrapper = _LogitsOnly(model).eval()
+    tmp = f"{onnx_path}.tmp"
+    with torch.no_grad():
+        torch.onnx.export(
+            wrapper,
+            (dummy, mask),
+            tmp,
+            input_names=["input_ids", "attention_mask"],
+            output_names=["logits"],
+            dynamic_axes={
+                "input_ids": {0: "batch", 1: "seq"},
+                "attention_mask": {0: "batch", 1: "seq"},
+                "logits": {0: "batch", 1: "seq"},
+            },
+            opset_version=17,
+            dynamo=False,
+        )
+    os.replace(tmp, onnx_path)
+    logger.info(f"Exported PhoBERT NER → {onnx_path}")
+    return onnx_path
+
+
+class OnnxTokenClassifier:
+    """Gọi như model HF: model(input_ids=, attention_mask=).logits (torch)."""
+
+    def __init__(self, onnx_path: str, config, num_threads: int = 0):
+        import onnxruntime as ort
+
+        opts = ort.SessionOptions()
+        if num_threads > 0:
+            opts.intra_op_num_threads = num_threads
+        self._session = ort.InferenceSession(
+            onnx_path, sess_options=opts, providers=["CPUExecutionProvider"]
+        )
+        self.config = config
+        self.onnx_path = onnx_path
+
+    def eval(self):
+        return self
+
+    def __call__(self, input_ids, attention_mask):
+        logits = self._session.run(
+            None,
+            {
+                "input_ids": input_ids.cpu().numpy(),
+                "attention_mask": attention_mask.cpu().numpy(),
+            },
+        )[0]
+        return SimpleNamespace(logits=torch.from_numpy(logits))
+
+
+def onnx_cache_path(model_path: str, fingerprint: str) -> str:
+    return os.path.join(model_path, "onnx", f"ner_{fingerprint}.onnx")
+
+
+def _find_or_export_onnx(model, paths: list):
+    """File ONNX đã có trong `paths`, nếu chưa thì export vào path ghi được đầu tiên."""
+    for path in paths:
+        if os.path.isfile(path):
+            return path
+    for path in paths:
+        try:
+            return export_onnx(model, path)
+        except OSError as e:
+            logger.warning(f"Không export được ONNX vào {path}: {e}")
+    return None
+
+
+def apply_backend(
+    model,
+    backend: str,
+    model_path: str = "",
+    fingerprint: str = "",
+    cache_dir: str = None,
+):
+    """
+    Model fp32 đã load → model theo backend.
+
+    Args:
+        model:       AutoModelForTokenClassification (eval).
+        backend:     'fp32' | 'int8' | 'onnx'.
+        model_path:  Thư mục checkpoint (nơi cache file ONNX).
+        fingerprint: Fingerprint checkpoint — tên file ONNX (đã gồm đường dẫn
+                     tuyệt đối checkpoint → dùng chung cache_dir không đụng nhau).
+        cache_dir:   Nơi export khi model_path chỉ đọc (None = NER_ONNX_CACHE_DIR).
+
+    Returns:
+        Model theo backend; chính `model` (fp32) nếu không export được ONNX.
+    """
+    if backend == "int8":
+        logger.info("PhoBERT NER → dynamic int8")
+        return quantize_int8(model)
+    if backend == "onnx":
+        if cache_dir is None:
+            from core.config import NER_ONNX_CACHE_DIR
+
+            cache_dir = NER_ONNX_CACHE_DIR
+        paths = [
+            onnx_cache_path(model_path, fingerprint),
+            os.path.join(os.path.expanduser(cache_dir), f"ner_{fingerprint}.onnx"),
+        ]
+        onnx_path = _find_or_export_onnx(model, paths)
+        if onnx_path is None:
+            logger.warning("PhoBERT NER: không ghi được file ONNX → dùng fp32")
+            return model
+        logger.info(f"PhoBERT NER → ONNX Runtime ({onnx_path})")
+        return OnnxTokenClassifier(onnx_path, model.config, torch.get_num_threads())
+    return model
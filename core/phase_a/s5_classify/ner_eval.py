@@ -0,0 +1,39 @@
+"""
+ner_eval.py — Metric cho nhãn BIO theo từ (so backend / model NER).
+
+Dùng bởi scripts/benchmark_ner_backends.py và scripts/distill_ner.py.
+"""
+
+
+def drug_spans(tags: list, entity: str = "DRUG") -> set:
+    """Tập (start, end) của các span BIO thuộc entity."""
+    spans, start = set(), None
+    for i, tag in enumerate(list(tags) + ["O"]):
+        if start is not None and tag != f"I-{entity}":
+            spans.add((start, i))
+            start = None
+        if tag == f"B-{entity}" or (tag == f"I-{entity}" and start is None):
+            start = i
+    return spans
+
+
+def drug_f1(preds: list, golds: list) -> float:
+    """F1 span DRUG (entity-level, micro) giữa nhãn dự đoán và gold."""
+    tp = n_pred = n_gold = 0
+    for pred, gold in zip(preds, golds):
+        p, g = drug_spans(pred), drug_spans(gold)
+        tp += len(p & g)
+        n_pred += len(p)
+        n_gold += len(g)
+    if n_pred + n_gold == 0:
+        return 1.0
+    return 2 * tp / (n_pred + n_gold)
+
+
+def label_agreement(preds: list, refs: list) -> float:
+    """Tỉ lệ từ có cùng nhãn."""
+    same = total = 0
+    for pred, ref in zip(preds, refs):
+        same += sum(a == b for a, b in zip(pred, ref))
+        total += len(ref)
+    return same / max(total, 1)
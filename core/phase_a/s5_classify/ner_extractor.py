@@ -3,31 +3,118 @@ NER Extractor: PhoBERT-based Named Entity Recognition for drug names.
 Uses a fine-tuned PhoBERT NER model to classify text blocks as drugname/other.
 
 Strategy: Process each OCR block independently to avoid truncation.
+Các block của 1 đơn được chạy chung theo batch đã pad (sắp theo độ dài),
+nhãn từng từ vẫn lấy theo word_map của riêng block đó.
+Backend fp32 / int8 / ONNX Runtime: ner_backends.py (NER_BACKEND).
+Gazetteer catalog (NER_GAZETTEER): dòng khớp chắc chắn 1 tên thuốc bỏ qua PhoBERT.
+Triage (NER_TRIAGE): dòng chắc chắn không phải tên thuốc → "other", bỏ qua PhoBERT.
 """
 import re
 import torch
 from transformers import AutoTokenizer, AutoModelForTokenClassification
 
-try:
-    from underthesea import word_tokenize
-    HAS_UNDERTHESEA = True
-except ImportError:
-    HAS_UNDERTHESEA = False
-
 # Regex for STT prefix: "1)", "2.", "3 ", "10-"
 STT_REGEX = re.compile(r'^(\d+(?:[\)\.\-]|(?=\s))\s*)(.*)')
 
+# Giới hạn token / chuỗi (kể cả [CLS], [SEP])
+MAX_SEQ_LEN = 256
+# Confidence cho dòng lấy tên thuốc thẳng từ gazetteer (không qua PhoBERT)
+GAZETTEER_CONF = 1.0
+
 
 class NerExtractor:
     """Extract drug names from OCR text blocks using PhoBERT NER."""
 
-    def __init__(self, model_path="models/phobert_ner_model"):
+    def __init__(
+        self,
+        model_path=None,
+        batch_size=32,
+        subword_cache_size=None,
+        segmenter=None,
+        memo_size=None,
+        memo_path=None,
+        backend=None,
+        gazetteer=None,
+        triage=None,
+    ):
+        from core.config import (
+            NER_BACKEND,
+            NER_GAZETTEER,
+            NER_MEMO_PATH,
+            NER_MEMO_SIZE,
+            NER_MODEL_PATH,
+            NER_SUBWORD_CACHE_SIZE,
+            NER_TRIAGE,
+        )
+        from core.phase_a.s5_classify.gazetteer import shared_gazetteer
+        from core.phase_a.s5_classify.ner_backends import apply_backend, resolve_backend
+        from core.phase_a.s5_classify.ner_memo import NerMemo, checkpoint_fingerprint
+        from core.phase_a.s5_classify.segmenter import shared_segmenter
+        from core.phase_a.s5_classify.subword_cache import shared_cache
+        from core.phase_a.s5_classify.triage import LineTriage
+
+        # PhoBERT gốc hoặc student distill (scripts/distill_ner.py)
+        model_path = model_path or NER_MODEL_PATH
+        self.model_path = model_path
         self.tokenizer = AutoTokenizer.from_pretrained(model_path)
         self.model = AutoModelForTokenClassification.from_pretrained(
             model_path
         )
         self.model.eval()
         self.id2label = self.model.config.id2label
+        # fp32 | int8 | onnx (ner_backends.py)
+        self.backend = resolve_backend(backend or NER_BACKEND)
+        fp32_model = self.model
+        self.model = apply_backend(
+            self.model, self.backend, model_path, checkpoint_fingerprint(model_path)
+        )
+        if self.model is fp32_model:
+            # ONNX không export được (apply_backend đã warning) → thực chất fp32
+            self.backend = "fp32"
+        self.batch_size = batch_size
+        if subword_cache_size is None:
+            subword_cache_size = NER_SUBWORD_CACHE_SIZE
+        # Cache từ → subword ids dùng chung giữa các request (0 = tắt)
+        self.subword_cache = (
+            shared_cache(self.tokenizer, subword_cache_size)
+            if subword_cache_size > 0
+            else None
+        )
+        # Tách từ tiếng Việt: cache theo dòng + từ điển nếu đã validate
+        self.segmenter = segmenter or shared_segmenter()
+        # Memo dòng → (drug_name, instruction, conf), theo fingerprint checkpoint
+        self.fingerprint = checkpoint_fingerprint(
+            model_path,
+            f"seg={self.segmenter.backend}|max_len={MAX_SEQ_LEN}|backend={self.backend}",
+        )
+        memo_size = NER_MEMO_SIZE if memo_size is None else memo_size
+        self.memo = (
+            NerMemo(self.fingerprint, memo_size, memo_path or NER_MEMO_PATH)
+            if memo_size > 0
+            else None
+        )
+        # Tên thuốc theo catalog: dòng khớp chắc chắn không cần chạy PhoBERT
+        if gazetteer is None and NER_GAZETTEER:
+            gazetteer = shared_gazetteer()
+        self.gazetteer = gazetteer
+        # Luật rẻ (header, ô số lượng, hướng dẫn) → "other" không chạy model
+        self.triage = LineTriage() if (NER_TRIAGE if triage is None else triage) else None
+
+    @property
+    def checkpoint_info(self):
+        """Checkpoint đang dùng + thống kê memo (get_model_info / health)."""
+        info = {
+            "model_path": self.model_path,
+            "backend": self.backend,
+            "fingerprint": self.fingerprint,
+        }
+        if self.memo is not None:
+            info["ner_memo"] = self.memo.stats()
+        if self.gazetteer is not None:
+            info["gazetteer"] = self.gazetteer.stats()
+        if self.triage is not None:
+            info["triage"] = self.triage.stats()
+        return info
 
     def _get_label(self, pred_id):
         """Get label string from prediction id (handles int/str keys)."""
@@ -35,24 +122,14 @@ class NerExtractor:
             pred_id, self.id2label.get(str(pred_id), "O")
         )
 
-    def _extract_drug_and_instruction(self, text):
-        """
-        Dùng PhoBERT NER để tách Tên thuốc (B-DRUG, I-DRUG) và Hướng dẫn (O)
-        từ một chuỗi văn bản.
-        """
-        text = text.strip()
-        if not text:
-            return "", "", 0.0
-
-        # Word segment Vietnamese
-        if HAS_UNDERTHESEA:
-            text_seg = word_tokenize(text, format="text")
-        else:
-            text_seg = text
+    def _segment_many(self, texts):
+        """Word segment (1 lượt cho cả batch) → list từ theo text."""
+        return [text_seg.split() for text_seg in self.segmenter.segment_many(texts)]
 
-        words = text_seg.split()
-        if not words:
-            return "", "", 0.0
+    def _subwords(self, words):
+        """Subword ids của từng từ (qua subword_cache nếu bật)."""
+        if self.subword_cache is not None:
+            return self.subword_cache.encode_words(words)
 
         # Tokenize each word manually
         word_subwords = []
@@ -61,13 +138,16 @@ class NerExtractor:
             if not encoded:
                 encoded = [self.tokenizer.unk_token_id]
             word_subwords.append(encoded)
+        return word_subwords
 
+    def _build_input(self, word_subwords):
+        """Subword theo từ → (input_ids, word_map), cắt ở MAX_SEQ_LEN."""
         # Build input: [CLS] + subwords + [SEP]
         input_ids = [self.tokenizer.cls_token_id]
         word_map = [-1]  # CLS → no word
 
         for word_idx, subs in enumerate(word_subwords):
-            if len(input_ids) + len(subs) + 1 > 256:
+            if len(input_ids) + len(subs) + 1 > MAX_SEQ_LEN:
                 break
             for j, sw in enumerate(subs):
                 input_ids.append(sw)
@@ -75,21 +155,10 @@ class NerExtractor:
 
         input_ids.append(self.tokenizer.sep_token_id)
         word_map.append(-1)
+        return input_ids, word_map
 
-        # Run model
-        ids_tensor = torch.tensor([input_ids])
-        attn_mask = torch.ones(1, len(input_ids), dtype=torch.long)
-
-        with torch.no_grad():
-            logits = self.model(
-                input_ids=ids_tensor,
-                attention_mask=attn_mask,
-            ).logits
-
-        probs = torch.softmax(logits, dim=-1)
-        preds = torch.argmax(logits, dim=-1)[0]
-        confs = probs.max(dim=-1).values[0]
-
+    def _decode(self, words, word_map, preds, confs):
+        """Nhãn theo subword đầu của từng từ → (drug_name, instruction, conf)."""
         drug_words = []
         instruction_words = []
         max_conf = 0.0
@@ -108,9 +177,95 @@ class NerExtractor:
 
         drug_name = " ".join(drug_words).strip()
         instruction = " ".join(instruction_words).strip()
-        
+
         return drug_name, instruction, max_conf
 
+    def _extract_many(self, texts):
+        """
+        NER cho nhiều chuỗi: dòng đã có trong memo lấy luôn; phần còn lại
+        (bỏ trùng) chạy qua _extract_uncached rồi ghi vào memo.
+        """
+        if self.memo is None:
+            return self._extract_uncached(texts)
+        from core.phase_a.s5_classify.segmenter import normalize_line
+
+        keys = [normalize_line(text) for text in texts]
+        found = {}
+        for key in keys:
+            if key not in found:
+                found[key] = self.memo.get(key)
+        missing = [key for key, value in found.items() if value is None]
+        if missing:
+            for key, value in zip(missing, self._extract_uncached(missing)):
+                self.memo.put(key, value)
+                found[key] = value
+        return [found[key] for key in keys]
+
+    def _extract_uncached(self, texts):
+        """NER cho nhiều chuỗi (không qua memo), kết quả theo thứ tự texts."""
+        results = [("", "", 0.0)] * len(texts)
+        word_lists = self._segment_many(texts)
+        for i, word_map, preds, confs in self._forward(word_lists):
+            results[i] = self._decode(word_lists[i], word_map, preds, confs)
+        return results
+
+    def predict_word_labels(self, word_lists):
+        """
+        Nhãn BIO theo từng từ cho input đã tách từ (parity / đánh giá trên
+        data/ner_dataset). Từ bị cắt do MAX_SEQ_LEN → "O".
+        """
+        labels = [["O"] * len(words) for words in word_lists]
+        for i, word_map, preds, _ in self._forward(word_lists):
+            for idx, wid in enumerate(word_map):
+                if wid >= 0:
+                    labels[i][wid] = self._get_label(preds[idx].item())
+        return labels
+
+    def _forward(self, word_lists):
+        """
+        Chạy PhoBERT: sắp theo độ dài, batch đã pad (attention mask che phần
+        pad). Yield (index, word_map, preds, confs) cho từng list từ khác rỗng.
+        """
+        segmented = [(i, words) for i, words in enumerate(word_lists) if words]
+        # Subword của mọi từ trong batch: 1 lượt (cache + encode phần còn thiếu)
+        flat = self._subwords([w for _, words in segmented for w in words])
+        encoded, pos = [], 0
+        for i, words in segmented:
+            subs = flat[pos : pos + len(words)]
+            pos += len(words)
+            encoded.append((i, (words, *self._build_input(subs))))
+        # Độ dài gần nhau trong 1 batch → ít token pad
+        encoded.sort(key=lambda item: len(item[1][1]))
+
+        pad_id = self.tokenizer.pad_token_id
+        for start in range(0, len(encoded), self.batch_size):
+            chunk = encoded[start : start + self.batch_size]
+            max_len = max(len(ids) for _, (_, ids, _) in chunk)
+            ids_tensor = torch.full((len(chunk), max_len), pad_id, dtype=torch.long)
+            attn_mask = torch.zeros(len(chunk), max_len, dtype=torch.long)
+            for row, (_, (_, ids, _)) in enumerate(chunk):
+                ids_tensor[row, : len(ids)] = torch.tensor(ids)
+                attn_mask[row, : len(ids)] = 1
+
+            with torch.no_grad():
+                logits = self.model(
+                    input_ids=ids_tensor,
+                    attention_mask=attn_mask,
+                ).logits
+
+            probs = torch.softmax(logits, dim=-1)
+            preds = torch.argmax(logits, dim=-1)
+            confs = probs.max(dim=-1).values
+            for row, (i, (_, _, word_map)) in enumerate(chunk):
+                yield i, word_map, preds[row], confs[row]
+
+    def _extract_drug_and_instruction(self, text):
+        """
+        Dùng PhoBERT NER để tách Tên thuốc (B-DRUG, I-DRUG) và Hướng dẫn (O)
+        từ một chuỗi văn bản.
+        """
+        return self._extract_many([text])[0]
+
     def classify(self, ocr_blocks, **kwargs):
         """
         Classify OCR text blocks as drugname or other and extract structured info.
@@ -120,19 +275,16 @@ class NerExtractor:
         Output: list of dicts [{text, label, confidence, box, extracted_info}, ...]
                 with label = "drugname" or "other"
         """
-        results = []
+        # Pass 1: bóc cấu trúc từng block, gom phần text cần chạy NER
+        parsed = []
         for block in ocr_blocks:
             full_text = block.get("text", "")
             bbox = block.get("bbox") or block.get("box", [0, 0, 0, 0])
             
             # Khởi tạo giá trị mặc định
             stt = ""
-            drug_name = ""
-            instruction = ""
             qty = ""
             unit = ""
-            is_drug = False
-            conf = 0.0
             
             # Phân tách theo dấu " | " để bóc cấu trúc (nếu có form chuẩn)
             parts = [p.strip() for p in full_text.split(" | ")]
@@ -147,25 +299,52 @@ class NerExtractor:
                 else:
                     content_str = parts[1]
                     qty = parts[2]
-                
-                # Chạy NER chỉ trên phần Nội dung để bóc Tên thuốc vs Hướng dẫn
-                drug_name, instruction, conf = self._extract_drug_and_instruction(content_str)
-                is_drug = bool(drug_name)
+                # NER chỉ chạy trên phần Nội dung để bóc Tên thuốc vs Hướng dẫn
                 
             else:
                 # Dòng text thường (không theo form V2) -> Tách tất cả từ text
-                drug_name, instruction, conf = self._extract_drug_and_instruction(full_text)
-                is_drug = bool(drug_name)
+                content_str = full_text
                 # Fallback lấy STT bằng regex (giống cũ)
                 m = STT_REGEX.match(full_text)
                 if m:
                     stt = m.group(1).strip()
+
+            parsed.append((full_text, bbox, stt, qty, unit, len(parts) >= 3, content_str))
+
+        # Pass 2: triage, gazetteer catalog, rồi NER theo batch cho các block còn lại
+        contents = [item[-1] for item in parsed]
+        skips = [None] * len(contents)
+        if self.triage is not None:
+            skips = [self.triage.reason(item[-1], is_row=item[-2]) for item in parsed]
+        tags = [None] * len(contents)
+        if self.gazetteer is not None:
+            tags = [
+                self.gazetteer.tag(text) if text and not skip else None
+                for text, skip in zip(contents, skips)
+            ]
+        extracted = [
+            (tag.drug_name, tag.instruction, GAZETTEER_CONF) if tag and tag.confident else None
+            for tag in tags
+        ]
+        for i, skip in enumerate(skips):
+            if skip:
+                extracted[i] = ("", " ".join(contents[i].split()), 0.0)
+        pending = [i for i, value in enumerate(extracted) if value is None]
+        for i, value in zip(pending, self._extract_many([contents[i] for i in pending])):
+            extracted[i] = value
+
+        results = []
+        for item, (drug_name, instruction, conf), tag, skip in zip(
+            parsed, extracted, tags, skips
+        ):
+            full_text, bbox, stt, qty, unit = item[:5]
+            is_drug = bool(drug_name)
                 
             # Đè lại text bằng phần Tên Thuốc để Bước 5 (Tra cứu) chỉ dùng nó đi tìm kiếm
             # Phần văn bản gốc sẽ được lưu trong 'original_text'
             final_text = drug_name if is_drug else full_text
             
-            results.append({
+            result = {
                 "original_text": full_text,     # Giữ lại đoạn text gốc STT | Drug | Qty
                 "text": final_text,             # Quan trọng: Ghi đè text = drug_name để DrugLookup chuẩn
                 "label": "drugname" if is_drug else "other",
@@ -178,6 +357,11 @@ class NerExtractor:
                     "quantity": qty,
                     "unit": unit
                 }
-            })
-            
+            }
+            if self.gazetteer is not None:
+                result["extracted"]["catalog_match"] = tag.catalog_name if tag else ""
+            if self.triage is not None:
+                result["extracted"]["triage"] = skip or ""
+            results.append(result)
+
         return results
@@ -0,0 +1,114 @@
+"""
+ner_memo.py — Memo kết quả NER theo dòng nội dung.
+
+Các dòng như "Paracetamol 500mg", "Ngày uống 2 lần, mỗi lần 1 viên" lặp lại
+ở hàng nghìn đơn; mỗi lần đều phải tách từ + tokenize + forward PhoBERT.
+NerMemo cache dòng đã chuẩn hoá (normalize_line) → (drug_name, instruction,
+conf):
+    - LRU có giới hạn, thread-safe (core/shared/lru.py).
+    - Namespace theo fingerprint checkpoint (config + weights + tokenizer,
+      mtime/size) + backend tách từ → đổi model là tự bỏ memo cũ.
+    - Tuỳ chọn lưu ra file JSON (save() + lúc thoát process); file có
+      fingerprint khác bị bỏ qua khi load.
+"""
+
+import atexit
+import hashlib
+import json
+import logging
+import os
+import tempfile
+import threading
+from pathlib import Path
+from typing import Optional
+
+from core.shared.lru import LruCache
+
+logger = logging.getLogger(__name__)
+
+# File trong thư mục checkpoint HF ảnh hưởng tới output NER
+CHECKPOINT_FILES = (
+    "config.json", "pytorch_model.bin", "model.safetensors",
+    "vocab.txt", "bpe.codes", "tokenizer.json", "tokenizer_config.json",
+    "special_tokens_map.json", "added_tokens.json",
+)
+
+
+def checkpoint_fingerprint(model_path: str, extra: str = "") -> str:
+    """Hash (tên, size, mtime) các file checkpoint + extra (vd. backend tách từ)."""
+    h = hashlib.blake2b(digest_size=12)
+    h.update(os.path.abspath(model_path).encode("utf-8"))
+    for name in CHECKPOINT_FILES:
+        path = os.path.join(model_path, name)
+        if os.path.isfile(path):
+            st = os.stat(path)
+            h.update(f"|{name}:{st.st_size}:{int(st.st_mtime)}".encode())
+    h.update(f"|{extra}".encode("utf-8"))
+    return h.hexdigest()
+
+
+class NerMemo:
+    """
+    Args:
+        fingerprint:  Fingerprint checkpoint (checkpoint_fingerprint()).
+        max_entries:  Số dòng tối đa.
+        persist_path: File JSON để load lúc khởi tạo / save (None = chỉ RAM).
+    """
+
+    def __init__(self, fingerprint: str, max_entries: int, persist_path: Optional[str] = None):
+        self.fingerprint = fingerprint
+        self._lru = LruCache(max_entries)
+        self._persist_path = Path(os.path.expanduser(persist_path)) if persist_path else None
+        self._save_lock = threading.Lock()
+        if self._persist_path is not None:
+            self._load()
+            atexit.register(self.save)
+
+    def get(self, key: str):
+        value = self._lru.get(key)
+        return tuple(value) if value is not None else None
+
+    def put(self, key: str, value) -> None:
+        drug_name, instruction, conf = value
+        self._lru.put(key, (drug_name, instruction, float(conf)))
+
+    def _load(self) -> None:
+        try:
+            data = json.loads(self._persist_path.read_text(encoding="utf-8"))
+        except FileNotFoundError:
+            return
+        except (OSError, ValueError) as e:
+            logger.warning(f"NER memo unreadable ({self._persist_path}): {e}")
+            return
+        if data.get("fingerprint") != self.fingerprint:
+            logger.info(f"NER memo {self._persist_path.name}: checkpoint changed → bỏ qua")
+            return
+        for key, value in data.get("entries", []):
+            self.put(key, value)
+        logger.info(f"NER memo: loaded {len(self._lru)} lines from {self._persist_path}")
+
+    def save(self) -> None:
+        """Ghi memo ra persist_path (atomic; no-op nếu không persist)."""
+        if self._persist_path is None:
+            return
+        with self._save_lock:
+            entries = [[key, list(value)] for key, value in self._lru.items()]
+            payload = json.dumps(
+                {"fingerprint": self.fingerprint, "entries": entries}, ensure_ascii=False
+            )
+            self._persist_path.parent.mkdir(parents=True, exist_ok=True)
+            fd, tmp = tempfile.mkstemp(dir=self._persist_path.parent, suffix=".tmp")
+            try:
+                with os.fdopen(fd, "w", encoding="utf-8") as f:
+                    f.write(payload)
+                os.replace(tmp, self._persist_path)
+            except OSError as e:
+                logger.warning(f"NER memo write failed ({self._persist_path}): {e}")
+                if os.path.exists(tmp):
+                    os.remove(tmp)
+
+    def clear(self) -> None:
+        self._lru.clear()
+
+    def stats(self) -> dict:
+        return dict(self._lru.stats(), fingerprint=self.fingerprint)
@@ -0,0 +1,269 @@
+"""
+segmenter.py — Tách từ tiếng Việt cho NER (suy luận + prepare_ner_data).
+
+underthesea.word_tokenize (CRF) là 1 trong các bước chậm nhất / dòng trên
+CPU, trong khi header, hướng dẫn, tên thuốc lặp lại giữa các đơn:
+    - Segmenter: LRU cache theo dòng đã chuẩn hoá (NFC, gộp khoảng trắng);
+      segment_many() bỏ trùng trong batch, chỉ tách các dòng chưa có.
+    - LongestMatch: tách theo từ điển (longest match trên âm tiết), từ điển
+      dựng từ drug DB + cụm từ hay gặp trong tập NER đã tách bằng underthesea
+      (scripts/build_segmenter_dict.py). Chỉ được dùng khi file từ điển ghi
+      độ khớp với underthesea trên tập validation ≥ SEGMENT_DICT_MIN_AGREEMENT.
+Output cùng định dạng word_tokenize(format="text"): âm tiết của 1 từ nối "_".
+"""
+
+import csv
+import json
+import logging
+import re
+import threading
+import unicodedata
+from collections import Counter
+from pathlib import Path
+
+from core.shared.lru import LruCache
+
+logger = logging.getLogger(__name__)
+
+# Dấu câu tách khỏi âm tiết (dấu chấm giữ nguyên: "BS.", "0.5", "TAB.")
+_PUNCT_RE = re.compile(r"""([,;:!?"()\[\]])""")
+# Giữ nguyên: STT "1)" (prefix không qua underthesea, như prepare_ner_data)
+# và số có dấu phân cách ("0,5", "08:30", "13/05/2021")
+_KEEP_RE = re.compile(r"^(?:\d+\)|\d+(?:[.,/:]\d+)+)$")
+_SYLLABLE_RE = re.compile(r"^\w+$")
+# Cụm chỉ vào từ điển khi underthesea gộp nó ở ≥ tỉ lệ này số lần gặp
+MIN_MERGE_RATIO = 0.8
+
+_lock = threading.Lock()
+_shared = None
+
+
+def normalize_line(text: str) -> str:
+    """Key cache: NFC + gộp khoảng trắng."""
+    return " ".join(unicodedata.normalize("NFC", text).split())
+
+
+def pre_tokenize(text: str) -> list:
+    """Tách âm tiết + dấu câu (xấp xỉ tokenizer regex của underthesea)."""
+    out = []
+    for chunk in text.split():
+        if _KEEP_RE.match(chunk):
+            out.append(chunk)
+        else:
+            out.extend(part for part in _PUNCT_RE.split(chunk) if part)
+    return out
+
+
+class LongestMatch:
+    """
+    Tách từ theo từ điển: tại mỗi vị trí lấy cụm âm tiết dài nhất có trong
+    từ điển (so không phân biệt hoa thường), còn lại mỗi âm tiết 1 từ.
+
+    Args:
+        phrases: Cụm ≥ 2 âm tiết, phân cách bằng khoảng trắng hoặc "_".
+    """
+
+    def __init__(self, phrases):
+        self.phrases = set()
+        for phrase in phrases:
+            syllables = tuple(s.lower() for s in pre_tokenize(phrase.replace("_", " ")))
+            if len(syllables) > 1:
+                self.phrases.add(syllables)
+        self.max_len = max((len(p) for p in self.phrases), default=1)
+
+    def __len__(self) -> int:
+        return len(self.phrases)
+
+    def tokenize(self, text: str) -> list:
+        syllables = pre_tokenize(text)
+        lowered = [s.lower() for s in syllables]
+        out, i = [], 0
+        while i < len(syllables):
+            for n in range(min(self.max_len, len(syllables) - i), 1, -1):
+                if tuple(lowered[i : i + n]) in self.phrases:
+                    out.append("_".join(syllables[i : i + n]))
+                    i += n
+                    break
+            else:
+                out.append(syllables[i])
+                i += 1
+        return out
+
+    def segment(self, text: str) -> str:
+        return " ".join(self.tokenize(text))
+
+
+def token_agreement(pred: list, ref: list) -> float:
+    """F1 theo span token (vị trí ký tự bỏ khoảng trắng) giữa 2 cách tách."""
+
+    def spans(tokens):
+        out, pos = set(), 0
+        for token in tokens:
+            size = len(token.replace("_", ""))
+            out.add((pos, pos + size))
+            pos += size
+        return out
+
+    p, r = spans(pred), spans(ref)
+    if not p and not r:
+        return 1.0
+    hit = len(p & r)
+    return 2 * hit / (len(p) + len(r))
+
+
+def _is_phrase(token: str) -> bool:
+    syllables = token.split("_")
+    return len(syllables) > 1 and all(_SYLLABLE_RE.match(s) for s in syllables)
+
+
+def mine_phrases(segmented_samples, min_count: int = 3) -> list:
+    """Cụm nhiều âm tiết chữ/số (token chứa "_") xuất hiện ≥ min_count lần."""
+    counts = Counter(
+        token.lower().replace("_", " ")
+        for tokens in segmented_samples
+        for token in tokens
+        if _is_phrase(token)
+    )
+    return sorted(phrase for phrase, n in counts.items() if n >= min_count)
+
+
+def phrase_evidence(segmented_samples, phrases) -> dict:
+    """
+    Số lần mỗi cụm được underthesea gộp thành 1 token / bị tách ra.
+
+    Returns:
+        {phrase: (merged, split)}
+    """
+    keyed = {tuple(p.lower().split()): p for p in phrases}
+    lengths = sorted({len(k) for k in keyed})
+    counts = {p: [0, 0] for p in phrases}
+    for tokens in segmented_samples:
+        syllables, starts, sizes = [], [], []
+        for token in tokens:
+            parts = token.lower().split("_")
+            for j, part in enumerate(parts):
+                syllables.append(part)
+                starts.append(j == 0)
+                sizes.append(len(parts) if j == 0 else 0)
+        for i in range(len(syllables)):
+            for n in lengths:
+                phrase = keyed.get(tuple(syllables[i : i + n]))
+                if phrase is not None:
+                    counts[phrase][0 if starts[i] and sizes[i] == n else 1] += 1
+    return {p: tuple(c) for p, c in counts.items()}
+
+
+def consistent_phrases(segmented_samples, phrases) -> list:
+    """Bỏ cụm mà underthesea thường tách ra (gộp < MIN_MERGE_RATIO số lần gặp)."""
+    evidence = phrase_evidence(segmented_samples, phrases)
+    return sorted(
+        p for p, (merged, split) in evidence.items()
+        if merged + split == 0 or merged / (merged + split) >= MIN_MERGE_RATIO
+    )
+
+
+def drug_db_phrases(csv_path) -> list:
+    """Tên thuốc / hoạt chất nhiều âm tiết trong drug DB."""
+    phrases = set()
+    with open(csv_path, encoding="utf-8") as f:
+        for row in csv.DictReader(f):
+            for key in ("brand_name", "generic_name"):
+                name = " ".join((row.get(key) or "").lower().split())
+                if _is_phrase(name.replace(" ", "_")):
+                    phrases.add(name)
+    return sorted(phrases)
+
+
+def load_dictionary(path, min_agreement: float):
+    """LongestMatch từ file build_segmenter_dict.py (None nếu chưa đạt ngưỡng)."""
+    path = Path(path)
+    if not path.exists():
+        return None
+    data = json.loads(path.read_text(encoding="utf-8"))
+    agreement = float(data.get("agreement", 0.0))
+    if agreement < min_agreement:
+        logger.info(
+            f"Segment dict {path.name}: agreement {agreement:.4f} < {min_agreement} → underthesea"
+        )
+        return None
+    logger.info(f"Segment dict {path.name}: {len(data['phrases'])} phrases, agreement {agreement:.4f}")
+    return LongestMatch(data["phrases"])
+
+
+def _underthesea():
+    try:
+        from underthesea import word_tokenize
+    except ImportError:
+        return None
+    return lambda text: word_tokenize(text, format="text")
+
+
+class Segmenter:
+    """
+    Args:
+        cache_size: Số dòng tối đa trong LRU (0 = không cache).
+        dictionary: LongestMatch (None = underthesea).
+        use_underthesea: False (hoặc thiếu underthesea) → giữ nguyên dòng,
+                    tách theo khoảng trắng như trước.
+    """
+
+    def __init__(self, cache_size: int = 20000, dictionary=None, use_underthesea: bool = True):
+        self._dictionary = dictionary
+        self._word_tokenize = (
+            _underthesea() if dictionary is None and use_underthesea else None
+        )
+        self._cache = LruCache(cache_size) if cache_size > 0 else None
+
+    @property
+    def backend(self) -> str:
+        if self._dictionary is not None:
+            return "dictionary"
+        return "underthesea" if self._word_tokenize is not None else "whitespace"
+
+    def _segment_one(self, line: str) -> str:
+        if self._dictionary is not None:
+            return self._dictionary.segment(line)
+        if self._word_tokenize is not None:
+            return self._word_tokenize(line)
+        return line
+
+    def segment(self, text: str) -> str:
+        return self.segment_many([text])[0]
+
+    def segment_many(self, texts: list) -> list:
+        """List dòng → list dòng đã tách (từ nối "_"), theo thứ tự texts."""
+        keys = [normalize_line(text) for text in texts]
+        done = {}
+        for key in keys:
+            if key in done:
+                continue
+            cached = self._cache.get(key) if self._cache is not None else None
+            if cached is None:
+                cached = self._segment_one(key) if key else ""
+                if self._cache is not None:
+                    self._cache.put(key, cached)
+            done[key] = cached
+        return [done[key] for key in keys]
+
+    def stats(self) -> dict:
+        stats = {"backend": self.backend}
+        if self._cache is not None:
+            stats.update(self._cache.stats())
+        return stats
+
+
+def shared_segmenter() -> Segmenter:
+    """Segmenter dùng chung trong process (cache + từ điển theo config)."""
+    global _shared
+    with _lock:
+        if _shared is None:
+            from core.config import (
+                SEGMENT_CACHE_SIZE,
+                SEGMENT_DICT_MIN_AGREEMENT,
+                SEGMENT_DICT_PATH,
+            )
+
+            dictionary = load_dictionary(SEGMENT_DICT_PATH, SEGMENT_DICT_MIN_AGREEMENT)
+            _shared = Segmenter(SEGMENT_CACHE_SIZE, dictionary)
+            logger.info(f"Segmenter: backend={_shared.backend}")
+        return _shared
@@ -0,0 +1,63 @@
+"""
+subword_cache.py — Cache từ → subword ids cho NerExtractor.
+
+Tên thuốc, đơn vị, hướng dẫn lặp lại liên tục giữa các đơn, nên mỗi từ chỉ
+cần tokenize 1 lần:
+    - LRU word → ids (core/shared/lru.py), dùng chung giữa các request và
+      các NerExtractor cùng tokenizer (shared_cache).
+    - Từ chưa có trong cache được gom lại (bỏ trùng) và encode 1 lần: fast
+      tokenizer → 1 lời gọi batch (Rust); slow tokenizer → encode từng từ.
+Mỗi từ vẫn được encode riêng lẻ (không is_split_into_words) → ids giống
+hệt `tokenizer.encode(word, add_special_tokens=False)`.
+"""
+
+import threading
+
+from core.shared.lru import LruCache
+
+_lock = threading.Lock()
+_shared = {}  # (tokenizer name, max_entries) → SubwordCache
+
+
+class SubwordCache:
+    """
+    Args:
+        tokenizer:   HF tokenizer (cần encode(); dùng __call__ batch nếu is_fast).
+        max_entries: Số từ tối đa trong LRU.
+    """
+
+    def __init__(self, tokenizer, max_entries: int):
+        self.tokenizer = tokenizer
+        self._lru = LruCache(max_entries)
+
+    def _encode_batch(self, words: list) -> list:
+        if getattr(self.tokenizer, "is_fast", False):
+            return self.tokenizer(words, add_special_tokens=False)["input_ids"]
+        return [self.tokenizer.encode(word, add_special_tokens=False) for word in words]
+
+    def encode_words(self, words: list) -> list:
+        """List từ → list subword ids theo từng từ (rỗng → [unk])."""
+        found = {}
+        for word in words:
+            if word not in found:
+                found[word] = self._lru.get(word)
+        missing = [word for word, ids in found.items() if ids is None]
+        if missing:
+            unk = [self.tokenizer.unk_token_id]
+            for word, ids in zip(missing, self._encode_batch(missing)):
+                ids = tuple(ids) or tuple(unk)
+                self._lru.put(word, ids)
+                found[word] = ids
+        return [list(found[word]) for word in words]
+
+    def stats(self) -> dict:
+        return self._lru.stats()
+
+
+def shared_cache(tokenizer, max_entries: int) -> SubwordCache:
+    """SubwordCache dùng chung theo tokenizer (name_or_path) trong process."""
+    key = (getattr(tokenizer, "name_or_path", None) or id(tokenizer), max_entries)
+    with _lock:
+        if key not in _shared:
+            _shared[key] = SubwordCache(tokenizer, max_entries)
+        return _shared[key]
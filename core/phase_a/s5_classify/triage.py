@@ -0,0 +1,67 @@
+"""
+triage.py — Lọc dòng chắc chắn không phải tên thuốc trước PhoBERT NER.
+
+Dùng lại regex của NerPostFilter (vốn chỉ chạy sau NER) + cấu trúc cột của
+group_by_stt ("STT | Nội dung | SL | Đơn vị"):
+    no_alpha     không có chữ cái (ô số lượng, ngày, mã số)
+    unit         chỉ là đơn vị ("Viên", "Gói 10")
+    dosage       chỉ là hàm lượng ("500 mg")
+    instruction  bắt đầu bằng hướng dẫn dùng ("Ngày uống 2 lần", "SL: 30")
+    header       header / footer đơn — chỉ xét dòng ngoài bảng thuốc (không
+                 có cột STT), vì ô nội dung của dòng thuốc luôn qua NER
+Dòng bị lọc → label "other", không chạy model. Tỉ lệ bỏ qua + phần nhãn
+DRUG bị mất trên dòng OCR thật (label VAIPE, sample_texts của KB):
+scripts/report_ner_triage.py.
+"""
+
+import re
+
+from core.phase_a.s5_classify.post_filter import NerPostFilter
+
+# Dòng mở đầu bằng hướng dẫn dùng / trường số lượng
+INSTRUCTION_RE = re.compile(
+    r"^(ngày\s+(uống|dùng|\d)|sáng|trưa|chiều|tối|uống|mỗi\s+lần|hòa\s+tan|"
+    r"nhỏ\s+mắt|ghi\s+chú|cách\s+dùng|lời\s+dặn|sl\s*:|số\s+lượng)",
+    re.IGNORECASE,
+)
+# STT đầu dòng ("1)", "2.") — không tính khi xét luật
+_STT_PREFIX_RE = re.compile(r"^\d+[\)\.]\s*")
+
+REASONS = ("no_alpha", "unit", "dosage", "instruction", "header")
+
+
+class LineTriage:
+    """Phân loại nhanh 1 dòng nội dung; giữ thống kê số dòng bỏ qua theo lý do."""
+
+    def __init__(self):
+        self._stats = {"lines": 0, **{reason: 0 for reason in REASONS}}
+
+    def reason(self, text: str, is_row: bool = False):
+        """Lý do bỏ qua NER (None = vẫn chạy NER)."""
+        self._stats["lines"] += 1
+        reason = self._reason(text, is_row)
+        if reason is not None:
+            self._stats[reason] += 1
+        return reason
+
+    @staticmethod
+    def _reason(text: str, is_row: bool):
+        txt = _STT_PREFIX_RE.sub("", " ".join(text.replace("_", " ").split()))
+        if not any(ch.isalpha() for ch in txt):
+            return "no_alpha"
+        if NerPostFilter.UNIT_ONLY_RE.match(txt):
+            return "unit"
+        if NerPostFilter.DOSAGE_ONLY_RE.match(txt) and not re.search(
+            r"[^\W\d_]{4,}", txt
+        ):
+            return "dosage"
+        if INSTRUCTION_RE.match(txt):
+            return "instruction"
+        if not is_row and NerPostFilter.HEADER_RE.search(txt):
+            return "header"
+        return None
+
+    def stats(self) -> dict:
+        stats = dict(self._stats)
+        stats["skipped"] = sum(stats[reason] for reason in REASONS)
+        return stats
@@ -0,0 +1,238 @@
+"""
+drug_index.py — Index DrugLookup dựng sẵn (file nhị phân, mmap).
+
+DrugLookup parse toàn bộ drug_db_vn_full.json (~9k thuốc, mọi hoatChat) mỗi
+lần khởi động process / worker. Index gom sẵn:
+    - search keys (brand + hoạt chất, lowercase) + bảng entry
+    - key → entry
+    - token set (_has_root_overlap) + hàm lượng (_strength_compatible) của
+      từng key, tính sẵn
+    - postings trigram (ngram_index.py) để shortlist key trước fuzzy match
+Định dạng (little-endian):
+    MAGIC | u32 header_len | header JSON | các bảng chuỗi / mảng u32
+Header ghi INDEX_VERSION + sha256/size/mtime file JSON nguồn: khác version
+hoặc nguồn đổi nội dung → DrugLookup tự dựng lại. File được mmap: chỉ bảng
+key được decode hết lúc load, entry / token / hàm lượng decode khi cần.
+
+Build thủ công: scripts/build_drug_index.py.
+"""
+
+import hashlib
+import json
+import logging
+import mmap
+import os
+import struct
+import tempfile
+
+import numpy as np
+
+from core.phase_a.s6_drug_search.ngram_index import NgramIndex
+
+logger = logging.getLogger(__name__)
+
+MAGIC = b"DRUGIDX\0"
+# 2: thêm postings trigram
+INDEX_VERSION = 2
+ENTRY_FIELDS = ("brand_name", "generic_name", "so_dang_ky", "nong_do", "source")
+_SEP = "\x1f"
+
+
+def file_checksum(path: str) -> str:
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def source_stamp(path: str) -> dict:
+    st = os.stat(path)
+    return {"size": st.st_size, "mtime_ns": st.st_mtime_ns}
+
+
+def _string_table(strings: list):
+    """(offsets u32[n+1], blob utf-8)."""
+    encoded = [s.encode("utf-8") for s in strings]
+    offsets = np.zeros(len(encoded) + 1, dtype="<u4")
+    np.cumsum([len(b) for b in encoded], out=offsets[1:])
+    return offsets, b"".join(encoded)
+
+
+def write_index(path: str, entries: list, search_keys: list, key_entry: list,
+                key_tokens: list, key_strengths: list, source: dict) -> None:
+    """
+    Ghi index (atomic).
+
+    Args:
+        entries:       Entry dict (ENTRY_FIELDS), không trùng.
+        search_keys:   Key fuzzy search theo thứ tự DrugLookup._search_keys.
+        key_entry:     Chỉ số entry của từng key.
+        key_tokens:    Token set của từng key.
+        key_strengths: Hàm lượng của từng key (entry + key).
+        source:        {path, sha256, size, mtime_ns} của file JSON nguồn.
+    """
+    ngram = NgramIndex.build(search_keys)
+    arrays = {
+        "keys": _string_table(search_keys),
+        "entries": _string_table(
+            [str(e.get(field, "") or "") for e in entries for field in ENTRY_FIELDS]
+        ),
+        "tokens": _string_table([_SEP.join(sorted(t)) for t in key_tokens]),
+        "strengths": _string_table([_SEP.join(sorted(s)) for s in key_strengths]),
+        "grams": _string_table(ngram.grams),
+    }
+    parts, sections, pos = [], {}, 0
+    for name, (offsets, blob) in arrays.items():
+        sections[name] = {"offsets": pos, "count": len(offsets) - 1, "blob": pos + offsets.nbytes}
+        parts += [offsets.tobytes(), blob]
+        pos += offsets.nbytes + len(blob)
+        pad = (-pos) % 4
+        parts.append(b"\0" * pad)
+        pos += pad
+    for name, values in (
+        ("key_entry", key_entry),
+        ("gram_offsets", ngram.offsets),
+        ("postings", ngram.postings),
+        ("key_sizes", ngram.sizes),
+    ):
+        arr = np.asarray(values, dtype="<u4")
+        sections[name] = {"offsets": pos, "count": len(arr)}
+        parts.append(arr.tobytes())
+        pos += arr.nbytes
+
+    header = json.dumps(
+        {"version": INDEX_VERSION, "source": source, "sections": sections}
+    ).encode("utf-8")
+    header += b" " * ((-len(header) - len(MAGIC) - 4) % 4)
+    directory = os.path.dirname(os.path.abspath(path))
+    os.makedirs(directory, exist_ok=True)
+    fd, tmp = tempfile.mkstemp(dir=directory, suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(MAGIC + struct.pack("<I", len(header)) + header)
+            for part in parts:
+                f.write(part)
+        os.replace(tmp, path)
+    except OSError:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+        raise
+
+
+def read_header(path: str):
+    """Header JSON của index (None nếu không đọc được / sai định dạng)."""
+    try:
+        with open(path, "rb") as f:
+            if f.read(len(MAGIC)) != MAGIC:
+                return None
+            (size,) = struct.unpack("<I", f.read(4))
+            return json.loads(f.read(size))
+    except (OSError, ValueError, struct.error):
+        return None
+
+
+class _StringTable:
+    """Bảng chuỗi trên buffer mmap: decode theo chỉ số."""
+
+    def __init__(self, buf, base: int, section: dict):
+        count = section["count"]
+        self._offsets = np.frombuffer(buf, dtype="<u4", count=count + 1, offset=base + section["offsets"])
+        self._blob = base + section["blob"]
+        self._buf = buf
+        self._count = count
+
+    def __len__(self) -> int:
+        return self._count
+
+    def __getitem__(self, i: int) -> str:
+        start, end = int(self._offsets[i]), int(self._offsets[i + 1])
+        return bytes(self._buf[self._blob + start : self._blob + end]).decode("utf-8")
+
+    def tolist(self) -> list:
+        blob = bytes(self._buf[self._blob : self._blob + int(self._offsets[-1])])
+        offsets = self._offsets.tolist()
+        return [blob[offsets[i] : offsets[i + 1]].decode("utf-8") for i in range(self._count)]
+
+
+class _EntryTable:
+    """Sequence entry dict (đọc từ index khi truy cập)."""
+
+    def __init__(self, index, key_entry):
+        self._index = index
+        self._key_entry = key_entry
+
+    def __len__(self) -> int:
+        return len(self._key_entry)
+
+    def __getitem__(self, idx: int) -> dict:
+        return self._index.entry(int(self._key_entry[idx]))
+
+    def __iter__(self):
+        return (self[i] for i in range(len(self)))
+
+
+class DrugIndex:
+    """Index đã mmap (read-only)."""
+
+    def __init__(self, path: str):
+        self.path = path
+        self.header = read_header(path)
+        if self.header is None:
+            raise ValueError(f"not a drug index: {path}")
+        with open(path, "rb") as f:
+            self._mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        base = len(MAGIC) + 4 + struct.unpack_from("<I", self._mm, len(MAGIC))[0]
+        sections = self.header["sections"]
+        self._keys = _StringTable(self._mm, base, sections["keys"])
+        self._entries = _StringTable(self._mm, base, sections["entries"])
+        self._tokens = _StringTable(self._mm, base, sections["tokens"])
+        self._strengths = _StringTable(self._mm, base, sections["strengths"])
+        self._base = base
+        self.key_entry = self._array("key_entry")
+
+    def _array(self, name: str):
+        section = self.header["sections"][name]
+        return np.frombuffer(
+            self._mm, dtype="<u4", count=section["count"], offset=self._base + section["offsets"]
+        )
+
+    def search_keys(self) -> list:
+        return self._keys.tolist()
+
+    def entry(self, entry_idx: int) -> dict:
+        n = len(ENTRY_FIELDS)
+        return {field: self._entries[entry_idx * n + i] for i, field in enumerate(ENTRY_FIELDS)}
+
+    def entries(self) -> _EntryTable:
+        """Entry theo chỉ số key (như DrugLookup._entries)."""
+        return _EntryTable(self, self.key_entry)
+
+    def ngram_index(self) -> NgramIndex:
+        """NgramIndex trên postings đã mmap (chỉ decode bảng trigram)."""
+        grams = _StringTable(self._mm, self._base, self.header["sections"]["grams"])
+        return NgramIndex(
+            grams.tolist(), self._array("gram_offsets"), self._array("postings"), self._array("key_sizes")
+        )
+
+    def key_tokens(self, key_idx: int) -> set:
+        value = self._tokens[key_idx]
+        return set(value.split(_SEP)) if value else set()
+
+    def key_strengths(self, key_idx: int) -> set:
+        value = self._strengths[key_idx]
+        return set(value.split(_SEP)) if value else set()
+
+
+def is_current(header, source_path: str) -> bool:
+    """Index còn khớp version + nội dung file nguồn."""
+    if not header or header.get("version") != INDEX_VERSION:
+        return False
+    source = header.get("source", {})
+    if source.get("path") != os.path.abspath(source_path):
+        return False
+    stamp = source_stamp(source_path)
+    if stamp["size"] == source.get("size") and stamp["mtime_ns"] == source.get("mtime_ns"):
+        return True
+    # mtime đổi (copy / checkout lại) — so checksum trước khi dựng lại
+    return stamp["size"] == source.get("size") and file_checksum(source_path) == source.get("sha256")
@@ -4,6 +4,10 @@ drug_lookup.py — Drug name lookup using Vietnamese drug database (9,284 drugs)
 Priority: Local fuzzy match only (no API calls).
 Database: data/drug_db_vn_full.json (9,284 thuốc từ ddi.lab.io.vn)
 Fallback:  data/drug_db_vn.csv        (316 thuốc cũ)
+Index:     DRUG_INDEX_PATH (drug_index.py) — load JSON đã dựng sẵn qua mmap,
+           tự dựng lại khi checksum file JSON đổi.
+Shortlist: trigram inverted index (ngram_index.py) → rapidfuzz chỉ chấm
+           DRUG_NGRAM_SHORTLIST key / query thay vì toàn bộ.
 
 Usage:
     from core.phase_a.s6_drug_search.drug_lookup import DrugLookup
@@ -37,15 +41,39 @@ class DrugLookup:
     Ưu tiên drug_db_vn_full.json (9,284 thuốc), fallback sang CSV cũ.
     """
 
-    def __init__(self, db_path: Optional[str] = None):
+    def __init__(
+        self,
+        db_path: Optional[str] = None,
+        index_path: Optional[str] = None,
+        shortlist: Optional[int] = None,
+    ):
+        from core.config import DRUG_INDEX_PATH, DRUG_NGRAM_SHORTLIST
+        from core.phase_a.s6_drug_search.ngram_index import NgramIndex
+
         self._entries: list = []
         self._search_keys: list = []
+        self._index = None
+        self._source_path = None
+        # Số key tối đa rapidfuzz chấm / query (0 = chấm toàn bộ key)
+        self._shortlist = DRUG_NGRAM_SHORTLIST if shortlist is None else shortlist
+        self._ngram = None
+        if index_path is None:
+            index_path = DRUG_INDEX_PATH
         # Thử JSON đầy đủ trước, fallback CSV
         json_path = db_path or _DEFAULT_JSON_DB
         if os.path.exists(json_path) and json_path.endswith(".json"):
-            self._load_json(json_path)
+            if index_path:
+                self._load_indexed(json_path, os.path.expanduser(index_path))
+            else:
+                self._load_json(json_path)
         else:
             self._load_csv(_DEFAULT_CSV_DB)
+        if self._shortlist > 0 and self._search_keys:
+            self._ngram = (
+                self._index.ngram_index()
+                if self._index is not None
+                else NgramIndex.build(self._search_keys)
+            )
 
     # ── Loaders ──────────────────────────────────────────────────────────────
 
@@ -58,6 +86,7 @@ class DrugLookup:
             logger.error(f"DrugLookup: lỗi đọc JSON {path}: {e}")
             return
 
+        self._source_path = path
         drugs = data.get("drugs", []) if isinstance(data, dict) else data
         for drug in drugs:
             ten_thuoc = drug.get("tenThuoc", "").strip()
@@ -100,6 +129,63 @@ class DrugLookup:
             f"từ {len(drugs)} thuốc"
         )
 
+    def _load_indexed(self, json_path: str, index_path: str) -> None:
+        """Load index mmap nếu còn khớp file JSON; không thì parse JSON + dựng lại."""
+        from core.phase_a.s6_drug_search.drug_index import DrugIndex, is_current, read_header
+
+        if is_current(read_header(index_path), json_path):
+            try:
+                self._index = DrugIndex(index_path)
+            except (OSError, ValueError) as e:
+                logger.warning(f"DrugLookup: index lỗi {index_path}: {e}")
+            else:
+                self._search_keys = self._index.search_keys()
+                self._entries = self._index.entries()
+                logger.info(f"DrugLookup (index): {len(self._search_keys)} search keys")
+                return
+
+        self._load_json(json_path)
+        if self._search_keys:
+            try:
+                self.save_index(index_path)
+            except OSError as e:
+                logger.warning(f"DrugLookup: không ghi được index {index_path}: {e}")
+
+    def save_index(self, index_path: str) -> None:
+        """Ghi index (drug_index.py) từ DB JSON đã load."""
+        from core.phase_a.s6_drug_search.drug_index import (
+            file_checksum,
+            source_stamp,
+            write_index,
+        )
+
+        if self._source_path is None:
+            raise ValueError("DrugLookup: index chỉ dựng từ drug_db_vn_full.json")
+        entry_ids, entries, key_entry = {}, [], []
+        for entry in self._entries:
+            idx = entry_ids.get(id(entry))
+            if idx is None:
+                idx = entry_ids[id(entry)] = len(entries)
+                entries.append(entry)
+            key_entry.append(idx)
+        write_index(
+            index_path,
+            entries,
+            self._search_keys,
+            key_entry,
+            [self._root_tokens(key) for key in self._search_keys],
+            [
+                self._candidate_strengths(entry, key)
+                for entry, key in zip(self._entries, self._search_keys)
+            ],
+            dict(
+                path=os.path.abspath(self._source_path),
+                sha256=file_checksum(self._source_path),
+                **source_stamp(self._source_path),
+            ),
+        )
+        logger.info(f"DrugLookup: index → {index_path} ({len(self._search_keys)} keys)")
+
     def _load_csv(self, path: str) -> None:
         """Fallback: load drug_db_vn.csv."""
         if not os.path.exists(path):
@@ -138,16 +224,24 @@ class DrugLookup:
         return " ".join(t.split()).strip().lower()
 
     @staticmethod
-    def _has_root_overlap(query: str, candidate: str) -> bool:
-        """Yêu cầu ít nhất 1 token có nghĩa chung."""
+    def _root_tokens(text: str) -> set:
+        """Token có nghĩa (≥ 3 ký tự, bỏ đơn vị / từ chung)."""
         stop = {
             "", "mg", "ml", "mcg", "g", "iu", "tab", "cap",
             "viên", "ống", "lọ", "chai", "gói", "sủi",
             "thuốc", "và", "the", "for",
         }
-        q_words = {w for w in re.split(r"\W+", query.lower()) if w not in stop and len(w) >= 3}
-        c_words = {w for w in re.split(r"\W+", candidate.lower()) if w not in stop and len(w) >= 3}
-        return bool(q_words & c_words)
+        return {w for w in re.split(r"\W+", text.lower()) if w not in stop and len(w) >= 3}
+
+    @classmethod
+    def _has_root_overlap(cls, query: str, candidate: str) -> bool:
+        """Yêu cầu ít nhất 1 token có nghĩa chung."""
+        return bool(cls._root_tokens(query) & cls._root_tokens(candidate))
+
+    def _key_tokens(self, idx: int) -> set:
+        if self._index is not None:
+            return self._index.key_tokens(idx)
+        return self._root_tokens(self._search_keys[idx])
 
     @staticmethod
     def _extract_strength_tokens(text: str) -> set[str]:
@@ -158,16 +252,7 @@ class DrugLookup:
         return {f"{value.replace(',', '.')} {unit}" for value, unit in matches}
 
     @classmethod
-    def _strength_compatible(
-        cls,
-        query_text: str,
-        entry: dict,
-        match_key: str,
-    ) -> bool:
-        query_strengths = cls._extract_strength_tokens(query_text)
-        if not query_strengths:
-            return True
-
+    def _candidate_strengths(cls, entry: dict, match_key: str) -> set:
         candidate_text = " ".join(
             filter(
                 None,
@@ -179,7 +264,31 @@ class DrugLookup:
                 ],
             )
         )
-        candidate_strengths = cls._extract_strength_tokens(candidate_text)
+        return cls._extract_strength_tokens(candidate_text)
+
+    @classmethod
+    def _strength_compatible(
+        cls,
+        query_text: str,
+        entry: dict,
+        match_key: str,
+    ) -> bool:
+        query_strengths = cls._extract_strength_tokens(query_text)
+        if not query_strengths:
+            return True
+        candidate_strengths = cls._candidate_strengths(entry, match_key)
+        if not candidate_strengths:
+            return True
+        return bool(query_strengths & candidate_strengths)
+
+    def _key_strength_compatible(self, query_strengths: set, idx: int) -> bool:
+        """_strength_compatible theo key (hàm lượng tính sẵn nếu có index)."""
+        if not query_strengths:
+            return True
+        if self._index is not None:
+            candidate_strengths = self._index.key_strengths(idx)
+        else:
+            candidate_strengths = self._candidate_strengths(self._entries[idx], self._search_keys[idx])
         if not candidate_strengths:
             return True
         return bool(query_strengths & candidate_strengths)
@@ -197,6 +306,8 @@ class DrugLookup:
         query_paren  = paren_m.group(1).strip().lower() if paren_m else ""
         no_paren     = re.sub(r"\([^)]*\)", " ", text)
         query_no_par = self._clean(no_paren)
+        query_tokens = self._root_tokens(query_clean or query_raw)
+        query_strengths = self._extract_strength_tokens(text)
 
         best_result = None
         variant_priority = {
@@ -214,19 +325,12 @@ class DrugLookup:
         ]:
             if not query or len(query) < 3:
                 continue
-            results = process.extract(
-                query,
-                self._search_keys,
-                scorer=fuzz.token_sort_ratio,
-                limit=5,
-            )
-            for match_key, score, idx in results:
+            for match_key, score, idx in self._extract(query):
                 if score < MIN_SCORE:
                     continue
-                if not self._has_root_overlap(query_clean or query_raw, match_key):
+                if not query_tokens & self._key_tokens(idx):
                     continue
-                entry = self._entries[idx]
-                strength_ok = self._strength_compatible(text, entry, match_key)
+                strength_ok = self._key_strength_compatible(query_strengths, idx)
                 candidate_rank = (
                     1 if strength_ok else 0,
                     variant_priority[variant_name],
@@ -251,6 +355,24 @@ class DrugLookup:
             "source":      entry.get("source", ""),
         }
 
+    def _extract(self, query: str) -> list:
+        """Top 5 (key, score, idx) theo token_sort_ratio (qua shortlist trigram nếu bật)."""
+        if self._ngram is None or len(self._search_keys) <= self._shortlist:
+            return process.extract(
+                query,
+                self._search_keys,
+                scorer=fuzz.token_sort_ratio,
+                limit=5,
+            )
+        candidates = self._ngram.shortlist(query, self._shortlist)
+        results = process.extract(
+            query,
+            [self._search_keys[i] for i in candidates],
+            scorer=fuzz.token_sort_ratio,
+            limit=5,
+        )
+        return [(key, score, candidates[j]) for key, score, j in results]
+
     def lookup_batch(self, texts: list) -> list:
         return [self.lookup(t) for t in texts]
 
@@ -266,6 +388,10 @@ class DrugLookup:
             "source":     None,
         }
 
+    def catalog_names(self) -> list:
+        """Tên thuốc + hoạt chất (lowercase, không trùng) — cho NER gazetteer."""
+        return sorted(set(self._search_keys))
+
     @property
     def db_size(self) -> int:
         """Số lượng thuốc unique trong DB."""
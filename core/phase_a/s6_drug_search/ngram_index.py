@@ -0,0 +1,78 @@
+"""
+ngram_index.py — Inverted index trigram ký tự trên search keys của DrugLookup.
+
+lookup() chấm token_sort_ratio cho mọi key (~28k) với tối đa 4 biến thể
+query / dòng. NgramIndex rút gọn còn DRUG_NGRAM_SHORTLIST key có nhiều
+trigram chung nhất (Dice trên tập trigram), rapidfuzz chỉ chấm các key đó.
+Trigram lấy theo từng từ (có pad 2 đầu) → không phụ thuộc thứ tự từ, như
+token_sort_ratio.
+
+Postings được lưu cùng index mmap (drug_index.py); build() khi không có index.
+"""
+
+from collections import defaultdict
+
+import numpy as np
+
+
+def trigrams(text: str) -> set:
+    """Trigram theo từ (lowercase, pad khoảng trắng 2 đầu)."""
+    grams = set()
+    for word in text.lower().split():
+        padded = f" {word} "
+        grams.update(padded[i : i + 3] for i in range(len(padded) - 2))
+    return grams
+
+
+class NgramIndex:
+    """
+    Args:
+        grams:    Trigram (theo thứ tự hàng postings).
+        offsets:  u32[len(grams) + 1] — postings của grams[i] là
+                  postings[offsets[i]:offsets[i + 1]].
+        postings: u32 key id (tăng dần trong mỗi hàng).
+        sizes:    u32 số trigram của từng key.
+    """
+
+    def __init__(self, grams: list, offsets, postings, sizes):
+        self._row = {gram: i for i, gram in enumerate(grams)}
+        self.grams = grams
+        self.offsets = offsets
+        self.postings = postings
+        self.sizes = sizes
+
+    @classmethod
+    def build(cls, keys: list) -> "NgramIndex":
+        rows = defaultdict(list)
+        sizes = np.zeros(len(keys), dtype="<u4")
+        for key_id, key in enumerate(keys):
+            grams = trigrams(key)
+            sizes[key_id] = len(grams)
+            for gram in grams:
+                rows[gram].append(key_id)
+        grams = sorted(rows)
+        offsets = np.zeros(len(grams) + 1, dtype="<u4")
+        np.cumsum([len(rows[g]) for g in grams], out=offsets[1:])
+        postings = np.fromiter(
+            (key_id for g in grams for key_id in rows[g]), dtype="<u4", count=int(offsets[-1])
+        )
+        return cls(grams, offsets, postings, sizes)
+
+    def __len__(self) -> int:
+        return len(self.sizes)
+
+    def shortlist(self, query: str, limit: int) -> list:
+        """≤ limit key id (tăng dần) có Dice trigram cao nhất với query."""
+        grams = trigrams(query)
+        rows = [self._row[g] for g in grams if g in self._row]
+        if not rows:
+            return []
+        ids = np.concatenate(
+            [self.postings[self.offsets[r] : self.offsets[r + 1]] for r in rows]
+        )
+        counts = np.bincount(ids, minlength=len(self))
+        hits = np.flatnonzero(counts)
+        if len(hits) > limit:
+            dice = counts[hits] / (self.sizes[hits] + len(grams))
+            hits = np.sort(hits[np.argpartition(-dice, limit - 1)[:limit]])
+        return hits.tolist()
@@ -31,6 +31,13 @@ logger = logging.getLogger(__name__)
 ROOT = Path(__file__).parent.parent
 
 
+def _layout_input(result):
+    """OcrResult → dùng thẳng các cột cho group_by_stt; object khác → text_blocks."""
+    from core.phase_a.s3_ocr.base import OcrResult
+
+    return result if isinstance(result, OcrResult) else result.text_blocks
+
+
 class MedicinePipeline:
     """
     Full pipeline: prescription scan → drug extraction → pill verification.
@@ -43,15 +50,21 @@ class MedicinePipeline:
         yolo_weights: Optional[str] = None,
         zero_pima_weights: Optional[str] = None,
         device: Optional[str] = None,
+        table_weights: Optional[str] = None,
+        ocr_kwargs: Optional[dict] = None,
     ):
-        from core.config import YOLO_WEIGHTS, ZERO_PIMA_WEIGHTS
+        from core.config import TABLE_YOLO_WEIGHTS, YOLO_WEIGHTS, ZERO_PIMA_WEIGHTS
 
         self._yolo_path = yolo_weights or str(ROOT / YOLO_WEIGHTS)
         self._zpima_path = zero_pima_weights or str(ROOT / ZERO_PIMA_WEIGHTS)
+        self._table_path = table_weights or str(ROOT / TABLE_YOLO_WEIGHTS)
         self._device = device
+        # Tham số thêm cho HybridOcrModule (vd. {"prune_lines": True})
+        self._ocr_kwargs = dict(ocr_kwargs or {})
 
         # Lazy-loaded modules
         self._detector = None
+        self._table_detector = None  # False = không có weights
         self._ocr = None
         self._classifier = None
         self._pill_det = None
@@ -73,6 +86,19 @@ class MedicinePipeline:
             logger.info("YOLO detector loaded")
         return self._detector
 
+    def _get_table_detector(self):
+        """Table ROI detector, None nếu không có weights (→ OCR toàn ảnh)."""
+        if self._table_detector is None:
+            from core.phase_a.s1_detect.table_detector import TableRegionDetector
+
+            if TableRegionDetector.weights_available(self._table_path):
+                self._table_detector = TableRegionDetector(self._table_path)
+                logger.info("Table ROI detector loaded")
+            else:
+                self._table_detector = False
+                logger.info("No table weights → full-image OCR")
+        return self._table_detector or None
+
     def _get_ocr(self):
         if self._ocr is None:
             from core.phase_a.s3_ocr.ocr_engine import HybridOcrModule
@@ -83,7 +109,7 @@ class MedicinePipeline:
                 device = self._device
             else:
                 device = "gpu" if torch.cuda.is_available() else "cpu"
-            self._ocr = HybridOcrModule(device=device)
+            self._ocr = HybridOcrModule(device=device, **self._ocr_kwargs)
             logger.info("HybridOCR loaded")
         return self._ocr
 
@@ -246,15 +272,12 @@ class MedicinePipeline:
 
         h, w = img.shape[:2]
 
-        ocr = self._get_ocr()
-        result = ocr.extract(img)
+        result = self._ocr_extract(img)
         if not result.text_blocks:
             return {"error": "OCR found no text", "image_size": (w, h)}
 
         # STT Grouping
-        from core.phase_a.s3_ocr.ocr_engine import group_by_stt
-
-        merged_blocks_obj = group_by_stt(result.text_blocks)
+        result, merged_blocks_obj = self._group_or_restore_pruned(img, result)
 
         ner_input = []
         for b in merged_blocks_obj:
@@ -402,10 +425,68 @@ class MedicinePipeline:
         bbox_result = crop_by_bbox(img, r0)
         return bbox_result
 
+    def _locate_table_roi(self, img):
+        """Step 1.6: vùng bảng thuốc (x1, y1, x2, y2) hoặc None."""
+        table_detector = self._get_table_detector()
+        if table_detector is None:
+            return None
+        try:
+            roi = table_detector.locate(img)
+        except Exception as e:
+            logger.warning(f"Table ROI detection error: {e}, using full image")
+            return None
+        if roi is None:
+            logger.info("Table ROI not found, using full image")
+        return roi
+
+    def _ocr_extract(self, img):
+        """OCR trong vùng bảng thuốc nếu có, fallback toàn ảnh."""
+        ocr = self._get_ocr()
+        roi = self._locate_table_roi(img)
+        if roi is not None:
+            result = ocr.extract(img, roi=roi)
+            if result.text_blocks:
+                logger.info(f"Table ROI OCR: {roi}")
+                return result
+            logger.warning("Table ROI OCR found no text, retrying full image")
+        return ocr.extract(img)
+
+    def _group_or_restore_pruned(self, img, result):
+        """
+        group_by_stt; không có STT anchor mà line pruning đã bỏ dòng → nhận
+        dạng nốt các dòng đó rồi gộp lại.
+
+        Returns:
+            (result, merged blocks)
+        """
+        from core.phase_a.s3_ocr.ocr_engine import group_by_stt
+
+        merged = group_by_stt(_layout_input(result))
+        if getattr(result, "pruned_polys", None) and merged is result.text_blocks:
+            result = self._get_ocr().recognize_pruned(img, result)
+            merged = group_by_stt(_layout_input(result))
+        return result, merged
+
     def _run_ocr(self, img, bbox_offset=None):
         """Run Hybrid OCR and return normalized blocks."""
-        ocr = self._get_ocr()
-        result = ocr.extract(img)
+        from core.phase_a.s3_ocr.base import OcrResult
+
+        result = self._ocr_extract(img)
+        if getattr(result, "pruned_polys", None):
+            result, _ = self._group_or_restore_pruned(img, result)
+        if isinstance(result, OcrResult):
+            # Columnar: bbox [x1, y1, x2, y2] tính vector trên result.boxes
+            if not len(result):
+                return []
+            rects = result.rects()
+            if bbox_offset:
+                rects = rects + np.array(bbox_offset * 2, dtype=rects.dtype)
+            return [
+                {"text": text, "bbox": rect, "confidence": round(conf, 4)}
+                for text, rect, conf in zip(
+                    result.texts, rects.tolist(), result.confidences.tolist()
+                )
+            ]
         if not result.text_blocks:
             return []
 
@@ -611,10 +692,15 @@ class MedicinePipeline:
             "yolo_weights": self._yolo_path,
             "zero_pima_weights": self._zpima_path,
             "yolo_loaded": self._detector is not None,
+            "table_roi_loaded": bool(self._table_detector),
             "ocr_loaded": self._ocr is not None,
             "classifier_loaded": self._classifier is not None,
             "pill_detector_loaded": self._pill_det is not None,
         }
-        if self._classifier is not None:
-            info["checkpoint"] = self._classifier.checkpoint_info
+        line_cache_stats = getattr(self._ocr, "line_cache_stats", None)
+        if line_cache_stats is not None and line_cache_stats() is not None:
+            info["ocr_line_cache"] = line_cache_stats()
+        checkpoint_info = getattr(self._classifier, "checkpoint_info", None)
+        if checkpoint_info is not None:
+            info["checkpoint"] = checkpoint_info
         return info
@@ -0,0 +1,92 @@
+"""
+lru.py — LRU cache nhỏ, thread-safe, có thống kê hit/miss.
+
+Dùng cho các cache trong RAM của pipeline (vd: cache nhận dạng dòng OCR).
+"""
+
+import threading
+from collections import OrderedDict
+from typing import Callable, Optional
+
+
+class LruCache:
+    """
+    LRU theo số entry.
+
+    Args:
+        max_entries: Số entry tối đa (≤ 0 = không giới hạn).
+        on_evict:    Gọi on_evict(key, value) khi 1 entry bị đẩy ra.
+    """
+
+    def __init__(self, max_entries: int, on_evict: Optional[Callable] = None):
+        self.max_entries = max_entries
+        self._on_evict = on_evict
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def __contains__(self, key) -> bool:
+        return key in self._data
+
+    def get(self, key, default=None):
+        with self._lock:
+            if key in self._data:
+                self._data.move_to_end(key)
+                self.hits += 1
+                return self._data[key]
+            self.misses += 1
+            return default
+
+    def peek(self, key, default=None):
+        """Đọc không cập nhật thứ tự LRU / thống kê."""
+        return self._data.get(key, default)
+
+    def touch(self, key) -> None:
+        """Đánh dấu key vừa dùng (vd: hit gần đúng tìm qua index riêng)."""
+        with self._lock:
+            if key in self._data:
+                self._data.move_to_end(key)
+
+    def record(self, hit: bool) -> None:
+        """Cộng thống kê cho lookup không đi qua get()."""
+        with self._lock:
+            if hit:
+                self.hits += 1
+            else:
+                self.misses += 1
+
+    def items(self) -> list:
+        """Snapshot (key, value) theo thứ tự LRU (cũ → mới)."""
+        with self._lock:
+            return list(self._data.items())
+
+    def put(self, key, value) -> None:
+        evicted = []
+        with self._lock:
+            self._data[key] = value
+            self._data.move_to_end(key)
+            while 0 < self.max_entries < len(self._data):
+                evicted.append(self._data.popitem(last=False))
+        if self._on_evict is not None:
+            for old_key, old_value in evicted:
+                self._on_evict(old_key, old_value)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+            self.hits = 0
+            self.misses = 0
+
+    def stats(self) -> dict:
+        total = self.hits + self.misses
+        return {
+            "size": len(self._data),
+            "max_entries": self.max_entries,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / total, 4) if total else 0.0,
+        }
@@ -0,0 +1,125 @@
+"""
+thread_budget.py — Ngân sách thread CPU chung cho torch / Paddle / OpenCV.
+
+Mặc định mỗi thư viện đều dùng toàn bộ core → nhiều scan hoặc nhiều worker
+trên cùng máy bị oversubscribe. configure_threads() gọi 1 lần mỗi process
+(mỗi worker) để đặt cùng 1 số thread cho:
+    - torch.set_num_threads (intra-op), interop = 1
+    - cv2.setNumThreads
+    - Paddle: cpu_threads khi tạo PaddleOCR (đọc qua paddle_cpu_threads())
+    - OMP/MKL/OpenBLAS env (chỉ có tác dụng nếu set trước khi load thư viện)
+
+Budget = CPU_THREADS (hoặc env MEDICINEAPP_THREADS), nếu không có thì
+os.cpu_count() // số worker (CPU_WORKERS / env MEDICINEAPP_WORKERS).
+"""
+
+import logging
+import os
+import threading
+from typing import Optional
+
+from core.config import CPU_THREADS, CPU_WORKERS
+
+logger = logging.getLogger(__name__)
+
+THREAD_ENV_VARS = ("OMP_NUM_THREADS", "MKL_NUM_THREADS", "OPENBLAS_NUM_THREADS")
+
+_lock = threading.Lock()
+_budget = None  # dict sau lần configure đầu tiên
+
+
+def _env_int(name: str) -> Optional[int]:
+    value = os.environ.get(name, "").strip()
+    if not value:
+        return None
+    try:
+        return max(1, int(value))
+    except ValueError:
+        logger.warning(f"Ignoring invalid {name}={value!r}")
+        return None
+
+
+def resolve_budget(threads: Optional[int] = None, workers: Optional[int] = None) -> tuple:
+    """(threads mỗi worker, số worker) theo thứ tự: tham số → env → config → auto."""
+    workers = workers or _env_int("MEDICINEAPP_WORKERS") or CPU_WORKERS or 1
+    threads = threads or _env_int("MEDICINEAPP_THREADS") or CPU_THREADS
+    if not threads:
+        threads = max(1, (os.cpu_count() or 1) // max(1, workers))
+    return int(threads), int(workers)
+
+
+def configure_threads(
+    threads: Optional[int] = None,
+    workers: Optional[int] = None,
+    force: bool = False,
+) -> dict:
+    """
+    Áp budget cho process hiện tại (chỉ lần đầu, trừ khi force=True).
+
+    Returns:
+        report() sau khi áp.
+    """
+    global _budget
+    with _lock:
+        if _budget is not None and not force:
+            return report()
+        threads, workers = resolve_budget(threads, workers)
+        for name in THREAD_ENV_VARS:
+            os.environ[name] = str(threads)
+
+        try:
+            import torch
+
+            torch.set_num_threads(threads)
+            try:
+                torch.set_num_interop_threads(1)
+            except RuntimeError:
+                # Chỉ đặt được trước khi torch chạy parallel work đầu tiên
+                pass
+        except ImportError:
+            pass
+
+        try:
+            import cv2
+
+            cv2.setNumThreads(threads)
+        except ImportError:
+            pass
+
+        _budget = {"threads": threads, "workers": workers}
+        logger.info(
+            f"Thread budget: {threads} threads/worker × {workers} workers "
+            f"(cpu_count={os.cpu_count()})"
+        )
+    return report()
+
+
+def paddle_cpu_threads() -> Optional[int]:
+    """cpu_threads cho PaddleOCR (None nếu chưa configure → mặc định Paddle)."""
+    return _budget["threads"] if _budget is not None else None
+
+
+def report() -> dict:
+    """Số thread thực tế của từng thư viện (cho /api/health)."""
+    info = {
+        "configured": _budget is not None,
+        "cpu_count": os.cpu_count(),
+        "threads_per_worker": _budget["threads"] if _budget else None,
+        "workers": _budget["workers"] if _budget else None,
+        "paddle_cpu_threads": paddle_cpu_threads(),
+        "env": {name: os.environ.get(name) for name in THREAD_ENV_VARS},
+    }
+    try:
+        import torch
+
+        info["torch_threads"] = torch.get_num_threads()
+        info["torch_interop_threads"] = torch.get_num_interop_threads()
+    except ImportError:
+        pass
+    try:
+        import cv2
+
+        info["cv2_threads"] = cv2.getNumThreads()
+    except ImportError:
+        pass
+    return info
@@ -0,0 +1,68 @@
+#!/usr/bin/env python3
+"""
+So sánh backend PhoBERT NER (fp32 / int8 / onnx): độ khớp + latency.
+
+Trên data/ner_dataset/test.json (token đã tách + nhãn gold):
+    agree     Tỉ lệ nhãn từng từ giống backend fp32
+    drug_f1   F1 span DRUG (entity-level) so với nhãn gold
+    ms/sample Latency trung bình (batch theo NER_BATCH, sau 1 lượt warm-up)
+Backend chỉ nên bật trong config khi agree / drug_f1 gần như bằng fp32.
+
+Usage:
+    python scripts/benchmark_ner_backends.py
+    python scripts/benchmark_ner_backends.py --backends fp32 onnx --repeat 5
+"""
+import argparse
+import json
+import sys
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).parent.parent
+sys.path.insert(0, str(ROOT))
+
+
+def main():
+    from core.phase_a.s5_classify.ner_backends import NER_BACKENDS
+
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[1])
+    parser.add_argument("--model", default="models/phobert_ner_model")
+    parser.add_argument("--test", default="data/ner_dataset/test.json")
+    parser.add_argument("--backends", nargs="+", default=list(NER_BACKENDS))
+    parser.add_argument("--repeat", type=int, default=3, help="Số lượt đo / backend")
+    parser.add_argument("--batch", type=int, default=32)
+    args = parser.parse_args()
+
+    from core.phase_a.s5_classify.ner_eval import drug_f1, label_agreement
+    from core.phase_a.s5_classify.ner_extractor import NerExtractor
+
+    samples = json.loads((ROOT / args.test).read_text(encoding="utf-8"))
+    word_lists = [s["tokens"] for s in samples]
+    golds = [s["ner_tags"] for s in samples]
+
+    rows, reference = [], None
+    for backend in ["fp32"] + [b for b in args.backends if b != "fp32"]:
+        ner = NerExtractor(
+            model_path=str(ROOT / args.model), batch_size=args.batch,
+            memo_size=0, backend=backend,
+        )
+        preds = ner.predict_word_labels(word_lists)  # warm-up (+ export ONNX lần đầu)
+        t0 = time.perf_counter()
+        for _ in range(args.repeat):
+            ner.predict_word_labels(word_lists)
+        ms = (time.perf_counter() - t0) / (args.repeat * len(word_lists)) * 1000
+        if reference is None:
+            reference = preds
+        if backend in args.backends:
+            rows.append((backend, label_agreement(preds, reference), drug_f1(preds, golds), ms))
+
+    print(f"samples={len(word_lists)}  words={sum(map(len, word_lists))}  batch={args.batch}")
+    print(f"{'backend':>8} {'agree':>7} {'drug_f1':>8} {'ms/sample':>10} {'speedup':>8}")
+    base = next((ms for name, _, _, ms in rows if name == "fp32"), None)
+    for name, agree, f1, ms in rows:
+        speedup = f"{base / ms:.2f}x" if base else "-"
+        print(f"{name:>8} {agree:>7.4f} {f1:>8.4f} {ms:>10.2f} {speedup:>8}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,100 @@
+#!/usr/bin/env python3
+"""
+Micro-benchmark tokenize từ → subword của NerExtractor (µs / block).
+
+So sánh:
+    per_word    tokenizer.encode() từng từ (cách cũ)
+    cache_cold  SubwordCache mới — từ chưa có được encode 1 lượt / batch
+    cache_warm  SubwordCache đã nạp (các đơn sau lặp lại tên thuốc, đơn vị)
+Mỗi mode trả về cùng ids (kiểm tra trước khi đo).
+
+Usage:
+    python scripts/benchmark_ner_tokenize.py
+    python scripts/benchmark_ner_tokenize.py --texts blocks.txt --repeat 20
+"""
+import argparse
+import sys
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).parent.parent
+sys.path.insert(0, str(ROOT))
+
+SAMPLE_BLOCKS = [
+    "Paracetamol 500mg", "Ngày uống 2 lần, mỗi lần 1 viên sau ăn",
+    "Amoxicillin 250mg", "Uống trước ăn sáng 30 phút", "Omeprazol 20mg",
+    "Vitamin C 500mg", "Ngày uống 1 lần buổi sáng", "Cefuroxim 500mg",
+    "Loratadin 10mg", "Ngày uống 1 viên trước khi ngủ", "Viên", "Gói",
+]
+
+
+def _segment(texts: list) -> list:
+    from core.phase_a.s5_classify.segmenter import Segmenter
+
+    return [t.split() for t in Segmenter(cache_size=0).segment_many(texts)]
+
+
+def _per_word(tokenizer, blocks: list) -> list:
+    out = []
+    for words in blocks:
+        for word in words:
+            out.append(tokenizer.encode(word, add_special_tokens=False) or [tokenizer.unk_token_id])
+    return out
+
+
+def _timed(fn, repeat: int, n_blocks: int) -> float:
+    """µs / block."""
+    t0 = time.perf_counter()
+    for _ in range(repeat):
+        fn()
+    return (time.perf_counter() - t0) / (repeat * n_blocks) * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[1])
+    parser.add_argument("--model", default="models/phobert_ner_model")
+    parser.add_argument("--texts", default=None, help="File text, mỗi dòng 1 block")
+    parser.add_argument("--repeat", type=int, default=10, help="Số lượt mỗi mode")
+    parser.add_argument("--batch", type=int, default=32, help="Số block / batch NER")
+    args = parser.parse_args()
+
+    from transformers import AutoTokenizer
+
+    from core.phase_a.s5_classify.subword_cache import SubwordCache
+
+    tokenizer = AutoTokenizer.from_pretrained(args.model)
+    if args.texts:
+        texts = [t.strip() for t in Path(args.texts).read_text(encoding="utf-8").splitlines()]
+        texts = [t for t in texts if t]
+    else:
+        texts = SAMPLE_BLOCKS * 10
+    blocks = _segment(texts)
+    batches = [blocks[i : i + args.batch] for i in range(0, len(blocks), args.batch)]
+
+    def run_cached(cache):
+        # Như NerExtractor._extract_many: mọi từ của 1 batch → 1 lượt encode_words
+        return [ids for b in batches for ids in cache.encode_words([w for ws in b for w in ws])]
+
+    reference = _per_word(tokenizer, blocks)
+    assert run_cached(SubwordCache(tokenizer, max_entries=100000)) == reference
+
+    n = len(blocks)
+    rows = [("per_word", _timed(lambda: _per_word(tokenizer, blocks), args.repeat, n))]
+    cold = sum(
+        _timed(lambda: run_cached(SubwordCache(tokenizer, max_entries=100000)), 1, n)
+        for _ in range(args.repeat)
+    )
+    rows.append(("cache_cold", cold / args.repeat))
+    warm = SubwordCache(tokenizer, max_entries=100000)
+    run_cached(warm)
+    rows.append(("cache_warm", _timed(lambda: run_cached(warm), args.repeat, n)))
+
+    print(f"tokenizer={type(tokenizer).__name__} fast={tokenizer.is_fast}"
+          f"  blocks={n}  words={sum(map(len, blocks))}")
+    print(f"{'mode':>12} {'µs/block':>10}")
+    for name, us in rows:
+        print(f"{name:>12} {us:>10.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -7,6 +7,7 @@ Usage:
     python scripts/benchmark_pipeline.py          # Chạy tất cả
     python scripts/benchmark_pipeline.py --sample 3  # 3 ảnh mẫu
     python scripts/benchmark_pipeline.py --dir data/input/prescription_1
+    python scripts/benchmark_pipeline.py --ocr-cache  # lần 2 trở đi bỏ qua OCR
 """
 import argparse
 import json
@@ -18,7 +19,7 @@ ROOT = Path(__file__).parent.parent
 sys.path.insert(0, str(ROOT))
 
 
-def run_benchmark(image_paths: list[Path], output_json: Path):
+def run_benchmark(image_paths: list[Path], output_json: Path, ocr_cache: bool = False):
     """Chạy pipeline trên danh sách ảnh, ghi kết quả."""
     print(f"\n{'='*60}")
     print(f"BENCHMARK: {len(image_paths)} ảnh")
@@ -28,7 +29,11 @@ def run_benchmark(image_paths: list[Path], output_json: Path):
     print("Loading pipeline...")
     t0 = time.time()
     from core.pipeline import MedicinePipeline
-    pipe = MedicinePipeline()
+    ocr_kwargs = None
+    if ocr_cache:
+        from core.config import OCR_CACHE_DIR
+        ocr_kwargs = {"cache_dir": OCR_CACHE_DIR}
+    pipe = MedicinePipeline(ocr_kwargs=ocr_kwargs)
     load_time = time.time() - t0
     print(f"Pipeline loaded in {load_time:.1f}s\n")
 
@@ -126,6 +131,8 @@ def main():
     parser.add_argument("--dir", help="Specific folder to scan")
     parser.add_argument("--sample", type=int, help="Limit to N images")
     parser.add_argument("--out", default="data/output/benchmark_after_fix.json")
+    parser.add_argument("--ocr-cache", action="store_true",
+                        help="Cache detect/recognize results on disk (OCR_CACHE_DIR)")
     args = parser.parse_args()
 
     input_dir = ROOT / "data" / "input"
@@ -150,7 +157,7 @@ def main():
         return
 
     output_json = ROOT / args.out
-    run_benchmark(image_paths, output_json)
+    run_benchmark(image_paths, output_json, ocr_cache=args.ocr_cache)
 
 
 if __name__ == "__main__":
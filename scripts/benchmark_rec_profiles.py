@@ -0,0 +1,140 @@
+#!/usr/bin/env python3
+"""
+Báo cáo accuracy vs latency cho các recognizer profile (rec_profiles.py).
+
+Input là các dòng đã gán nhãn: file JSONL mỗi dòng
+    {"image": "path/to/line_crop.png", "text": "Paracetamol 500mg"}
+(path tương đối tính từ thư mục chứa file JSONL). Nếu không truyền --labels,
+script render các dòng thuốc từ data/vaipe_drugs_kb.json làm ground truth.
+
+Usage:
+    python scripts/benchmark_rec_profiles.py --labels data/rec_labels/lines.jsonl
+    python scripts/benchmark_rec_profiles.py --profiles fp32 int8 cpu_fast
+"""
+import argparse
+import json
+import sys
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).parent.parent
+sys.path.insert(0, str(ROOT))
+
+
+def _load_labels(path: Path):
+    from PIL import Image
+
+    imgs, texts = [], []
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            item = json.loads(line)
+            img_path = Path(item["image"])
+            if not img_path.is_absolute():
+                img_path = path.parent / img_path
+            imgs.append(Image.open(img_path).convert("RGB"))
+            texts.append(item["text"])
+    return imgs, texts
+
+
+def _synthetic(n: int):
+    from scripts.benchmark_vietocr_decode import _long_lines, _render
+
+    texts = _long_lines(n)
+    return [_render(t) for t in texts], texts
+
+
+def _score(preds, texts):
+    from rapidfuzz.distance import Levenshtein
+
+    edits = sum(Levenshtein.distance(p, t) for p, t in zip(preds, texts))
+    chars = sum(max(len(t), 1) for t in texts)
+    exact = sum(p == t for p, t in zip(preds, texts))
+    return edits / chars, exact / len(texts)
+
+
+def main():
+    from core.phase_a.s3_ocr.rec_profiles import RECOGNIZER_PROFILES
+
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[1])
+    parser.add_argument("--labels", help="JSONL {image, text}")
+    parser.add_argument("--lines", type=int, default=48, help="Số dòng render")
+    parser.add_argument(
+        "--profiles", nargs="+", default=list(RECOGNIZER_PROFILES),
+        choices=list(RECOGNIZER_PROFILES),
+    )
+    parser.add_argument("--repeat", type=int, default=2, help="Lấy best-of-N")
+    parser.add_argument("--out", default="data/output/benchmark_rec_profiles.json")
+    args = parser.parse_args()
+
+    from core.phase_a.s3_ocr.ocr_engine import HybridOcrModule
+
+    if args.labels:
+        imgs, texts = _load_labels(Path(args.labels))
+    else:
+        imgs, texts = _synthetic(args.lines)
+    if not imgs:
+        print("No labelled lines!")
+        return
+
+    rows = []
+    for name in args.profiles:
+        ocr = HybridOcrModule(device="cpu", rec_profile=name)
+        t0 = time.perf_counter()
+        ocr._ensure_recognizer()
+        load_s = time.perf_counter() - t0
+        engine = ocr._rec_engine
+        engine.predict_batch(imgs[:2])  # warm-up
+
+        best = None
+        preds = []
+        for _ in range(args.repeat):
+            t0 = time.perf_counter()
+            preds = engine.predict_batch(imgs)
+            elapsed = time.perf_counter() - t0
+            best = elapsed if best is None else min(best, elapsed)
+
+        cer, exact = _score([str(p).strip() for p in preds], texts)
+        rows.append({
+            "profile": name,
+            "model": ocr._vietocr_model_name,
+            "load_s": round(load_s, 2),
+            "ms_per_line": round(best * 1000 / len(imgs), 2),
+            "cer": round(cer, 4),
+            "exact_match": round(exact, 4),
+        })
+
+    base = next((r for r in rows if r["profile"] == "fp32"), rows[0])
+    print(f"\n{'=' * 72}")
+    print(f"Recognizer profiles — {len(imgs)} dòng "
+          f"({'labels' if args.labels else 'synthetic'})")
+    print(f"{'=' * 72}")
+    print(f"  {'profile':<10} {'model':<16} {'ms/dòng':>9} {'speedup':>8} "
+          f"{'CER':>7} {'exact':>7}")
+    for r in rows:
+        speedup = base["ms_per_line"] / max(r["ms_per_line"], 1e-9)
+        r["speedup_vs_fp32"] = round(speedup, 2)
+        print(f"  {r['profile']:<10} {r['model']:<16} {r['ms_per_line']:>9.1f} "
+              f"{speedup:>7.2f}x {r['cer']:>7.2%} {r['exact_match']:>7.1%}")
+
+    out = ROOT / args.out
+    out.parent.mkdir(parents=True, exist_ok=True)
+    with open(out, "w", encoding="utf-8") as f:
+        json.dump(
+            {
+                "timestamp": time.strftime("%Y-%m-%d %H:%M:%S"),
+                "source": args.labels or "synthetic",
+                "lines": len(imgs),
+                "profiles": rows,
+            },
+            f,
+            ensure_ascii=False,
+            indent=2,
+        )
+    print(f"\nResults saved → {out}")
+
+
+if __name__ == "__main__":
+    main()
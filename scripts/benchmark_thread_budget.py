@@ -0,0 +1,161 @@
+#!/usr/bin/env python3
+"""
+Throughput OCR (ảnh/giây) theo các layout worker × thread (thread_budget.py).
+
+Mỗi layout chạy W process song song, mỗi process configure_threads(T, W)
+rồi OCR cùng bộ ảnh (HybridOcrModule trên CPU). Throughput = tổng số ảnh
+/ thời gian wall của cả layout (không tính thời gian load model).
+
+--synthetic thay OCR bằng workload torch conv + OpenCV (không cần model)
+để so sánh nhanh mức oversubscribe trên máy.
+
+Usage:
+    python scripts/benchmark_thread_budget.py --limit 8
+    python scripts/benchmark_thread_budget.py --layouts 1x8 2x4 4x2 8x1
+    python scripts/benchmark_thread_budget.py --synthetic --items 40
+"""
+import argparse
+import json
+import multiprocessing as mp
+import os
+import sys
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).parent.parent
+sys.path.insert(0, str(ROOT))
+
+
+def _default_layouts():
+    cpus = os.cpu_count() or 1
+    layouts, workers = [], 1
+    while workers <= cpus:
+        layouts.append(f"{workers}x{cpus // workers}")
+        workers *= 2
+    # Baseline oversubscribe: mỗi worker dùng mọi core
+    if cpus > 1:
+        layouts.append(f"{min(4, cpus)}x{cpus}")
+    return layouts
+
+
+def _synthetic_workload(items: int):
+    import cv2
+    import numpy as np
+    import torch
+
+    rng = np.random.default_rng(0)
+    img = rng.integers(0, 255, (1200, 900, 3), dtype=np.uint8)
+    conv = torch.nn.Conv2d(3, 32, 3, padding=1)
+    x = torch.rand(1, 3, 256, 512)
+
+    def run_one():
+        cv2.GaussianBlur(cv2.resize(img, (1800, 2400)), (5, 5), 0)
+        with torch.no_grad():
+            conv(x).relu().sum()
+
+    return run_one, items
+
+
+def _ocr_workload(paths: list):
+    import cv2
+
+    from core.phase_a.s3_ocr.ocr_engine import HybridOcrModule
+
+    ocr = HybridOcrModule(device="cpu")
+    images = [cv2.imread(p) for p in paths]
+    images = [img for img in images if img is not None]
+    state = {"i": 0}
+
+    def run_one():
+        ocr.extract(images[state["i"] % len(images)])
+        state["i"] += 1
+
+    return run_one, len(images)
+
+
+def _worker(threads, workers, synthetic, payload, start_evt, ready_q, result_q):
+    from core.shared.thread_budget import configure_threads
+
+    budget = configure_threads(threads, workers)
+    run_one, n = _synthetic_workload(payload) if synthetic else _ocr_workload(payload)
+    run_one()  # warm-up (load model, lazy init)
+    ready_q.put(os.getpid())
+    start_evt.wait()
+    t0 = time.perf_counter()
+    for _ in range(n):
+        run_one()
+    result_q.put({"items": n, "seconds": time.perf_counter() - t0, "budget": budget})
+
+
+def run_layout(workers: int, threads: int, synthetic: bool, payload) -> dict:
+    ctx = mp.get_context("spawn")
+    start_evt, ready_q, result_q = ctx.Event(), ctx.Queue(), ctx.Queue()
+    procs = [
+        ctx.Process(
+            target=_worker,
+            args=(threads, workers, synthetic, payload, start_evt, ready_q, result_q),
+        )
+        for _ in range(workers)
+    ]
+    for p in procs:
+        p.start()
+    for _ in procs:
+        ready_q.get()
+    t0 = time.perf_counter()
+    start_evt.set()
+    results = [result_q.get() for _ in procs]
+    wall = time.perf_counter() - t0
+    for p in procs:
+        p.join()
+
+    items = sum(r["items"] for r in results)
+    return {
+        "layout": f"{workers}x{threads}",
+        "workers": workers,
+        "threads": threads,
+        "items": items,
+        "wall_s": round(wall, 3),
+        "throughput": round(items / wall, 3) if wall else 0.0,
+        "budget": results[0]["budget"],
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[1])
+    parser.add_argument("--layouts", nargs="+", default=None,
+                        help="WxT, vd 1x8 2x4 (mặc định: lũy thừa 2 theo cpu_count)")
+    parser.add_argument("--dir", default=str(ROOT / "data" / "input"))
+    parser.add_argument("--limit", type=int, default=8, help="Số ảnh mỗi worker")
+    parser.add_argument("--synthetic", action="store_true", help="Workload torch + OpenCV")
+    parser.add_argument("--items", type=int, default=20, help="Số lần lặp (--synthetic)")
+    parser.add_argument("--out", default="data/output/benchmark_thread_budget.json")
+    args = parser.parse_args()
+
+    if args.synthetic:
+        payload = args.items
+    else:
+        payload = sorted(
+            str(p) for p in Path(args.dir).rglob("*")
+            if p.suffix.lower() in (".jpg", ".jpeg", ".png")
+        )[: args.limit]
+        if not payload:
+            print("No images found! (dùng --synthetic nếu không có data/input)")
+            return
+
+    rows = []
+    print(f"cpu_count={os.cpu_count()}  workload={'synthetic' if args.synthetic else 'ocr'}")
+    print(f"{'layout':>8} {'items':>6} {'wall_s':>8} {'items/s':>8}")
+    for layout in args.layouts or _default_layouts():
+        workers, threads = (int(v) for v in layout.lower().split("x"))
+        row = run_layout(workers, threads, args.synthetic, payload)
+        rows.append(row)
+        print(f"{row['layout']:>8} {row['items']:>6} {row['wall_s']:>8.2f} {row['throughput']:>8.2f}")
+
+    out = ROOT / args.out
+    out.parent.mkdir(parents=True, exist_ok=True)
+    out.write_text(json.dumps(rows, indent=2, ensure_ascii=False), encoding="utf-8")
+    print(f"\nSaved → {out}")
+
+
+if __name__ == "__main__":
+    main()
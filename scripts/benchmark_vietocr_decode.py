@@ -0,0 +1,150 @@
+#!/usr/bin/env python3
+"""
+Benchmark VietOCR greedy decode: translate() gốc vs KV-cache (fast_decode.py).
+
+Render các dòng thuốc dài (tên thuốc + hàm lượng + hướng dẫn) từ
+data/vaipe_drugs_kb.json rồi đo latency/dòng của 2 decoder, đồng thời kiểm
+tra text khớp token-by-token.
+
+Usage:
+    python scripts/benchmark_vietocr_decode.py
+    python scripts/benchmark_vietocr_decode.py --lines 64 --repeat 3 --gpu
+    python scripts/benchmark_vietocr_decode.py --crops-dir data/output/crops
+"""
+import argparse
+import json
+import sys
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).parent.parent
+sys.path.insert(0, str(ROOT))
+
+FONT_PATHS = [
+    "/usr/share/fonts/truetype/dejavu/DejaVuSans.ttf",
+    "/usr/share/fonts/truetype/liberation/LiberationSans-Regular.ttf",
+]
+INSTRUCTIONS = [
+    "Ngày uống 2 lần, mỗi lần 1 viên sau ăn",
+    "Uống sáng 1 viên, tối 1 viên trước khi ngủ",
+    "Mỗi lần 2 viên, ngày 3 lần sau ăn no",
+]
+
+
+def _long_lines(n: int) -> list[str]:
+    kb = json.loads((ROOT / "data" / "vaipe_drugs_kb.json").read_text(encoding="utf-8"))
+    samples = [t for item in kb.values() for t in item.get("sample_texts", [])]
+    lines = []
+    for i in range(n):
+        drug = samples[i % len(samples)]
+        lines.append(f"{drug} - {INSTRUCTIONS[i % len(INSTRUCTIONS)]}")
+    return lines
+
+
+def _render(text: str):
+    from PIL import Image, ImageDraw, ImageFont
+
+    font = None
+    for path in FONT_PATHS:
+        if Path(path).exists():
+            font = ImageFont.truetype(path, 28)
+            break
+    if font is None:
+        font = ImageFont.load_default()
+    probe = ImageDraw.Draw(Image.new("RGB", (1, 1)))
+    left, top, right, bottom = probe.textbbox((0, 0), text, font=font)
+    img = Image.new("RGB", (right - left + 20, bottom - top + 16), "white")
+    ImageDraw.Draw(img).text((10 - left, 8 - top), text, font=font, fill="black")
+    return img
+
+
+def _load_crops(crops_dir: Path, n: int):
+    from PIL import Image
+
+    paths = sorted(
+        p for p in crops_dir.iterdir() if p.suffix.lower() in (".png", ".jpg", ".jpeg")
+    )[:n]
+    return [Image.open(p).convert("RGB") for p in paths]
+
+
+def _time(fn, imgs, repeat):
+    best = None
+    out = None
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        out = fn(imgs)
+        elapsed = time.perf_counter() - t0
+        best = elapsed if best is None else min(best, elapsed)
+    return out, best
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[1])
+    parser.add_argument("--lines", type=int, default=32, help="Số dòng render")
+    parser.add_argument("--repeat", type=int, default=3, help="Lấy best-of-N")
+    parser.add_argument("--crops-dir", help="Dùng crop thật thay vì render")
+    parser.add_argument("--gpu", action="store_true", help="Use GPU")
+    parser.add_argument("--out", default="data/output/benchmark_vietocr_decode.json")
+    args = parser.parse_args()
+
+    from core.phase_a.s3_ocr.fast_decode import CachedGreedyRecognizer
+    from core.phase_a.s3_ocr.ocr_engine import HybridOcrModule
+
+    ocr = HybridOcrModule(device="gpu" if args.gpu else "cpu", rec_decoder="vietocr")
+    ocr._ensure_recognizer()
+    baseline = ocr._rec_engine
+    fast = CachedGreedyRecognizer(baseline)
+
+    if args.crops_dir:
+        imgs = _load_crops(Path(args.crops_dir), args.lines)
+        lines = [f"crop_{i}" for i in range(len(imgs))]
+    else:
+        lines = _long_lines(args.lines)
+        imgs = [_render(t) for t in lines]
+    if not imgs:
+        print("No line images!")
+        return
+
+    # Warm-up
+    baseline.predict_batch(imgs[:2])
+    fast.predict_batch(imgs[:2])
+
+    ref, t_ref = _time(baseline.predict_batch, imgs, args.repeat)
+    got, t_fast = _time(fast.predict_batch, imgs, args.repeat)
+    mismatches = [
+        {"line": lines[i], "vietocr": a, "kv_cache": b}
+        for i, (a, b) in enumerate(zip(ref, got))
+        if a != b
+    ]
+    avg_chars = sum(len(t) for t in ref) / len(ref)
+
+    print(f"\n{'=' * 60}")
+    print(f"VietOCR decode benchmark: {len(imgs)} dòng, ~{avg_chars:.0f} ký tự/dòng")
+    print(f"{'=' * 60}")
+    print(f"  translate() gốc : {t_ref * 1000 / len(imgs):8.1f} ms/dòng")
+    print(f"  KV-cache        : {t_fast * 1000 / len(imgs):8.1f} ms/dòng")
+    print(f"  Speedup         : {t_ref / max(t_fast, 1e-9):8.2f}x")
+    print(f"  Khớp text       : {len(imgs) - len(mismatches)}/{len(imgs)}")
+
+    out = ROOT / args.out
+    out.parent.mkdir(parents=True, exist_ok=True)
+    with open(out, "w", encoding="utf-8") as f:
+        json.dump(
+            {
+                "timestamp": time.strftime("%Y-%m-%d %H:%M:%S"),
+                "lines": len(imgs),
+                "avg_chars": round(avg_chars, 1),
+                "vietocr_ms_per_line": round(t_ref * 1000 / len(imgs), 2),
+                "kv_cache_ms_per_line": round(t_fast * 1000 / len(imgs), 2),
+                "speedup": round(t_ref / max(t_fast, 1e-9), 2),
+                "mismatches": mismatches,
+            },
+            f,
+            ensure_ascii=False,
+            indent=2,
+        )
+    print(f"\nResults saved → {out}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,60 @@
+#!/usr/bin/env python3
+"""
+Dựng index DrugLookup (core/phase_a/s6_drug_search/drug_index.py).
+
+DrugLookup tự dựng index lần đầu / khi drug_db_vn_full.json đổi; script này
+dựng sẵn lúc deploy (trước khi chạy nhiều worker) và so thời gian khởi tạo
+DrugLookup: parse JSON vs load index.
+
+Usage:
+    python scripts/build_drug_index.py
+    python scripts/build_drug_index.py --db data/drug_db_vn_full.json --out /srv/drug_index.bin
+"""
+import argparse
+import os
+import sys
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).parent.parent
+sys.path.insert(0, str(ROOT))
+
+
+def _timed(fn, repeat: int) -> float:
+    """ms / lần."""
+    t0 = time.perf_counter()
+    for _ in range(repeat):
+        fn()
+    return (time.perf_counter() - t0) / repeat * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[1])
+    parser.add_argument("--db", default="data/drug_db_vn_full.json")
+    parser.add_argument("--out", default=None, help="Mặc định: DRUG_INDEX_PATH")
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    from core.config import DRUG_INDEX_PATH
+    from core.phase_a.s6_drug_search.drug_index import read_header
+    from core.phase_a.s6_drug_search.drug_lookup import DrugLookup
+
+    db = str(ROOT / args.db)
+    if not os.path.exists(db):
+        sys.exit(f"Không tìm thấy {db} (scripts/crawl_drug_vn.py)")
+    out = os.path.expanduser(args.out or DRUG_INDEX_PATH)
+
+    lookup = DrugLookup(db, index_path="")
+    lookup.save_index(out)
+    header = read_header(out)
+    print(f"Saved → {out}  ({os.path.getsize(out) / 1024:.0f} KB, version {header['version']},"
+          f" {len(lookup._search_keys)} keys, sha256 {header['source']['sha256'][:12]})")
+
+    json_ms = _timed(lambda: DrugLookup(db, index_path=""), args.repeat)
+    index_ms = _timed(lambda: DrugLookup(db, index_path=out), args.repeat)
+    print(f"DrugLookup init: JSON {json_ms:.1f}ms  index {index_ms:.1f}ms"
+          f"  ({json_ms / index_ms:.1f}x)")
+
+
+if __name__ == "__main__":
+    main()
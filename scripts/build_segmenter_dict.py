@@ -0,0 +1,114 @@
+#!/usr/bin/env python3
+"""
+Dựng từ điển tách từ longest-match (core/phase_a/s5_classify/segmenter.py).
+
+Từ điển = cụm nhiều âm tiết xuất hiện ≥ --min-count lần trong tập NER train
+(đã tách bằng underthesea, prepare_ner_data.py) + tên thuốc / hoạt chất
+trong drug DB, bỏ các cụm mà underthesea thường tách ra trong train.
+Độ khớp (F1 theo span token) với cách tách underthesea được đo trên tập
+test và ghi vào file; Segmenter chỉ dùng từ điển khi độ khớp ≥
+SEGMENT_DICT_MIN_AGREEMENT (core/config.py).
+
+--texts: đo thêm trên các dòng thô (mỗi dòng 1 block) so với underthesea
+chạy trực tiếp (cần cài underthesea); độ khớp ghi vào file = min của 2 tập.
+
+Usage:
+    python scripts/build_segmenter_dict.py
+    python scripts/build_segmenter_dict.py --min-count 5 --texts blocks.txt
+"""
+import argparse
+import json
+import sys
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).parent.parent
+sys.path.insert(0, str(ROOT))
+
+
+def _agreement(pairs) -> float:
+    """Micro F1 trên mọi (pred, ref) — ghép nối tiếp để span không chồng nhau."""
+    from core.phase_a.s5_classify.segmenter import token_agreement
+
+    pred, ref = [], []
+    for p, r in pairs:
+        pred.extend(p)
+        ref.extend(r)
+    return token_agreement(pred, ref)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[1])
+    parser.add_argument("--train", default="data/ner_dataset/train.json")
+    parser.add_argument("--test", default="data/ner_dataset/test.json")
+    parser.add_argument("--drug-db", default="data/drug_db_vn.csv")
+    parser.add_argument("--min-count", type=int, default=3)
+    parser.add_argument("--texts", default=None, help="Dòng thô để so với underthesea")
+    parser.add_argument("--out", default=None, help="Mặc định: SEGMENT_DICT_PATH")
+    args = parser.parse_args()
+
+    from core.config import SEGMENT_DICT_MIN_AGREEMENT, SEGMENT_DICT_PATH
+    from core.phase_a.s5_classify.segmenter import (
+        LongestMatch,
+        consistent_phrases,
+        drug_db_phrases,
+        mine_phrases,
+    )
+
+    train = json.loads((ROOT / args.train).read_text(encoding="utf-8"))
+    test = json.loads((ROOT / args.test).read_text(encoding="utf-8"))
+    candidates = set(mine_phrases((s["tokens"] for s in train), args.min_count))
+    candidates |= set(drug_db_phrases(ROOT / args.drug_db))
+    # Chỉ giữ cụm underthesea thường gộp (cụm drug DB chưa gặp trong train vẫn giữ)
+    phrases = consistent_phrases((s["tokens"] for s in train), candidates)
+    matcher = LongestMatch(phrases)
+
+    t0 = time.perf_counter()
+    pairs = [
+        (matcher.tokenize(" ".join(s["tokens"]).replace("_", " ")), s["tokens"])
+        for s in test
+    ]
+    dict_ms = (time.perf_counter() - t0) * 1000
+    agreement = _agreement(pairs)
+    report = {"test": round(agreement, 4)}
+    print(f"phrases={len(matcher)} (candidates {len(candidates)})  test samples={len(test)}")
+    print(f"  agreement (test, vs underthesea tokens): {agreement:.4f}  ({dict_ms:.0f}ms)")
+
+    if args.texts:
+        from underthesea import word_tokenize
+
+        lines = [t.strip() for t in Path(args.texts).read_text(encoding="utf-8").splitlines()]
+        lines = [t for t in lines if t]
+        t0 = time.perf_counter()
+        refs = [word_tokenize(line, format="text").split() for line in lines]
+        ref_ms = (time.perf_counter() - t0) * 1000
+        t0 = time.perf_counter()
+        preds = [matcher.tokenize(line) for line in lines]
+        dict_ms = (time.perf_counter() - t0) * 1000
+        text_agreement = _agreement(zip(preds, refs))
+        report["texts"] = round(text_agreement, 4)
+        agreement = min(agreement, text_agreement)
+        print(f"  agreement (--texts, {len(lines)} lines): {text_agreement:.4f}"
+              f"  underthesea {ref_ms:.0f}ms vs dictionary {dict_ms:.0f}ms")
+
+    out = ROOT / (args.out or SEGMENT_DICT_PATH)
+    out.parent.mkdir(parents=True, exist_ok=True)
+    out.write_text(
+        json.dumps(
+            {
+                "phrases": phrases,
+                "agreement": round(agreement, 4),
+                "validation": report,
+                "min_count": args.min_count,
+            },
+            ensure_ascii=False,
+            indent=1,
+        ),
+        encoding="utf-8",
+    )
+    status = "enabled" if agreement >= SEGMENT_DICT_MIN_AGREEMENT else "disabled (underthesea)"
+    print(f"\nSaved → {out}  [{status}, threshold {SEGMENT_DICT_MIN_AGREEMENT}]")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,107 @@
+#!/usr/bin/env python3
+"""
+Distill PhoBERT NER (teacher) → student ít layer cho suy luận CPU.
+
+Student train trên data/ner_dataset/train.json theo soft label của teacher
++ nhãn gold (core/phase_a/s5_classify/distill.py), lưu như checkpoint HF
+thường. Dùng student: NER_MODEL_PATH = '<out>' (core/config.py) hoặc
+NerExtractor(model_path='<out>').
+Báo cáo trên test.json: drug F1 (so gold), độ khớp nhãn với teacher,
+ms/sample, speedup, số tham số.
+
+Usage:
+    python scripts/distill_ner.py
+    python scripts/distill_ner.py --layers 3 --epochs 8 --out models/phobert_ner_student
+    python scripts/distill_ner.py --report-only --out models/phobert_ner_student
+"""
+import argparse
+import json
+import sys
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).parent.parent
+sys.path.insert(0, str(ROOT))
+
+
+def _timed_predict(ner, word_lists, repeat: int):
+    """(nhãn, ms/sample) — đo sau 1 lượt warm-up."""
+    labels = ner.predict_word_labels(word_lists)
+    t0 = time.perf_counter()
+    for _ in range(repeat):
+        ner.predict_word_labels(word_lists)
+    return labels, (time.perf_counter() - t0) / (repeat * len(word_lists)) * 1000
+
+
+def _params(ner) -> float:
+    return sum(p.numel() for p in ner.model.parameters()) / 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[1])
+    parser.add_argument("--teacher", default="models/phobert_ner_model")
+    parser.add_argument("--out", default="models/phobert_ner_student")
+    parser.add_argument("--train", default="data/ner_dataset/train.json")
+    parser.add_argument("--test", default="data/ner_dataset/test.json")
+    parser.add_argument("--layers", type=int, default=4, help="Số layer encoder của student")
+    parser.add_argument("--epochs", type=int, default=5)
+    parser.add_argument("--batch", type=int, default=16)
+    parser.add_argument("--lr", type=float, default=5e-5)
+    parser.add_argument("--temperature", type=float, default=2.0)
+    parser.add_argument("--alpha", type=float, default=0.5, help="Trọng số KD (1 - alpha cho CE gold)")
+    parser.add_argument("--repeat", type=int, default=3, help="Số lượt đo latency")
+    parser.add_argument("--report-only", action="store_true", help="Chỉ so sánh --out với teacher")
+    args = parser.parse_args()
+
+    from core.phase_a.s5_classify.distill import distill, encode_samples, make_student
+    from core.phase_a.s5_classify.ner_eval import drug_f1, label_agreement
+    from core.phase_a.s5_classify.ner_extractor import NerExtractor
+
+    teacher = NerExtractor(model_path=str(ROOT / args.teacher), memo_size=0, backend="fp32")
+    out = ROOT / args.out
+
+    if not args.report_only:
+        train = json.loads((ROOT / args.train).read_text(encoding="utf-8"))
+        label2id = {label: int(i) for i, label in teacher.id2label.items()}
+        encoded = encode_samples(teacher, train, label2id)
+        student = make_student(teacher.model, args.layers)
+        print(f"Distill: {len(encoded)} train samples, {args.layers} layers, {args.epochs} epochs")
+        history = distill(
+            teacher.model, student, encoded, teacher.tokenizer.pad_token_id,
+            epochs=args.epochs, batch_size=args.batch, lr=args.lr,
+            temperature=args.temperature, alpha=args.alpha,
+        )
+        student.save_pretrained(out)
+        teacher.tokenizer.save_pretrained(out)
+        (out / "distill_config.json").write_text(
+            json.dumps(
+                {
+                    "teacher": args.teacher, "layers": args.layers, "epochs": args.epochs,
+                    "lr": args.lr, "temperature": args.temperature, "alpha": args.alpha,
+                    "loss": [round(x, 4) for x in history],
+                },
+                indent=2,
+            ),
+            encoding="utf-8",
+        )
+        print(f"Saved student → {out}")
+
+    test = json.loads((ROOT / args.test).read_text(encoding="utf-8"))
+    word_lists = [s["tokens"] for s in test]
+    golds = [s["ner_tags"] for s in test]
+    student_ner = NerExtractor(model_path=str(out), memo_size=0, backend="fp32")
+    teacher_labels, teacher_ms = _timed_predict(teacher, word_lists, args.repeat)
+    student_labels, student_ms = _timed_predict(student_ner, word_lists, args.repeat)
+    teacher_f1 = drug_f1(teacher_labels, golds)
+    student_f1 = drug_f1(student_labels, golds)
+
+    print(f"\ntest samples={len(word_lists)}")
+    print(f"{'model':>8} {'params':>8} {'drug_f1':>8} {'agree':>7} {'ms/sample':>10}")
+    print(f"{'teacher':>8} {_params(teacher):>7.1f}M {teacher_f1:>8.4f} {1.0:>7.4f} {teacher_ms:>10.2f}")
+    print(f"{'student':>8} {_params(student_ner):>7.1f}M {student_f1:>8.4f}"
+          f" {label_agreement(student_labels, teacher_labels):>7.4f} {student_ms:>10.2f}")
+    print(f"speedup {teacher_ms / student_ms:.2f}x   F1 delta {student_f1 - teacher_f1:+.4f}")
+
+
+if __name__ == "__main__":
+    main()
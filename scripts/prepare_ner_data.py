@@ -6,9 +6,13 @@ Output: data/ner_dataset/ (train.json, test.json)
 import json
 import os
 import re
+import sys
 from pathlib import Path
 from collections import Counter
 
+sys.path.insert(0, str(Path(__file__).parent.parent))
+from core.phase_a.s5_classify.segmenter import Segmenter
+
 # === CẤU HÌNH ===
 VAIPE_BASE = "VAIPE_Full/content/dataset"
 TRAIN_DIR = f"{VAIPE_BASE}/train/prescription/labels"
@@ -18,12 +22,13 @@ OUTPUT_DIR = "data/ner_dataset"
 # Regex cho STT prefix: "1)", "2.", "3 ", "10-"
 STT_REGEX = re.compile(r'^(\d+(?:[\)\.\-]|(?=\s))\s*)(.*)')
 
-try:
-    from underthesea import word_tokenize
-    HAS_UNDERTHESEA = True
+# Dữ liệu train luôn tách bằng underthesea (không dùng từ điển longest-match:
+# tập NER này chính là tham chiếu để validate từ điển). Header/hướng dẫn lặp
+# lại giữa các đơn → cache theo dòng.
+SEGMENTER = Segmenter(cache_size=50000)
+if SEGMENTER.backend == "underthesea":
     print("✅ underthesea loaded")
-except ImportError:
-    HAS_UNDERTHESEA = False
+else:
     print("⚠ underthesea not found, using space-split only")
 
 
@@ -62,8 +67,8 @@ def convert_file(json_path):
 
         # Tách từ tiếng Việt cho phần main_part
         # "Hoạt huyết dưỡng não" → "Hoạt_huyết_dưỡng não"
-        if HAS_UNDERTHESEA and main_part:
-            main_part = word_tokenize(main_part, format="text")
+        if main_part:
+            main_part = SEGMENTER.segment(main_part)
 
         prefix_tokens = prefix.split()
         main_tokens = main_part.split()
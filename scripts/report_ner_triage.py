@@ -0,0 +1,154 @@
+#!/usr/bin/env python3
+"""
+Tỉ lệ dòng bỏ qua PhoBERT nhờ triage + nhãn DRUG bị mất, theo từng nguồn dòng.
+
+Nguồn (mỗi nguồn có thì báo cáo riêng):
+    labels   Label JSON đơn thuốc VAIPE ([{text, label, box}], --labels):
+             dòng OCR thật, nhãn drugname/other → số đo chính (skip rate +
+             dòng drugname bị bỏ qua).
+    kb       sample_texts của data/vaipe_drugs_kb.json: 315 dòng OCR thật,
+             toàn dòng thuốc → chỉ đo DRUG loss, không đo được skip rate.
+    test     data/ner_dataset/test.json — chỉ lưu token cả đơn, dòng được dựng
+             lại bằng cách ngắt trước STT ("1)") và LINE_STARTS. LINE_STARTS
+             trùng từ mở đầu mà INSTRUCTION_RE bắt ("uống", "ngày", "sl",
+             "ghi_chú", "lời") → skip rate / gold loss ở nguồn này đúng một
+             phần do cách dựng dòng, KHÔNG phải ước lượng độc lập.
+Cột báo cáo:
+    skip rate     Tỉ lệ dòng triage gắn "other" (theo lý do)
+    gold loss     Dòng / token DRUG (nhãn gold) nằm trong dòng bị bỏ qua
+    ner loss      (--model) Dòng bị bỏ qua mà PhoBERT vẫn gắn DRUG
+                  = mất khớp so với chạy NER cho mọi dòng
+
+Usage:
+    python scripts/report_ner_triage.py
+    python scripts/report_ner_triage.py --labels VAIPE_Full/content/dataset/test/prescription/labels
+    python scripts/report_ner_triage.py --model models/phobert_ner_model
+"""
+import argparse
+import json
+import re
+import sys
+from collections import Counter
+from pathlib import Path
+
+ROOT = Path(__file__).parent.parent
+sys.path.insert(0, str(ROOT))
+
+_STT_RE = re.compile(r"^\d+\)$")
+# STT đầu dòng OCR thật ("1)", "2.") → dòng trong bảng thuốc
+_ROW_RE = re.compile(r"^\d+[\)\.]")
+LINE_STARTS = {
+    "sl", "ghi_chú", "ghi", "uống", "lời", "cộng", "chẩn_đoán", "chần_đoán",
+    "chấn_đoán", "thuốc", "cận", "huyết_áp", "mạch", "bác_sĩ", "tái", "ngày",
+    "điện_thoại", "họ", "địa_chỉ", "số",
+}
+
+
+def split_lines(tokens: list, tags: list) -> list:
+    """[(tokens, tags)] theo dòng dựng lại."""
+    lines, start = [], 0
+    for i, token in enumerate(tokens):
+        if i > start and (_STT_RE.match(token) or token.lower() in LINE_STARTS):
+            lines.append((tokens[start:i], tags[start:i]))
+            start = i
+    if start < len(tokens):
+        lines.append((tokens[start:], tags[start:]))
+    return lines
+
+
+def _word_tags(text: str, is_drug: bool) -> tuple:
+    words = text.split()
+    tags = ["B-DRUG"] + ["I-DRUG"] * (len(words) - 1) if is_drug else ["O"] * len(words)
+    return words, tags
+
+
+def lines_from_labels(label_dir: Path) -> list:
+    """[(tokens, tags, is_row)] — 1 dòng / block OCR của label JSON VAIPE."""
+    lines = []
+    for path in sorted(label_dir.glob("*.json")):
+        for block in json.loads(path.read_text(encoding="utf-8")):
+            text = block.get("text", "").strip()
+            if text:
+                is_drug = block.get("label", "other").lower() == "drugname"
+                lines.append((*_word_tags(text, is_drug), bool(_ROW_RE.match(text))))
+    return lines
+
+
+def lines_from_kb(kb_path: Path) -> list:
+    kb = json.loads(kb_path.read_text(encoding="utf-8"))
+    return [
+        (*_word_tags(text, True), bool(_ROW_RE.match(text)))
+        for drug in kb.values()
+        for text in drug.get("sample_texts", [])
+    ]
+
+
+def lines_from_test(test_path: Path) -> list:
+    samples = json.loads(test_path.read_text(encoding="utf-8"))
+    return [
+        (tokens, tags, bool(_STT_RE.match(tokens[0])))
+        for sample in samples
+        for tokens, tags in split_lines(sample["tokens"], sample["ner_tags"])
+    ]
+
+
+def report(name: str, lines: list, ner=None) -> None:
+    from core.phase_a.s5_classify.triage import REASONS, LineTriage
+
+    triage = LineTriage()
+    rows = [(tokens, tags, triage.reason(" ".join(tokens), is_row=is_row))
+            for tokens, tags, is_row in lines]
+    skipped = [row for row in rows if row[2]]
+
+    stats = triage.stats()
+    n = stats["lines"]
+    print(f"[{name}] lines={n}  skipped={stats['skipped']} ({stats['skipped'] / max(n, 1):.1%})")
+    for reason in REASONS:
+        print(f"  {reason:>12} {stats[reason]:>6}")
+
+    is_drug = lambda tag: tag.endswith("-DRUG")  # noqa: E731
+    drug_lines = sum(any(map(is_drug, tags)) for _, tags, _ in rows)
+    drug_tokens = sum(sum(map(is_drug, tags)) for _, tags, _ in rows)
+    lost = Counter(reason for _, tags, reason in skipped if any(map(is_drug, tags)))
+    lost_tokens = sum(sum(map(is_drug, tags)) for _, tags, _ in skipped)
+    print(f"  gold loss: {sum(lost.values())}/{drug_lines} DRUG lines,"
+          f" {lost_tokens}/{drug_tokens} DRUG tokens  {dict(lost)}")
+
+    if ner is not None and skipped:
+        preds = ner.predict_word_labels([tokens for tokens, _, _ in skipped])
+        ner_lost = sum(any(map(is_drug, labels)) for labels in preds)
+        print(f"  ner loss: {ner_lost}/{len(skipped)} skipped lines had DRUG predictions"
+              f" ({ner_lost / max(n, 1):.2%} of all lines)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[1])
+    parser.add_argument("--labels", default="VAIPE_Full/content/dataset/test/prescription/labels",
+                        help="Thư mục label JSON đơn thuốc VAIPE (dòng OCR thật)")
+    parser.add_argument("--kb", default="data/vaipe_drugs_kb.json")
+    parser.add_argument("--test", default="data/ner_dataset/test.json")
+    parser.add_argument("--model", default=None, help="Checkpoint PhoBERT để đo ner loss")
+    args = parser.parse_args()
+
+    ner = None
+    if args.model:
+        from core.phase_a.s5_classify.ner_extractor import NerExtractor
+
+        ner = NerExtractor(model_path=str(ROOT / args.model), memo_size=0)
+
+    sources = [
+        ("labels", ROOT / args.labels, lines_from_labels),
+        ("kb", ROOT / args.kb, lines_from_kb),
+        ("test", ROOT / args.test, lines_from_test),
+    ]
+    for name, path, load in sources:
+        if not path.exists():
+            print(f"[{name}] {path} không tồn tại — bỏ qua")
+            continue
+        report(name, load(path), ner)
+    print("Lưu ý: [test] dựng dòng bằng đúng các từ mở đầu INSTRUCTION_RE bắt →"
+          " skip rate của nguồn này thiên cao theo cách dựng; dùng [labels] làm số đo chính.")
+
+
+if __name__ == "__main__":
+    main()
@@ -122,16 +122,26 @@ def run_phase_a(img_path, out_dir, shared=None):
         from core.phase_a.s3_ocr.ocr_engine import HybridOcrModule
         import torch
         _ocr_device = "gpu" if torch.cuda.is_available() else "cpu"
-        ocr_module = HybridOcrModule(device=_ocr_device)
+        ocr_kwargs = {}
+        if shared and shared.get("ocr_cache"):
+            from core.config import OCR_CACHE_DIR
+            ocr_kwargs["cache_dir"] = OCR_CACHE_DIR
+        ocr_module = HybridOcrModule(device=_ocr_device, **ocr_kwargs)
         if shared is not None:
             shared["ocr"] = ocr_module
 
-    # 3.1: Text Detection (PaddleOCR)
+    # 3.1: Text Detection (PaddleOCR) — chỉ trong bảng thuốc nếu --table-roi
+    # (detector/recognizer load lazy — cache hit thì không load model)
     t1 = time.time()
-    ocr_module._ensure_detector()
-    polys = ocr_module._detect_polys(processed)
+    table_detector = shared.get("table_detector") if shared else None
+    roi = table_detector.locate(processed) if table_detector is not None else None
+    if roi is not None:
+        polys = ocr_module._detect_polys_roi(processed, roi)
+    else:
+        polys = ocr_module._detect_polys(processed)
     t_det = time.time() - t1
-    print_step("3.1", "Text Detection", "ok", t_det, f"found {len(polys)} regions")
+    roi_info = f", table ROI {roi}" if roi is not None else ""
+    print_step("3.1", "Text Detection", "ok", t_det, f"found {len(polys)} regions{roi_info}")
     
     # [DEBUG VIZ] Vẽ polygons và đánh số thứ tự
     det_img = processed.copy()
@@ -146,7 +156,6 @@ def run_phase_a(img_path, out_dir, shared=None):
 
     # 3.2: Text Recognition (VietOCR)
     t2 = time.time()
-    ocr_module._ensure_recognizer()
     text_blocks = ocr_module._recognize_batch(processed, polys)
     t_rec = time.time() - t2
     print_step("3.2", "Text Recognition", "ok", t_rec, f"read {len(text_blocks)} blocks")
@@ -167,17 +176,14 @@ def run_phase_a(img_path, out_dir, shared=None):
     )
     ocr_module.save_results(result, processed, "step-3.2", out_dir, out_dir, out_dir)
 
-    ocr_blocks = [
-        {"text": b.text, "confidence": round(b.confidence, 4), "bbox": b.bbox}
-        for b in text_blocks
-    ]
+    ocr_blocks = result.to_dicts()
     with open(os.path.join(out_dir, "step-3.2_ocr.json"), "w", encoding="utf-8") as f:
         json.dump(ocr_blocks, f, ensure_ascii=False, indent=2)
 
     # 3.3: STT Grouping (Check-only)
     from core.phase_a.s3_ocr.ocr_engine import group_by_stt
     t3_start = time.time()
-    merged_blocks_obj = group_by_stt(text_blocks)
+    merged_blocks_obj = group_by_stt(result)
     merged_blocks = [
         {"text": b.text, "confidence": round(b.confidence, 4), "bbox": b.bbox}
         for b in merged_blocks_obj
@@ -296,8 +302,15 @@ def main():
     parser.add_argument("--limit", type=int, default=0, help="Limit number of images to process")
     parser.add_argument("--no-drug-lookup", action="store_true", help="Skip Drug Lookup step (step 5)")
     parser.add_argument("--stt-grouping", action="store_true", help="Enable STT Grouping (Step 3.3) for NER input")
+    parser.add_argument("--table-roi", action="store_true", help="OCR only the medication table (needs TABLE_YOLO_WEIGHTS)")
+    parser.add_argument("--ocr-cache", action="store_true", help="Cache detect/recognize results on disk (OCR_CACHE_DIR)")
+    parser.add_argument("--threads", type=int, default=0, help="CPU threads for torch/Paddle/OpenCV (0 = library defaults)")
     args = parser.parse_args()
 
+    if args.threads > 0:
+        from core.shared.thread_budget import configure_threads
+        configure_threads(args.threads)
+
     # Determine images to process
     if args.image:
         images = [args.image]
@@ -331,7 +344,8 @@ def main():
 
     # ── Load shared modules (singleton) ────────────────────────────────────
     shared = {
-        "stt_grouping": args.stt_grouping
+        "stt_grouping": args.stt_grouping,
+        "ocr_cache": args.ocr_cache,
     }
 
     # YOLO detector
@@ -342,6 +356,17 @@ def main():
     shared["detector"] = PrescriptionDetector()
     print("  YOLO detector loaded")
 
+    # Table ROI detector (optional)
+    if args.table_roi:
+        from core.config import TABLE_YOLO_WEIGHTS
+        from core.phase_a.s1_detect.table_detector import TableRegionDetector
+        table_weights = os.path.join(ROOT, TABLE_YOLO_WEIGHTS)
+        if TableRegionDetector.weights_available(table_weights):
+            shared["table_detector"] = TableRegionDetector(table_weights)
+            print("  Table ROI detector loaded")
+        else:
+            logger.warning(f"Table weights not found: {table_weights} → full-image OCR")
+
     # PhoBERT NER matcher
     if not args.no_ner:
         try:
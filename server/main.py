@@ -152,6 +152,11 @@ def _runtime_info() -> dict:
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
+    # Thread budget torch/Paddle/OpenCV — 1 lần mỗi worker, trước khi load model
+    from core.shared.thread_budget import configure_threads
+
+    configure_threads()
+
     # VĐ7: Pre-load services + warm-up AI pipeline
     _get_drug_service()
 
@@ -193,6 +198,8 @@ app.add_middleware(
 
 @app.get("/api/health")
 async def health():
+    from core.shared import thread_budget
+
     svc = _get_drug_service()
     pipeline = _get_pipeline()
     return {
@@ -207,6 +214,12 @@ async def health():
             "pipeline_last_error": _pipeline_last_error,
             "scan_semaphore_limit": 1,
         },
+        "thread_budget": thread_budget.report(),
+        "ner_memo": (
+            (pipeline.get_model_info().get("checkpoint") or {}).get("ner_memo")
+            if pipeline is not None
+            else None
+        ),
     }
 
 
@@ -0,0 +1,125 @@
+"""Detector profile cpu_onednn: input cố định, self-test, tự lùi về default."""
+import numpy as np
+import pytest
+
+from core.phase_a.s3_ocr import det_profiles
+from core.phase_a.s3_ocr.det_profiles import (
+    load_detector,
+    pin_input,
+    polys_agree,
+    resolve_det_profile,
+    selftest_image,
+    unpin_polys,
+)
+
+
+def _box(x1, y1, x2, y2):
+    return [[x1, y1], [x2, y1], [x2, y2], [x1, y2]]
+
+
+class _ProjectionDet:
+    """Detector giả: mỗi cụm hàng có mực = 1 box; drop_every bỏ bớt dòng."""
+
+    def __init__(self, profile, drop_every=0):
+        self.profile = profile
+        self.drop_every = drop_every
+
+    def predict(self, image):
+        ink = image.min(axis=2) < 128
+        rows = np.flatnonzero(ink.any(axis=1))
+        if not rows.size:
+            return [{"dt_polys": []}]
+        groups = np.split(rows, np.flatnonzero(np.diff(rows) > 1) + 1)
+        polys = []
+        for n, g in enumerate(groups):
+            if self.drop_every and n % self.drop_every == 0:
+                continue
+            cols = np.flatnonzero(ink[g[0] : g[-1] + 1].any(axis=0))
+            polys.append(np.array(_box(cols[0], g[0], cols[-1], g[-1])))
+        return [{"dt_polys": polys}]
+
+
+@pytest.fixture
+def fake_build(monkeypatch):
+    monkeypatch.setattr(det_profiles, "_detectors", {})
+
+    def install(drop_every_fast=0):
+        def build(det_model, device, profile, cpu_threads=None):
+            drop = drop_every_fast if profile["mkldnn"] else 0
+            return _ProjectionDet(profile, drop)
+
+        monkeypatch.setattr(det_profiles, "build_detector", build)
+
+    return install
+
+
+def test_pin_input_round_trip():
+    image = np.zeros((1800, 1200, 3), np.uint8)
+    canvas, scale = pin_input(image, 960)
+    assert canvas.shape == (960, 960, 3)
+    assert scale == pytest.approx(960 / 1800)
+    assert unpin_polys([_box(96, 48, 480, 96)], scale) == [_box(180, 90, 900, 180)]
+
+    small, scale = pin_input(np.zeros((300, 200, 3), np.uint8), 960)
+    assert small.shape == (960, 960, 3) and scale == 1.0
+
+
+def test_polys_agree_tolerates_jitter_but_not_missing_lines():
+    ref = [_box(10, 10 + 50 * i, 400, 40 + 50 * i) for i in range(20)]
+    jitter = [_box(x1 + 2, y1 - 1, x2 - 3, y2 + 1) for (x1, y1), _, (x2, y2), _ in ref]
+    assert polys_agree(ref, jitter)
+    assert not polys_agree(ref, ref[::2])
+    assert not polys_agree(ref, [_box(x1, y1 + 20, x2, y2 + 20) for (x1, y1), _, (x2, y2), _ in ref])
+
+
+def test_onednn_profile_kept_when_self_test_passes(fake_build):
+    fake_build()
+    engine, profile = load_detector("det", "cpu", "cpu_onednn")
+    assert profile["name"] == "cpu_onednn" and engine.profile["mkldnn"]
+    # Cache theo process
+    assert load_detector("det", "cpu", "cpu_onednn")[0] is engine
+
+    page = selftest_image()
+    plain = det_profiles.detect(_ProjectionDet(resolve_det_profile("default")), page, resolve_det_profile("default"))
+    assert polys_agree(plain, det_profiles.detect(engine, page, profile))
+
+
+def test_onednn_profile_falls_back_when_polygons_diverge(fake_build):
+    fake_build(drop_every_fast=2)
+    engine, profile = load_detector("det", "cpu", "cpu_onednn")
+    assert profile["name"] == "default" and not engine.profile["mkldnn"]
+
+
+def test_gpu_ignores_onednn_profile(fake_build):
+    fake_build()
+    _, profile = load_detector("det", "gpu", "cpu_onednn")
+    assert profile["name"] == "default"
+
+
+def test_hybrid_module_pins_detector_input(fake_build):
+    pytest.importorskip("torch")
+    from core.phase_a.s3_ocr.ocr_engine import HybridOcrModule
+
+    fake_build()
+    ocr = HybridOcrModule(device="cpu", det_profile="cpu_onednn")
+    page = selftest_image()
+    polys = ocr._detect_polys(page)
+
+    assert ocr._det_profile["name"] == "cpu_onednn"
+    plain = _ProjectionDet(resolve_det_profile("default")).predict(page)[0]["dt_polys"]
+    assert polys_agree([p.tolist() for p in plain], polys)
+    with pytest.raises(ValueError):
+        HybridOcrModule(device="cpu", det_profile="tensorrt")
+
+
+def test_cache_fingerprint_stable_across_self_test_fallback(fake_build):
+    pytest.importorskip("torch")
+    from core.phase_a.s3_ocr.ocr_engine import HybridOcrModule
+
+    fake_build(drop_every_fast=2)
+    ocr = HybridOcrModule(device="cpu", det_profile="cpu_onednn")
+    before = ocr._det_fingerprint()
+    ocr._ensure_detector()
+
+    assert ocr._det_profile["name"] == "default"
+    assert ocr._det_fingerprint() == before
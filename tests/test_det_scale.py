@@ -0,0 +1,98 @@
+"""Detect ở độ phân giải theo chiều cao dòng, polygon về toạ độ ảnh gốc."""
+import cv2
+import numpy as np
+import pytest
+
+from core.phase_a.s3_ocr.det_scale import (
+    MAX_DET_SCALE,
+    TARGET_LINE_PX,
+    choose_scale,
+    median_line_height,
+)
+from tests.test_det_profiles import _box, _ProjectionDet
+
+
+def _page(line_px, width=1200, lines=8):
+    """Trang trắng, `lines` dòng chữ cao ~line_px."""
+    scale = line_px / 22.0  # FONT_HERSHEY_SIMPLEX, thickness 2: ~22px / scale 1
+    height = int(lines * line_px * 3 + line_px * 2)
+    page = np.full((height, width, 3), 255, np.uint8)
+    for i in range(lines):
+        y = int(line_px * 2 + i * line_px * 3)
+        cv2.putText(page, "Paracetamol 500mg", (20, y), cv2.FONT_HERSHEY_SIMPLEX,
+                    scale, (20, 20, 20), max(1, int(scale * 2)))
+    return page
+
+
+class _Recording(_ProjectionDet):
+    def __init__(self):
+        super().__init__({"mkldnn": False})
+        self.shapes = []
+
+    def predict(self, image):
+        self.shapes.append(image.shape[:2])
+        return super().predict(image)
+
+
+def test_choose_scale_targets_line_height():
+    assert choose_scale(TARGET_LINE_PX * 4, (4000, 3000)) == pytest.approx(0.25)
+    assert choose_scale(TARGET_LINE_PX, (4000, 3000)) == pytest.approx(1.0)
+    assert choose_scale(1, (100, 100)) == MAX_DET_SCALE
+    assert choose_scale(1, (3000, 3000)) == pytest.approx(4000 / 3000)
+    assert median_line_height([_box(0, 0, 10, 20), _box(0, 0, 10, 40), _box(0, 0, 1, 1)]) == 30
+
+
+@pytest.fixture
+def ocr():
+    pytest.importorskip("torch")
+    from core.phase_a.s3_ocr.ocr_engine import HybridOcrModule
+
+    module = HybridOcrModule(device="cpu", adaptive_det=True)
+    module._det_engine = _Recording()
+    return module
+
+
+def _reference(page):
+    return [p.tolist() for p in _ProjectionDet({}).predict(page)[0]["dt_polys"]]
+
+
+def test_large_page_detected_at_line_height_scale(ocr):
+    from core.phase_a.s3_ocr.det_profiles import polys_agree
+
+    page = _page(line_px=40, width=4000)  # probe 0.24 → dòng chỉ ~12px
+    reference = _reference(page)
+    scale = choose_scale(median_line_height(reference), page.shape)
+    polys = ocr._detect_polys(page)
+
+    probe, final = ocr._det_engine.shapes
+    assert max(probe) == 960
+    # Chiều cao dòng ước lượng từ probe (độ phân giải thấp) → sai số nhỏ
+    assert final[1] / page.shape[1] == pytest.approx(scale, rel=0.1)
+    assert max(probe) < max(final) < max(page.shape[:2])
+    assert polys_agree(reference, polys, min_iou=0.8)
+
+
+def test_probe_result_reused_when_scale_is_close(ocr):
+    page = _page(line_px=100, width=4000)  # probe 0.24 ≈ scale theo dòng
+    polys = ocr._detect_polys(page)
+
+    assert len(ocr._det_engine.shapes) == 1
+    assert len(polys) == 8
+    assert max(max(y for _, y in p) for p in polys) > 960  # toạ độ ảnh gốc
+
+
+def test_empty_probe_falls_back_to_full_resolution(ocr):
+    page = _page(line_px=8, width=6000)  # probe 0.16 → dòng ~1px, mất hẳn
+    polys = ocr._detect_polys(page)
+
+    probe, final = ocr._det_engine.shapes
+    assert max(probe) == 960 and final == page.shape[:2]
+    assert len(polys) == 8
+
+
+def test_adaptive_det_disabled_for_pinned_profile():
+    pytest.importorskip("torch")
+    from core.phase_a.s3_ocr.ocr_engine import HybridOcrModule
+
+    module = HybridOcrModule(device="cpu", adaptive_det=True, det_profile="cpu_onednn")
+    assert module._adaptive_det is False
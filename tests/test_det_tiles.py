@@ -0,0 +1,105 @@
+"""Detect theo tile chồng lấn: ghép polygon bị cắt, khớp detect 1 lần."""
+import cv2
+import numpy as np
+import pytest
+
+from core.phase_a.s3_ocr import det_tiles
+from core.phase_a.s3_ocr.det_profiles import parse_polys, polys_agree
+from core.phase_a.s3_ocr.det_tiles import detect_tiled, stitch, tile_grid
+from tests.test_det_profiles import _box, _ProjectionDet
+
+
+def _scan(width=2600, lines=14, line_px=30):
+    """Trang rộng, dòng dài vắt qua nhiều tile, lệch x theo dòng."""
+    page = np.full((lines * line_px * 3 + 80, width, 3), 255, np.uint8)
+    scale = line_px / 22.0
+    for i in range(lines):
+        text = "Paracetamol 500mg - 20 Vien - Ngay uong 2 lan" if i % 2 else "STT 1 Amoxicillin 250mg"
+        cv2.putText(page, text, (30 + 70 * i, 60 + i * line_px * 3), cv2.FONT_HERSHEY_SIMPLEX,
+                    scale, (20, 20, 20), 2)
+    return page
+
+
+def _detect_fn(calls):
+    det = _ProjectionDet({})
+
+    def detect(images):
+        calls.append([image for image in images])
+        return [parse_polys(det.predict(image)) for image in images], True
+
+    return detect
+
+
+def test_tile_grid_covers_image_with_overlap():
+    tiles = tile_grid(2000, 3000, tile=960, overlap=128)
+    cover = np.zeros((2000, 3000), bool)
+    for x0, y0, x1, y1 in tiles:
+        assert x1 - x0 <= 960 and y1 - y0 <= 960
+        cover[y0:y1, x0:x1] = True
+    assert cover.all()
+    xs = sorted({x0 for x0, _, _, _ in tiles})
+    assert all(b - a <= 960 - 128 for a, b in zip(xs, xs[1:]))
+    assert tile_grid(500, 700) == [(0, 0, 700, 500)]
+
+
+def test_tiled_detection_matches_single_pass():
+    page = _scan()
+    reference = parse_polys(_ProjectionDet({}).predict(page))
+    calls = []
+    polys, ok = detect_tiled(page, _detect_fn(calls), tile=640, overlap=96, batch=3)
+
+    assert ok
+    assert len(polys) == len(reference)
+    assert polys_agree(reference, polys, min_iou=0.9)
+    # Bộ nhớ: mỗi lô ≤ batch tile, tile là view của ảnh gốc (không copy)
+    assert all(len(chunk) <= 3 for chunk in calls)
+    assert all(np.shares_memory(tile, page) for chunk in calls for tile in chunk)
+
+
+def test_stitch_keeps_separate_words_on_same_row():
+    # 2 từ cùng hàng, không chạm mép trong tile → giữ riêng như detect 1 lần
+    tiles = [(0, 0, 600, 400), (500, 0, 1100, 400)]
+    left = [_box(10, 100, 200, 130), _box(260, 100, 480, 130)]
+    right = [_box(100, 100, 300, 130)]
+    polys = stitch([left, right], tiles, 1100, 400)
+    assert len(polys) == 3
+
+    # Dòng bị cắt ở mép tile → 2 mảnh được gộp thành 1
+    cut_left = [_box(400, 200, 599, 230)]
+    cut_right = [_box(0, 201, 250, 229)]
+    (merged,) = stitch([cut_left, cut_right], tiles, 1100, 400)
+    xs = [x for x, _ in merged]
+    assert min(xs) == 400 and max(xs) == 750
+
+
+def test_detect_tiled_propagates_failure():
+    page = _scan(width=1400, lines=4)
+    polys, ok = detect_tiled(page, lambda images: ([[] for _ in images], False), tile=640)
+    assert polys == [] and not ok
+
+
+def test_hybrid_module_tiles_only_large_images(monkeypatch):
+    pytest.importorskip("torch")
+    from core.phase_a.s3_ocr.ocr_engine import HybridOcrModule
+
+    class _Recording(_ProjectionDet):
+        def __init__(self):
+            super().__init__({})
+            self.shapes = []
+
+        def predict(self, image):
+            images = image if isinstance(image, list) else [image]
+            self.shapes.extend(i.shape[:2] for i in images)
+            return [super(_Recording, self).predict(i)[0] for i in images]
+
+    monkeypatch.setattr(det_tiles, "TILE_TRIGGER_SIDE", 2000)
+    ocr = HybridOcrModule(device="cpu", tiled_det=True)
+    ocr._det_engine = _Recording()
+    page, small = _scan(), _scan(width=1200, lines=4)
+
+    big_polys, small_polys = ocr._detect_polys_many([page, small])
+    assert polys_agree(parse_polys(_ProjectionDet({}).predict(page)), big_polys, min_iou=0.9)
+    assert len(small_polys) == 4
+    assert small.shape[:2] in ocr._det_engine.shapes
+    assert max(max(shape) for shape in ocr._det_engine.shapes if shape != small.shape[:2]) <= 960
+    assert "tiled=True" in ocr._det_fingerprint()
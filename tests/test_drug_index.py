@@ -0,0 +1,75 @@
+"""Index DrugLookup dựng sẵn: load mmap, kết quả như parse JSON, tự dựng lại."""
+import json
+import os
+
+import pytest
+
+from core.phase_a.s6_drug_search import drug_index
+from core.phase_a.s6_drug_search.drug_lookup import DrugLookup
+
+DRUGS = [
+    {"tenThuoc": "Cozaar 50mg", "soDangKy": "VN-1",
+     "hoatChat": [{"tenHoatChat": "Losartan", "nongDo": "50 mg"}]},
+    {"tenThuoc": "Partamol Tab. 500mg", "soDangKy": "VD-2",
+     "hoatChat": [{"tenHoatChat": "Paracetamol", "nongDo": "500 mg"}]},
+    {"tenThuoc": "Augmentin 625mg", "soDangKy": "VN-3",
+     "hoatChat": [{"tenHoatChat": "Amoxicillin", "nongDo": "500 mg"},
+                  {"tenHoatChat": "Acid clavulanic", "nongDo": "125 mg"}]},
+]
+QUERIES = ["Losartan ( Cozaar 50 mg ) 50 mg", "PARTAMOL TAB. 500 mg", "Amoxicilin 500mg", "Ngày uống 2 lần"]
+
+
+@pytest.fixture
+def db(tmp_path):
+    path = tmp_path / "drug_db_vn_full.json"
+    path.write_text(json.dumps({"drugs": DRUGS}, ensure_ascii=False), encoding="utf-8")
+    return path
+
+
+def test_index_matches_json_lookup(db, tmp_path):
+    index = str(tmp_path / "drug_index.bin")
+    plain = DrugLookup(str(db), index_path="")
+    built = DrugLookup(str(db), index_path=index)
+    assert built._index is None and os.path.exists(index)
+
+    loaded = DrugLookup(str(db), index_path=index)
+    assert loaded._index is not None
+    assert loaded._search_keys == plain._search_keys
+    assert list(loaded._entries) == plain._entries
+    assert loaded.db_size == plain.db_size == 3
+    assert loaded.catalog_names() == plain.catalog_names()
+    for query in QUERIES:
+        assert loaded.lookup(query) == plain.lookup(query)
+    assert loaded._key_tokens(0) == plain._key_tokens(0)
+    assert loaded._ngram.shortlist("losartan cozaar", 2) == plain._ngram.shortlist("losartan cozaar", 2)
+
+
+def test_index_rebuilds_when_source_changes(db, tmp_path):
+    index = str(tmp_path / "drug_index.bin")
+    DrugLookup(str(db), index_path=index)
+
+    # Đổi mtime, giữ nội dung → checksum khớp, vẫn dùng index
+    stat = os.stat(db)
+    os.utime(db, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10**9))
+    assert DrugLookup(str(db), index_path=index)._index is not None
+
+    db.write_text(json.dumps({"drugs": DRUGS[:1]}, ensure_ascii=False), encoding="utf-8")
+    rebuilt = DrugLookup(str(db), index_path=index)
+    assert rebuilt._index is None and rebuilt.db_size == 1
+    assert DrugLookup(str(db), index_path=index).db_size == 1
+
+
+def test_index_version_mismatch_rebuilds(db, tmp_path, monkeypatch):
+    index = str(tmp_path / "drug_index.bin")
+    DrugLookup(str(db), index_path=index)
+    monkeypatch.setattr(drug_index, "INDEX_VERSION", drug_index.INDEX_VERSION + 1)
+    assert DrugLookup(str(db), index_path=index)._index is None
+    assert drug_index.read_header(index)["version"] == drug_index.INDEX_VERSION
+
+
+def test_corrupt_index_falls_back(db, tmp_path):
+    index = tmp_path / "drug_index.bin"
+    index.write_bytes(b"garbage")
+    lookup = DrugLookup(str(db), index_path=str(index))
+    assert lookup.lookup(QUERIES[0])["name"] == "Cozaar 50mg"
+    assert drug_index.read_header(str(index))["version"] == drug_index.INDEX_VERSION
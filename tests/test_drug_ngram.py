@@ -0,0 +1,55 @@
+"""Shortlist trigram trước rapidfuzz: cùng kết quả với chấm toàn bộ key."""
+import json
+from pathlib import Path
+
+import pytest
+
+from core.phase_a.s6_drug_search.drug_lookup import DrugLookup
+from core.phase_a.s6_drug_search.ngram_index import NgramIndex, trigrams
+
+ROOT = Path(__file__).parent.parent
+SHORTLIST = 25
+
+
+@pytest.fixture(scope="module")
+def queries():
+    kb = json.loads((ROOT / "data" / "vaipe_drugs_kb.json").read_text(encoding="utf-8"))
+    return [text for drug in kb.values() for text in drug["sample_texts"]]
+
+
+@pytest.fixture(scope="module")
+def lookups():
+    brute = DrugLookup(index_path="", shortlist=0)
+    fast = DrugLookup(index_path="", shortlist=SHORTLIST)
+    assert len(fast._search_keys) > SHORTLIST
+    return brute, fast
+
+
+def test_trigrams_ignore_word_order():
+    assert trigrams("Amoxicillin 500mg") == trigrams("500MG amoxicillin")
+    assert " a " in trigrams("vitamin a")
+
+
+def test_shortlist_ranks_shared_grams():
+    index = NgramIndex.build(["paracetamol", "amoxicillin", "omeprazol", "paracetamol codein"])
+    assert index.shortlist("paracetamo1", 1) == [0]
+    assert index.shortlist("xyz", 5) == []
+    assert index.shortlist("omeprazol paracetamol", 2) == [0, 2]
+
+
+def test_top5_recall_against_brute_force(lookups, queries):
+    brute, fast = lookups
+    found = total = 0
+    for text in queries:
+        for query in (brute._clean(text), text.strip().lower()):
+            expected = {idx for _, score, idx in brute._extract(query) if score >= 65}
+            got = {idx for _, _, idx in fast._extract(query)}
+            found += len(expected & got)
+            total += len(expected)
+    assert total > 0
+    assert found / total >= 0.99
+
+
+def test_lookup_matches_brute_force_on_ocr_samples(lookups, queries):
+    brute, fast = lookups
+    assert [fast.lookup(q) for q in queries] == [brute.lookup(q) for q in queries]
@@ -0,0 +1,77 @@
+"""extract_many: 1 lần detect + batch VietOCR chung cho nhiều trang."""
+import numpy as np
+import pytest
+
+pytest.importorskip("torch")
+
+from core.phase_a.s3_ocr.ocr_engine import HybridOcrModule  # noqa: E402
+
+
+def _box(x1, y1, x2, y2):
+    return np.array([[x1, y1], [x2, y1], [x2, y2], [x1, y2]])
+
+
+class _Det:
+    """Số dòng = giá trị pixel [0, 0] của ảnh."""
+
+    def __init__(self):
+        self.calls = []
+
+    def _one(self, image):
+        n = int(image[0, 0, 0])
+        return {"dt_polys": [_box(10, 10 + 40 * i, 290, 40 + 40 * i) for i in range(n)]}
+
+    def predict(self, inputs):
+        self.calls.append(len(inputs) if isinstance(inputs, list) else 1)
+        if isinstance(inputs, list):
+            return [self._one(image) for image in inputs]
+        return [self._one(inputs)]
+
+
+class _Rec:
+    def __init__(self):
+        self.batches = []
+
+    def predict_batch(self, crops, return_prob=False):
+        self.batches.append(len(crops))
+        return [f"line {crop.size[1]}" for crop in crops], [0.9] * len(crops)
+
+
+def _pages():
+    pages = []
+    for n in (3, 1, 2):
+        page = np.full((200, 300, 3), 255, np.uint8)
+        page[:20, :20] = n
+        pages.append(page)
+    return pages
+
+
+def _module():
+    ocr = HybridOcrModule(device="cpu")
+    ocr._det_engine, ocr._rec_engine = _Det(), _Rec()
+    return ocr
+
+
+def test_extract_many_shares_detect_and_recognize_batches():
+    ocr = _module()
+    results = ocr.extract_many(_pages())
+
+    assert ocr._det_engine.calls == [3]
+    assert ocr._rec_engine.batches == [6]
+    assert [len(r) for r in results] == [3, 1, 2]
+    assert all(r.elapsed_ms >= 0 for r in results)
+
+    single = _module()
+    assert [r.to_dicts() for r in results] == [
+        single.extract(page).to_dicts() for page in _pages()
+    ]
+
+
+def test_extract_many_roi_offsets_polys():
+    ocr = _module()
+    pages = _pages()
+    results = ocr.extract_many(pages, rois=[None, (5, 8, 300, 200), None])
+    assert results[1].boxes[0].tolist() == _box(15, 18, 295, 48).tolist()
+
+    with pytest.raises(ValueError):
+        ocr.extract_many(pages, rois=[None])
@@ -0,0 +1,114 @@
+"""KV-cache greedy decode + recognizer profiles (VietOCR, model nhỏ random)."""
+from types import SimpleNamespace
+
+import numpy as np
+import pytest
+
+torch = pytest.importorskip("torch")
+pytest.importorskip("vietocr")
+pytest.importorskip("torchvision")
+
+
+def _tiny_predictor(eos_bias):
+    from vietocr.model.transformerocr import VietOCR
+    from vietocr.model.vocab import Vocab
+
+    torch.manual_seed(0)
+    vocab = Vocab("aăâbcdđeêghiklmnoôơpqrstuưvxy0123456789 ")
+    ss = [[2, 2], [2, 2], [2, 1], [2, 1], [1, 1]]
+    model = VietOCR(
+        len(vocab),
+        "vgg11_bn",
+        {"pretrained": False, "ss": ss, "ks": ss, "hidden": 32},
+        {
+            "d_model": 32,
+            "nhead": 4,
+            "num_encoder_layers": 1,
+            "num_decoder_layers": 2,
+            "dim_feedforward": 64,
+            "max_seq_length": 256,
+            "pos_dropout": 0.1,
+            "trans_dropout": 0.1,
+        },
+        "transformer",
+    ).eval()
+    with torch.no_grad():
+        model.transformer.fc.bias[2] += eos_bias
+    config = {
+        "dataset": {"image_height": 32, "image_min_width": 32, "image_max_width": 512},
+        "predictor": {"beamsearch": False},
+    }
+    return SimpleNamespace(model=model, vocab=vocab, config=config, device="cpu")
+
+
+def _images():
+    from PIL import Image
+
+    rng = np.random.default_rng(0)
+    return [
+        Image.fromarray(rng.integers(0, 255, (32, w, 3), dtype=np.uint8))
+        for w in (200, 200, 200, 300, 120)
+    ]
+
+
+@pytest.mark.parametrize("eos_bias", [0.0, 1.0, 1.5, 4.0])
+def test_cached_decode_matches_vietocr_translate(eos_bias):
+    from vietocr.tool.predictor import Predictor
+
+    from core.phase_a.s3_ocr.fast_decode import CachedGreedyRecognizer
+
+    predictor = _tiny_predictor(eos_bias)
+    imgs = _images()
+    expected = Predictor.predict_batch(predictor, imgs)
+
+    fast = CachedGreedyRecognizer(predictor)
+    texts, probs = fast.predict_batch(imgs, return_prob=True)
+
+    assert texts == expected
+    assert all(0.0 <= p <= 1.0 for p in probs)
+    assert fast.predict(imgs[-1]) == expected[-1]
+
+
+def test_supports_only_greedy_transformer():
+    from core.phase_a.s3_ocr.fast_decode import CachedGreedyRecognizer
+
+    predictor = _tiny_predictor(0.0)
+    assert CachedGreedyRecognizer.supports(predictor)
+
+    predictor.config["predictor"]["beamsearch"] = True
+    assert not CachedGreedyRecognizer.supports(predictor)
+
+
+def test_int8_profile_keeps_cached_decode_working():
+    import copy
+
+    from core.phase_a.s3_ocr.fast_decode import CachedGreedyRecognizer
+    from core.phase_a.s3_ocr.rec_profiles import apply_profile, resolve_profile
+
+    predictor = _tiny_predictor(1.5)
+    quantized = apply_profile(copy.deepcopy(predictor), resolve_profile("int8"))
+
+    texts = CachedGreedyRecognizer(quantized).predict_batch(_images())
+    assert len(texts) == 5
+    assert "quantized" in type(quantized.model.transformer.fc).__module__
+
+
+def test_resolve_profile_rejects_unknown_name():
+    from core.phase_a.s3_ocr.rec_profiles import resolve_profile
+
+    assert resolve_profile("seq2seq")["model"] == "vgg_seq2seq"
+    with pytest.raises(ValueError):
+        resolve_profile("fp16")
+
+
+def test_explicit_model_conflicting_with_profile_raises():
+    from core.phase_a.s3_ocr.ocr_engine import HybridOcrModule
+
+    ocr = HybridOcrModule(device="cpu", rec_profile="seq2seq")
+    assert ocr._vietocr_model_name == "vgg_seq2seq"
+    ocr = HybridOcrModule(device="cpu", vietocr_model="vgg_seq2seq")
+    assert ocr._vietocr_model_name == "vgg_seq2seq"
+    with pytest.raises(ValueError, match="vgg_transformer"):
+        HybridOcrModule(
+            device="cpu", vietocr_model="vgg_transformer", rec_profile="seq2seq"
+        )
@@ -0,0 +1,71 @@
+"""Gazetteer catalog: Aho-Corasick bỏ dấu + bỏ qua PhoBERT cho dòng khớp chắc chắn."""
+import pytest
+
+from core.phase_a.s5_classify.gazetteer import Gazetteer, fold
+
+NAMES = [
+    "Paracetamol", "Amoxicillin", "Amoxicillin và acid clavulanic",
+    "Vitamin C", "Hạ sốt", "Sắt", "Omeprazol",
+]
+
+
+@pytest.fixture
+def gazetteer():
+    return Gazetteer(NAMES)
+
+
+def test_fold_keeps_length():
+    text = "Đường uống: Hạ Sốt"
+    assert fold(text) == "duong uong: ha sot"
+    assert len(fold(text)) == len(text)
+
+
+def test_find_word_bounded_leftmost_longest(gazetteer):
+    assert len(gazetteer) == 6  # "Sắt" quá ngắn
+    matches = gazetteer.find("2) Amoxicillin và acid clavulanic 500mg/125mg")
+    assert [(m.name, m.exact) for m in matches] == [("amoxicillin và acid clavulanic", True)]
+    assert gazetteer.find("Paracetamoltab 500mg") == []
+    assert gazetteer.find("Ha sot 5ml")[0].exact is False
+
+
+def test_tag_confident_line(gazetteer):
+    tag = gazetteer.tag("1) PARACETAMOL 500 mg uống sau ăn")
+    assert tag.confident
+    assert tag.drug_name == "PARACETAMOL 500 mg"
+    assert tag.instruction == "1) uống sau ăn"
+    assert tag.catalog_name == "paracetamol"
+    assert gazetteer.tag("Amoxicillin 250mg/5ml").drug_name == "Amoxicillin 250mg/5ml"
+
+
+@pytest.mark.parametrize("text", [
+    "Vitamin C 500mg + Omeprazol 20mg",  # > 1 tên
+    "Hạ sôt 10mg",                       # chỉ khớp sau khi bỏ dấu
+    "Chẩn đoán: Omeprazol",               # header
+])
+def test_tag_ambiguous_goes_to_ner(gazetteer, text):
+    tag = gazetteer.tag(text)
+    assert tag is not None and not tag.confident
+
+
+def test_classify_skips_ner_for_confident_lines(gazetteer):
+    pytest.importorskip("torch")
+    pytest.importorskip("transformers")
+    from tests.test_ner_batching import _make_extractor
+
+    ner = _make_extractor()
+    ner.gazetteer = gazetteer
+    blocks = [
+        {"text": "1 | Paracetamol 500mg | 20 | Viên", "bbox": [0, 0, 1, 1]},
+        {"text": "Omeprazol 20mg", "bbox": [0, 1, 1, 2]},
+        {"text": "Ngày uống 2 lần", "bbox": [0, 2, 1, 3]},
+        {"text": "Hạ sôt 10mg", "bbox": [0, 3, 1, 4]},
+    ]
+    results = ner.classify(blocks)
+    assert sum(rows for rows, _ in ner.model.batches) == 2  # chỉ 2 dòng cuối qua NER
+    assert results[0]["text"] == "Paracetamol 500mg"
+    assert results[0]["label"] == "drugname"
+    assert results[0]["extracted"]["quantity"] == "20"
+    assert results[1]["extracted"]["catalog_match"] == "omeprazol"
+    assert results[3]["extracted"]["catalog_match"] == "hạ sốt"
+    assert results[2]["extracted"]["catalog_match"] == ""
+    assert gazetteer.stats()["confident"] == 2
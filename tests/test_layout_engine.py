@@ -0,0 +1,76 @@
+"""Layout engine dạng mảng: group_by_stt phải khớp bản list-based gốc."""
+import random
+
+import pytest
+
+from core.phase_a.s3_ocr.base import TextBlock
+from core.phase_a.s3_ocr.ocr_engine import _group_by_stt_lists, group_by_stt
+
+DRUGS = ["Paracetamol 500mg", "Amoxicillin 250mg", "Omeprazol 20mg", "Loratadine 10mg"]
+
+
+def _box(x1, y1, x2, y2):
+    return [[x1, y1], [x2, y1], [x2, y2], [x1, y2]]
+
+
+def _prescription(seed, rows=12, drop_anchor_every=0, patient_width=520):
+    # patient_width ≥ 500 → không che gap giữa các cột (Dynamic bounds);
+    # hẹp hơn → lấp gap STT/tên thuốc (StaticFallback)
+    rng = random.Random(seed)
+    blocks = [
+        TextBlock("BỆNH VIỆN ĐA KHOA", 0.99, _box(100, 10, 700, 40)),
+        TextBlock("Họ tên: Nguyễn Văn A", 0.97, _box(40, 50, 40 + patient_width, 80)),
+    ]
+    y = 140
+    for row in range(rows):
+        jitter = rng.randint(-3, 3)
+        conf = round(rng.uniform(0.5, 1.0), 6)
+        if not drop_anchor_every or row % drop_anchor_every:
+            blocks.append(TextBlock(str(row + 1), conf, _box(20, y, 45 + jitter, y + 28)))
+        blocks.append(
+            TextBlock(rng.choice(DRUGS), conf, _box(100 + jitter, y, 480, y + 28 + jitter))
+        )
+        for k in range(rng.randint(0, 2)):
+            top = y + 32 * (k + 1)
+            blocks.append(TextBlock("Ngày uống 2 lần", conf, _box(100, top, 420, top + 26)))
+        blocks.append(TextBlock(str(rng.randint(1, 30)), conf, _box(600, y, 640, y + 28)))
+        blocks.append(TextBlock("Viên", conf, _box(700, y + jitter, 760, y + 28)))
+        y += rng.randint(70, 140)
+    rng.shuffle(blocks)
+    return blocks
+
+
+def _as_tuples(blocks):
+    return [(b.text, b.confidence, b.bbox) for b in blocks]
+
+
+@pytest.mark.parametrize("seed", range(25))
+@pytest.mark.parametrize("drop_anchor_every", [0, 3])
+@pytest.mark.parametrize("patient_width", [460, 520])
+def test_array_layout_matches_list_reference(seed, drop_anchor_every, patient_width):
+    blocks = _prescription(
+        seed,
+        rows=4 + seed,
+        drop_anchor_every=drop_anchor_every,
+        patient_width=patient_width,
+    )
+    assert _as_tuples(group_by_stt(blocks)) == _as_tuples(_group_by_stt_lists(blocks))
+
+
+def test_static_fallback_and_missing_anchor_match_reference():
+    few = [
+        TextBlock("1", 1.0, _box(0, 0, 10, 10)),
+        TextBlock("Paracetamol 500mg", 0.9, _box(20, 0, 300, 10)),
+    ]
+    assert _as_tuples(group_by_stt(few)) == _as_tuples(_group_by_stt_lists(few))
+
+    no_anchor = [b for b in _prescription(1) if not b.text.isdigit()]
+    assert group_by_stt(no_anchor) is no_anchor
+
+
+def test_non_quad_polygons_use_list_reference():
+    blocks = [
+        TextBlock("1", 1.0, [[0, 0], [10, 0], [10, 10]]),
+        TextBlock("Paracetamol", 1.0, _box(20, 0, 300, 10)),
+    ]
+    assert _as_tuples(group_by_stt(blocks)) == _as_tuples(_group_by_stt_lists(blocks))
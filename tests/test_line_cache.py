@@ -0,0 +1,172 @@
+"""Cache nhận dạng theo perceptual hash crop dòng + LruCache dùng chung."""
+import cv2
+import numpy as np
+import pytest
+from PIL import Image, ImageDraw, ImageFont
+
+from core.phase_a.s3_ocr.line_cache import LineRecognitionCache, line_hash
+from core.shared.lru import LruCache
+
+
+def _render(text, seed, shift=0, noise=8):
+    rng = np.random.default_rng(seed)
+    img = np.full((40, 420, 3), 235, np.uint8)
+    cv2.putText(img, text, (6 + shift, 28), cv2.FONT_HERSHEY_SIMPLEX, 0.8, (20, 20, 20), 2)
+    img = img.astype(np.int16) + rng.integers(-noise, noise + 1, img.shape)
+    return np.clip(img, 0, 255).astype(np.uint8)
+
+
+def _render_ttf(text, font):
+    img = Image.new("RGB", (420, 40), (235, 235, 235))
+    ImageDraw.Draw(img).text((6, 8), text, font=font, fill=(20, 20, 20))
+    return np.ascontiguousarray(np.asarray(img)[:, :, ::-1])
+
+
+# Ngưỡng near-match cũ — dùng cho cache bật tra gần đúng
+NEAR = 0.06
+
+
+def _font(size=18):
+    try:
+        return ImageFont.truetype("DejaVuSans.ttf", size)
+    except OSError:
+        pytest.skip("DejaVuSans not available")
+
+
+def _jaccard(a, b):
+    a, b = (np.unpackbits(np.frombuffer(k[1], np.uint8)) for k in (a, b))
+    return (a ^ b).sum() / max((a | b).sum(), 1)
+
+
+def test_lru_evicts_oldest_and_counts_hits():
+    evicted = []
+    lru = LruCache(2, on_evict=lambda k, v: evicted.append(k))
+    lru.put("a", 1)
+    lru.put("b", 2)
+    assert lru.get("a") == 1
+    lru.put("c", 3)
+
+    assert evicted == ["b"]
+    assert lru.get("b") is None
+    assert lru.stats() == {
+        "size": 2, "max_entries": 2, "hits": 1, "misses": 1, "hit_rate": 0.5,
+    }
+
+
+def test_opt_in_near_duplicate_line_hits_but_different_dose_misses():
+    cache = LineRecognitionCache(max_distance=NEAR)
+    cache.store(line_hash(_render("BENH VIEN DA KHOA", 0)), "BENH VIEN DA KHOA", 0.97)
+    cache.store(line_hash(_render("Paracetamol 500mg", 0)), "Paracetamol 500mg", 0.97)
+
+    same = cache.lookup(line_hash(_render("BENH VIEN DA KHOA", 1, shift=3, noise=12)))
+    assert same == ("BENH VIEN DA KHOA", 0.97)
+    assert cache.lookup(line_hash(_render("Paracetamol 250mg", 2))) is None
+    assert cache.stats()["hits"] == 1 and cache.stats()["near_hits"] == 1
+
+
+@pytest.mark.parametrize(
+    "cached, query",
+    [("Ngày uống 2 lần", "Ngày uống 3 lần"), ("Amlodipin 5mg", "Amlodipin 6mg")],
+)
+def test_one_digit_change_never_reuses_cached_text(cached, query):
+    font = _font()
+    cached_key = line_hash(_render_ttf(cached, font))
+    query_key = line_hash(_render_ttf(query, font))
+    # Tiền đề: 2 dòng đủ gần để lọt ngưỡng near-match nếu không chặn dòng có số
+    assert cached_key[0] == query_key[0]
+    assert _jaccard(cached_key, query_key) <= NEAR
+
+    for cache in (LineRecognitionCache(), LineRecognitionCache(max_distance=NEAR)):
+        cache.store(cached_key, cached, 0.97)
+        assert cache.lookup(query_key) is None
+        assert cache.lookup(cached_key) == (cached, 0.97)
+
+
+def test_one_letter_drug_name_change_misses_by_default():
+    font = _font(16)
+    cached_key = line_hash(_render_ttf("Methylprednisolon", font))
+    query_key = line_hash(_render_ttf("Methylprednisolan", font))
+    # Tiền đề: gần hơn cả nhiễu của cùng 1 dòng → không ngưỡng nào tách được
+    assert cached_key[0] == query_key[0]
+    assert 0 < _jaccard(cached_key, query_key) <= NEAR
+
+    cache = LineRecognitionCache()
+    cache.store(cached_key, "Methylprednisolon", 0.97)
+    assert cache.lookup(query_key) is None
+    assert cache.stats()["near_hits"] == 0
+
+
+def test_low_confidence_results_are_not_stored():
+    cache = LineRecognitionCache(min_confidence=0.9)
+    key = line_hash(_render("BHYT", 0))
+    cache.store(key, "BHYT", 0.5)
+    assert cache.lookup(key) is None
+
+
+def test_eviction_drops_near_match_index():
+    cache = LineRecognitionCache(max_entries=1, max_distance=NEAR)
+    first = line_hash(_render("Don thuoc", 0))
+    cache.store(first, "Don thuoc", 0.99)
+    cache.store(line_hash(_render("Ho ten:", 0)), "Ho ten:", 0.99)
+    assert cache.lookup(first) is None
+    assert sum(len(b) for b in cache._buckets.values()) == 1
+
+
+class _Rec:
+    def __init__(self):
+        self.seen = 0
+
+    def predict_batch(self, crops, return_prob=False):
+        self.seen += len(crops)
+        return ["BENH VIEN DA KHOA"] * len(crops), [0.98] * len(crops)
+
+
+def test_hybrid_module_skips_recognizer_for_repeated_lines():
+    pytest.importorskip("torch")
+    from core.phase_a.s3_ocr.ocr_engine import HybridOcrModule
+
+    ocr = HybridOcrModule(device="cpu", line_cache_size=64)
+    ocr._rec_engine = _Rec()
+    poly = [[0, 0], [420, 0], [420, 40], [0, 40]]
+
+    first = ocr._recognize_batch(_render("BENH VIEN DA KHOA", 0), [poly])
+    second = ocr._recognize_batch(_render("BENH VIEN DA KHOA", 0), [poly])
+
+    assert ocr._rec_engine.seen == 1
+    assert [b.text for b in second] == [b.text for b in first]
+    assert ocr.line_cache_stats()["hits"] == 1
+
+
+class _EchoRec:
+    """Trả text theo độ rộng mực của crop (phân biệt 2 dòng khác nhau)."""
+
+    def predict_batch(self, crops, return_prob=False):
+        texts = [f"line-{np.asarray(c).shape[1]}" for c in crops]
+        return texts, [0.99] * len(crops)
+
+
+def test_hash_failure_keeps_cache_keys_aligned_with_crops(monkeypatch):
+    pytest.importorskip("torch")
+    from core.phase_a.s3_ocr import line_cache
+    from core.phase_a.s3_ocr.ocr_engine import HybridOcrModule
+
+    ocr = HybridOcrModule(device="cpu", line_cache_size=64)
+    ocr._rec_engine = _EchoRec()
+    image = _render("Don thuoc", 0)
+    polys = [[[0, 0], [200, 0], [200, 40], [0, 40]], [[0, 0], [420, 0], [420, 40], [0, 40]]]
+
+    real_hash, calls = line_cache.line_hash, []
+
+    def flaky_hash(crop):
+        calls.append(crop)
+        if len(calls) == 1:
+            raise ValueError("boom")
+        return real_hash(crop)
+
+    monkeypatch.setattr(line_cache, "line_hash", flaky_hash)
+    first = [b.text for b in ocr._recognize_batch(image, polys)]
+    assert len(set(first)) == 2
+
+    second = ocr._recognize_batch(image, polys[1:])
+    assert [b.text for b in second] == first[1:]
+    assert ocr.line_cache_stats()["hits"] == 1
@@ -0,0 +1,108 @@
+"""Gộp mảnh cùng dòng, cùng cột trước VietOCR."""
+import numpy as np
+
+from core.phase_a.s3_ocr.base import TextBlock
+from core.phase_a.s3_ocr.line_merge import merge_fragments, merge_groups
+
+
+def _box(x1, y1, x2, y2):
+    return [[x1, y1], [x2, y1], [x2, y2], [x1, y2]]
+
+
+def _rows(n=6):
+    """Bảng 4 cột: STT | tên (tách 2 mảnh) | số lượng | đơn vị."""
+    polys = []
+    for r in range(n):
+        y = 100 + 60 * r
+        polys += [
+            _box(20, y, 45, y + 30),  # STT — khe 20px tới tên nhưng khác cột
+            _box(65, y, 250, y + 30),
+            _box(262, y + 2, 380, y + 29),  # "500mg" — mảnh của tên thuốc
+            _box(520, y, 570, y + 30),
+            _box(640, y, 700, y + 30),
+        ]
+    return polys
+
+
+def test_fragments_merged_within_column_only():
+    polys = _rows()
+    merged, groups = merge_fragments(polys)
+
+    assert len(merged) == len(polys) - 6
+    assert groups[:4] == [[0], [1, 2], [3], [4]]
+    xs = [x for x, _ in merged[1]]
+    ys = [y for _, y in merged[1]]
+    assert (min(xs), max(xs)) == (65, 380) and (min(ys), max(ys)) == (100, 130)
+    assert merged[0] is polys[0]  # nhóm 1 phần tử giữ nguyên polygon
+
+
+def test_stt_cell_kept_in_five_column_table():
+    """STT | tên | SL | đơn vị | cách dùng: khe STT→tên không nằm trong top 3 gap."""
+    polys = []
+    for r in range(4):
+        y = 100 + 60 * r
+        polys += [
+            _box(20, y, 45, y + 30),
+            _box(65, y, 250, y + 30),
+            _box(262, y + 2, 380, y + 29),
+            _box(520, y, 570, y + 30),
+            _box(640, y, 700, y + 30),
+            _box(760, y, 900, y + 30),
+        ]
+    _, groups = merge_fragments(polys)
+    assert groups[:5] == [[0], [1, 2], [3], [4], [5]]
+    assert len(groups) == len(polys) - 4
+
+
+def test_stt_cell_kept_without_column_bounds():
+    # Tên thuốc dài > 500px không tham gia dò gap → không có ranh giới cột
+    polys = [
+        _box(20, 0, 45, 30), _box(65, 0, 665, 30),
+        _box(20, 60, 45, 90), _box(65, 60, 665, 90),
+    ]
+    _, groups = merge_fragments(polys)
+    assert groups == [[0], [1], [2], [3]]
+
+
+def test_column_bound_blocks_merge():
+    a, b = _box(20, 0, 45, 30), _box(60, 0, 250, 30)
+    assert merge_groups([a, b]) == [[0, 1]]
+    assert merge_groups([a, b], col_bounds=[52]) == [[0], [1]]
+
+
+def test_rows_and_far_gaps_stay_separate():
+    polys = [
+        _box(0, 0, 100, 30),
+        _box(0, 40, 100, 70),  # dòng dưới
+        _box(200, 0, 300, 30),  # khe 100px > 0.8 × 30
+        _box(105, 5, 140, 20),  # chiều cao quá khác (chỉ số mũ / dấu)
+    ]
+    assert merge_groups(polys) == [[0], [1], [2], [3]]
+
+
+def test_hybrid_module_recognizes_merged_polys(monkeypatch):
+    import pytest
+
+    pytest.importorskip("torch")
+    from core.phase_a.s3_ocr.ocr_engine import HybridOcrModule
+
+    polys = _rows(3)
+    ocr = HybridOcrModule(device="cpu", merge_fragments=True)
+    seen = []
+
+    def fake_recognize(images, polys_list):
+        seen.extend(polys_list)
+        return [
+            [(i, TextBlock(text="x", confidence=1.0, bbox=p)) for i, p in enumerate(ps)]
+            for ps in polys_list
+        ]
+
+    monkeypatch.setattr(
+        ocr, "_detect_polys_many", lambda images: [list(polys) for _ in images]
+    )
+    monkeypatch.setattr(ocr, "_recognize_indexed_many", fake_recognize)
+    monkeypatch.setattr(ocr, "_ensure_recognizer", lambda: None)
+
+    (result,) = ocr.extract_many([np.zeros((400, 800, 3), np.uint8)])
+    assert len(result.text_blocks) == len(polys) - 3
+    assert [len(ps) for ps in seen] == [len(polys) - 3]
@@ -0,0 +1,141 @@
+"""Line pruning trước VietOCR: chỉ nhận dạng dòng thuộc bảng thuốc."""
+import numpy as np
+
+from core.phase_a.s3_ocr.base import OcrResult, TextBlock
+
+
+def _box(x1, y1, x2, y2):
+    return [[x1, y1], [x2, y1], [x2, y2], [x1, y2]]
+
+
+# (poly, text) — header, 2 dòng thuốc, lời dặn, chữ ký, 1 đốm nhiễu
+LINES = [
+    (_box(100, 10, 600, 40), "BỆNH VIỆN ĐA KHOA TỈNH"),
+    (_box(100, 60, 500, 90), "Họ tên: Nguyễn Văn A"),
+    (_box(20, 200, 45, 230), "1"),
+    (_box(100, 200, 500, 230), "Paracetamol 500mg"),
+    (_box(100, 235, 450, 262), "Ngày uống 2 lần"),
+    (_box(600, 200, 650, 230), "10"),
+    (_box(700, 200, 760, 230), "Viên"),
+    (_box(20, 300, 45, 330), "2"),
+    (_box(100, 300, 500, 330), "Amoxicillin 500mg"),
+    (_box(600, 300, 650, 330), "20"),
+    (_box(700, 300, 760, 330), "Viên"),
+    (_box(500, 520, 700, 550), "Bác sĩ điều trị"),
+    (_box(300, 150, 304, 153), "."),
+]
+POLYS = [poly for poly, _ in LINES]
+TEXTS = {id(poly): text for poly, text in LINES}
+
+
+def _module(monkeypatch, texts=TEXTS):
+    from core.phase_a.s3_ocr.ocr_engine import HybridOcrModule
+
+    ocr = HybridOcrModule(device="cpu", prune_lines=True)
+    seen = []
+
+    def _fake_recognize(_image, polys):
+        seen.extend(texts[id(p)] for p in polys)
+        return [
+            (i, TextBlock(text=texts[id(p)], confidence=1.0, bbox=p))
+            for i, p in enumerate(polys)
+        ]
+
+    monkeypatch.setattr(
+        ocr,
+        "_recognize_indexed_many",
+        lambda images, polys_list: [
+            _fake_recognize(image, polys) for image, polys in zip(images, polys_list)
+        ],
+    )
+    monkeypatch.setattr(ocr, "_ensure_recognizer", lambda: None)
+    return ocr, seen
+
+
+def test_plan_pruning_separates_specks_and_stt_candidates():
+    from core.phase_a.s3_ocr.line_pruning import plan_pruning
+
+    plan = plan_pruning(POLYS)
+    assert plan.specks == [12]
+    assert [LINES[i][1] for i in plan.candidates] == ["1", "2"]
+
+
+def test_only_table_lines_are_recognized(monkeypatch):
+    ocr, seen = _module(monkeypatch)
+    blocks, pruned = ocr._recognize_table_lines(np.zeros((600, 800, 3), np.uint8), POLYS)
+
+    texts = [b.text for b in blocks]
+    assert texts == [text for _, text in LINES[2:11]]
+    assert sorted(seen) == sorted(texts)
+    assert pruned == [POLYS[0], POLYS[1], POLYS[11], POLYS[12]]
+
+
+def test_no_anchor_means_no_pruning(monkeypatch):
+    ocr, _ = _module(monkeypatch)
+    polys = [p for p, text in LINES if text not in ("1", "2")]
+    blocks, pruned = ocr._recognize_table_lines(np.zeros((600, 800, 3), np.uint8), polys)
+
+    assert pruned == [POLYS[12]]
+    assert len(blocks) == len(polys) - 1
+
+
+def test_recognize_pruned_merges_by_y(monkeypatch):
+    ocr, _ = _module(monkeypatch)
+    img = np.zeros((600, 800, 3), np.uint8)
+    blocks, pruned = ocr._recognize_table_lines(img, POLYS)
+
+    full = ocr.recognize_pruned(img, OcrResult(text_blocks=blocks, pruned_polys=pruned))
+    assert full.pruned_polys == []
+    assert full.text_blocks[0].text == "BỆNH VIỆN ĐA KHOA TỈNH"
+    assert full.text_blocks[-1].text == "Bác sĩ điều trị"
+    assert len(full.text_blocks) == len(LINES)
+
+
+def _real_table():
+    """Đơn thật: nhiều dòng header rộng, ô STT 1 chữ số nhỏ hơn nhiều ô tên."""
+    lines = [(_box(150, 20 + 40 * k, 850, 52 + 40 * k), f"Header {k}") for k in range(8)]
+    for r in range(3):
+        y = 400 + 90 * r
+        lines += [
+            (_box(30, y, 44, y + 24), str(r + 1)),
+            (_box(90, y, 650, y + 30), f"Thuốc {r}"),
+            (_box(90, y + 36, 470, y + 60), "Ngày uống 2 lần"),
+            (_box(700, y, 730, y + 28), "30"),
+            (_box(790, y, 840, y + 28), "Viên"),
+        ]
+    return lines
+
+
+def test_small_stt_and_quantity_cells_are_not_specks(monkeypatch):
+    from core.phase_a.s3_ocr.line_pruning import plan_pruning
+
+    lines = _real_table()
+    polys = [poly for poly, _ in lines]
+    plan = plan_pruning(polys)
+    assert [lines[i][1] for i in plan.candidates] == ["1", "2", "3"]
+    assert plan.specks == []
+
+    ocr, _ = _module(monkeypatch, {id(p): text for p, text in lines})
+    blocks, pruned = ocr._recognize_table_lines(np.zeros((700, 900, 3), np.uint8), polys)
+    assert [b.text for b in blocks] == [text for _, text in lines[8:]]
+    assert pruned == polys[:8]
+
+
+def test_run_ocr_recognizes_pruned_lines_without_anchor():
+    from core.pipeline import MedicinePipeline
+
+    kept = [TextBlock("Paracetamol 500mg", 0.9, _box(100, 200, 500, 230))]
+    header = _box(100, 10, 600, 40)
+
+    class _Ocr:
+        def extract(self, _img):
+            return OcrResult(text_blocks=kept, pruned_polys=[header])
+
+        def recognize_pruned(self, _img, result):
+            extra = [TextBlock("BỆNH VIỆN ĐA KHOA", 0.95, header)]
+            return OcrResult(text_blocks=extra + result.text_blocks)
+
+    pipe = MedicinePipeline()
+    pipe._ocr = _Ocr()
+    blocks = pipe._run_ocr(np.zeros((600, 800, 3), np.uint8))
+    assert [b["text"] for b in blocks] == ["BỆNH VIỆN ĐA KHOA", "Paracetamol 500mg"]
@@ -0,0 +1,96 @@
+"""Backend NER int8 / ONNX: cùng nhãn với fp32 trên PhoBERT thu nhỏ."""
+import pytest
+
+torch = pytest.importorskip("torch")
+pytest.importorskip("transformers")
+
+from core.phase_a.s5_classify import ner_backends  # noqa: E402
+from tests.test_ner_batching import BLOCKS, _make_extractor  # noqa: E402
+
+WORDS = [b["text"].split() for b in BLOCKS]
+
+
+def test_resolve_backend_rejects_unknown():
+    assert ner_backends.resolve_backend("onnx") == "onnx"
+    with pytest.raises(ValueError):
+        ner_backends.resolve_backend("fp16")
+
+
+def test_predict_word_labels_one_label_per_word():
+    ner = _make_extractor()
+    labels = ner.predict_word_labels(WORDS)
+    assert [len(x) for x in labels] == [len(w) for w in WORDS]
+    # Phần bị cắt do MAX_SEQ_LEN → "O"
+    assert labels[-1][-1] == "O"
+
+
+def test_int8_backend_runs():
+    ner = _make_extractor()
+    ner.model = ner_backends.apply_backend(ner.model.model, "int8")
+    labels = ner.predict_word_labels(WORDS)
+    assert [len(x) for x in labels] == [len(w) for w in WORDS]
+    assert ner.classify(BLOCKS)[2]["label"] == "other"
+
+
+def test_onnx_backend_matches_fp32(tmp_path):
+    pytest.importorskip("onnxruntime")
+    pytest.importorskip("onnx")
+    ner = _make_extractor()
+    fp32 = ner.model.model
+    expected = ner.predict_word_labels(WORDS)
+
+    ner.model = ner_backends.apply_backend(fp32, "onnx", str(tmp_path), "abc")
+    onnx_path = ner_backends.onnx_cache_path(str(tmp_path), "abc")
+    assert ner.model.onnx_path == onnx_path
+    assert not fp32.training  # export không được bật lại dropout
+    assert ner.predict_word_labels(WORDS) == expected
+
+    ids = torch.tensor([[0, 5, 17, 2, 1, 1]])
+    mask = torch.tensor([[1, 1, 1, 1, 0, 0]])
+    with torch.no_grad():
+        ref = fp32(input_ids=ids, attention_mask=mask).logits
+    out = ner.model(input_ids=ids, attention_mask=mask).logits
+    assert torch.allclose(out[mask.bool()], ref[mask.bool()], atol=1e-4)
+
+    # Lần sau dùng lại file đã export
+    mtime = (tmp_path / "onnx" / "ner_abc.onnx").stat().st_mtime_ns
+    ner_backends.apply_backend(fp32, "onnx", str(tmp_path), "abc")
+    assert (tmp_path / "onnx" / "ner_abc.onnx").stat().st_mtime_ns == mtime
+
+
+def _read_only_checkpoint(tmp_path):
+    """Checkpoint mà `<model_path>/onnx/` không tạo được (như mount chỉ đọc)."""
+    model_path = tmp_path / "model"
+    model_path.mkdir()
+    (model_path / "onnx").write_text("")
+    return str(model_path)
+
+
+def test_onnx_exports_to_cache_dir_when_checkpoint_read_only(tmp_path):
+    pytest.importorskip("onnxruntime")
+    pytest.importorskip("onnx")
+    ner = _make_extractor()
+    expected = ner.predict_word_labels(WORDS)
+    model_path = _read_only_checkpoint(tmp_path)
+    cache_dir = tmp_path / "cache"
+
+    ner.model = ner_backends.apply_backend(
+        ner.model.model, "onnx", model_path, "abc", cache_dir=str(cache_dir)
+    )
+    assert ner.model.onnx_path == str(cache_dir / "ner_abc.onnx")
+    assert ner.predict_word_labels(WORDS) == expected
+
+
+def test_onnx_falls_back_to_fp32_when_nothing_writable(tmp_path, caplog):
+    pytest.importorskip("onnxruntime")
+    pytest.importorskip("onnx")
+    fp32 = _make_extractor().model.model
+    model_path = _read_only_checkpoint(tmp_path)
+    (tmp_path / "cache").write_text("")
+
+    with caplog.at_level("WARNING"):
+        model = ner_backends.apply_backend(
+            fp32, "onnx", model_path, "abc", cache_dir=str(tmp_path / "cache")
+        )
+    assert model is fp32
+    assert "fp32" in caplog.text
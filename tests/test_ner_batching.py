@@ -0,0 +1,130 @@
+"""NerExtractor.classify: PhoBERT chạy theo batch đã pad, kết quả như từng block."""
+import pytest
+
+torch = pytest.importorskip("torch")
+transformers = pytest.importorskip("transformers")
+
+from core.phase_a.s5_classify import ner_extractor  # noqa: E402
+from core.phase_a.s5_classify.ner_extractor import NerExtractor  # noqa: E402
+from core.phase_a.s5_classify.segmenter import Segmenter  # noqa: E402
+from core.phase_a.s5_classify.subword_cache import SubwordCache, shared_cache  # noqa: E402
+
+BLOCKS = [
+    {"text": "1 | Paracetamol 500mg uống sau ăn | 20 | Viên", "bbox": [0, 0, 1, 1]},
+    {"text": "Ngày uống 2 lần", "bbox": [0, 1, 1, 2]},
+    {"text": "", "bbox": [0, 2, 1, 3]},
+    {"text": "2) Amoxicillin 250mg", "box": [0, 3, 1, 4]},
+    {"text": "3 | Omeprazol 20mg | 7", "bbox": [0, 4, 1, 5]},
+    {"text": " ".join(["Vitamin C 500mg"] * 120), "bbox": [0, 5, 1, 6]},  # > MAX_SEQ_LEN
+]
+
+
+class _Tokenizer:
+    cls_token_id, pad_token_id, sep_token_id, unk_token_id = 0, 1, 2, 3
+
+    def encode(self, word, add_special_tokens=False):
+        # 1-3 subword / từ, id ổn định
+        return [4 + (ord(c) * 7 + i) % 90 for i, c in enumerate(word[::4])]
+
+
+class _Forward:
+    """Bọc model để đếm số lần forward và batch size."""
+
+    def __init__(self, model):
+        self.model = model
+        self.config = model.config
+        self.batches = []
+
+    def __call__(self, input_ids, attention_mask):
+        self.batches.append(tuple(input_ids.shape))
+        return self.model(input_ids=input_ids, attention_mask=attention_mask)
+
+
+def _make_extractor():
+    """NerExtractor với PhoBERT thu nhỏ (RoBERTa ngẫu nhiên) + tokenizer giả."""
+    torch.manual_seed(0)
+    config = transformers.RobertaConfig(
+        vocab_size=100, hidden_size=32, num_hidden_layers=2, num_attention_heads=2,
+        intermediate_size=64, max_position_embeddings=ner_extractor.MAX_SEQ_LEN + 2,
+        pad_token_id=1, num_labels=3,
+        id2label={0: "O", 1: "B-DRUG", 2: "I-DRUG"},
+    )
+    model = transformers.RobertaForTokenClassification(config).eval()
+    ner = object.__new__(NerExtractor)
+    ner.tokenizer = _Tokenizer()
+    ner.model = _Forward(model)
+    ner.id2label = config.id2label
+    ner.batch_size = 4
+    ner.subword_cache = None
+    ner.segmenter = Segmenter(cache_size=0, use_underthesea=False)
+    ner.memo = None
+    ner.gazetteer = None
+    ner.triage = None
+    return ner
+
+
+@pytest.fixture
+def extractor():
+    return _make_extractor()
+
+
+def test_batched_classify_matches_per_block(extractor):
+    batched = extractor.classify(BLOCKS)
+    forward_calls = extractor.model.batches
+    assert len(forward_calls) == 2  # 5 block có text, batch 4
+    assert max(length for _, length in forward_calls) <= ner_extractor.MAX_SEQ_LEN
+
+    extractor.batch_size = 1
+    extractor.model.batches = []
+    single = [extractor.classify([block])[0] for block in BLOCKS]
+    assert len(extractor.model.batches) == 5
+    assert batched == single
+    assert any(r["label"] == "drugname" for r in batched)  # model ngẫu nhiên vẫn có nhãn DRUG
+
+
+def test_classify_keeps_structure_fields(extractor):
+    results = extractor.classify(BLOCKS)
+    assert [r["extracted"]["stt"] for r in results] == ["1", "", "", "2)", "3", ""]
+    assert results[0]["extracted"]["quantity"] == "20"
+    assert results[0]["extracted"]["unit"] == "Viên"
+    assert results[2]["label"] == "other" and results[2]["confidence"] == 0.0
+    assert results[3]["bbox"] == [0, 3, 1, 4]
+
+
+class _FastTokenizer(_Tokenizer):
+    is_fast = True
+    name_or_path = "fake-fast"
+
+    def __init__(self):
+        self.calls = []
+
+    def __call__(self, words, add_special_tokens=False):
+        self.calls.append(list(words))
+        return {"input_ids": [self.encode(w) if w != "∅" else [] for w in words]}
+
+
+def test_subword_cache_matches_per_word_encode(extractor):
+    expected = extractor.classify(BLOCKS)
+    tokenizer = _FastTokenizer()
+    extractor.subword_cache = SubwordCache(tokenizer, max_entries=1000)
+
+    assert extractor.classify(BLOCKS) == expected
+    # 1 lời gọi batch cho mọi từ chưa có, không trùng lặp
+    (first,) = tokenizer.calls
+    assert len(first) == len(set(first))
+
+    assert extractor.classify(BLOCKS) == expected
+    assert len(tokenizer.calls) == 1  # lần 2: toàn bộ hit
+    assert extractor.subword_cache.stats()["hits"] >= len(first)
+
+
+def test_subword_cache_unknown_and_shared():
+    tokenizer = _FastTokenizer()
+    cache = SubwordCache(tokenizer, max_entries=2)
+    ab = tokenizer.encode("ab")
+    assert cache.encode_words(["∅", "ab", "ab"]) == [[tokenizer.unk_token_id], ab, ab]
+    assert tokenizer.calls == [["∅", "ab"]]
+    cache.encode_words(["cd"])  # max_entries=2 → "∅" bị đẩy ra
+    cache.encode_words(["ab", "∅"])
+    assert tokenizer.calls[-1] == ["∅"]
+    assert shared_cache(tokenizer, 10) is shared_cache(_FastTokenizer(), 10)
@@ -0,0 +1,71 @@
+"""Distill NER: student ít layer khởi tạo từ teacher, học theo soft label."""
+import pytest
+
+torch = pytest.importorskip("torch")
+transformers = pytest.importorskip("transformers")
+
+from core.phase_a.s5_classify.distill import (  # noqa: E402
+    distill,
+    distill_loss,
+    encode_samples,
+    make_student,
+    student_layer_map,
+)
+from core.phase_a.s5_classify.ner_eval import drug_f1, drug_spans  # noqa: E402
+from tests.test_ner_batching import _make_extractor  # noqa: E402
+
+SAMPLES = [
+    {"tokens": ["1)", "Paracetamol", "500", "mg", "Uống", "sáng"],
+     "ner_tags": ["O", "B-DRUG", "I-DRUG", "I-DRUG", "O", "O"]},
+    {"tokens": ["Ngày", "uống", "2", "lần"], "ner_tags": ["O", "O", "O", "O"]},
+    {"tokens": ["2)", "Amoxicillin", "250mg"], "ner_tags": ["O", "B-DRUG", "I-DRUG"]},
+]
+LABEL2ID = {"O": 0, "B-DRUG": 1, "I-DRUG": 2}
+
+
+def test_student_layer_map():
+    assert student_layer_map(12, 4) == [0, 4, 7, 11]
+    assert student_layer_map(12, 1) == [11]
+    assert student_layer_map(2, 4) == [0, 1]
+
+
+def test_make_student_copies_teacher_weights():
+    teacher = _make_extractor().model.model
+    student = make_student(teacher, 1)
+    assert student.config.num_hidden_layers == 1
+    assert teacher.config.num_hidden_layers == 2
+    t_state, s_state = teacher.state_dict(), student.state_dict()
+    assert torch.equal(s_state["classifier.weight"], t_state["classifier.weight"])
+    assert torch.equal(
+        s_state["roberta.encoder.layer.0.output.dense.weight"],
+        t_state["roberta.encoder.layer.1.output.dense.weight"],
+    )
+
+
+def test_distill_reduces_loss_and_keeps_classify_contract():
+    ner = _make_extractor()
+    teacher = ner.model.model
+    encoded = encode_samples(ner, SAMPLES, LABEL2ID)
+    assert [label for label in encoded[2][1] if label != -100] == [0, 1, 2]
+
+    student = make_student(teacher, 1)
+    history = distill(teacher, student, encoded, pad_id=1, epochs=15, batch_size=2, lr=1e-3)
+    assert history[-1] < history[0]
+    assert not student.training
+
+    ner.model = student
+    results = ner.classify([{"text": "Paracetamol 500 mg", "bbox": [0, 0, 1, 1]}])
+    assert set(results[0]) >= {"text", "label", "confidence", "extracted"}
+
+
+def test_distill_loss_zero_when_student_matches_gold_and_teacher():
+    logits = torch.tensor([[[9.0, -9.0, -9.0], [-9.0, 9.0, -9.0]]])
+    labels = torch.tensor([[0, 1]])
+    assert distill_loss(logits, logits, labels).item() < 1e-3
+
+
+def test_drug_f1():
+    assert drug_spans(["O", "B-DRUG", "I-DRUG", "O", "I-DRUG"]) == {(1, 3), (4, 5)}
+    gold = [["B-DRUG", "I-DRUG", "O"]]
+    assert drug_f1(gold, gold) == 1.0
+    assert drug_f1([["B-DRUG", "O", "O"]], gold) == 0.0
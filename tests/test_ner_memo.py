@@ -0,0 +1,56 @@
+"""NER memo theo dòng: hit bỏ qua PhoBERT, bỏ memo khi đổi checkpoint."""
+import json
+import os
+
+import pytest
+
+from core.phase_a.s5_classify.ner_memo import NerMemo, checkpoint_fingerprint
+
+
+def test_fingerprint_tracks_checkpoint_files(tmp_path):
+    (tmp_path / "config.json").write_text("{}")
+    first = checkpoint_fingerprint(str(tmp_path), "seg=underthesea")
+    assert first == checkpoint_fingerprint(str(tmp_path), "seg=underthesea")
+    assert first != checkpoint_fingerprint(str(tmp_path), "seg=dictionary")
+
+    weights = tmp_path / "model.safetensors"
+    weights.write_bytes(b"w" * 10)
+    os.utime(weights, (1, 1))
+    second = checkpoint_fingerprint(str(tmp_path))
+    weights.write_bytes(b"w" * 11)
+    assert checkpoint_fingerprint(str(tmp_path)) != second
+
+
+def test_memo_persists_per_fingerprint(tmp_path):
+    path = tmp_path / "ner_memo.json"
+    memo = NerMemo("fp1", max_entries=2, persist_path=str(path))
+    memo.put("Paracetamol 500mg", ("Paracetamol", "500mg", 0.99))
+    memo.put("Ngày uống 2 lần", ("", "Ngày uống 2 lần", 0.0))
+    memo.put("Amoxicillin", ("Amoxicillin", "", 0.97))  # đẩy dòng cũ nhất ra
+    memo.save()
+    assert json.loads(path.read_text(encoding="utf-8"))["fingerprint"] == "fp1"
+
+    again = NerMemo("fp1", max_entries=2, persist_path=str(path))
+    assert again.get("Amoxicillin") == ("Amoxicillin", "", 0.97)
+    assert again.get("Paracetamol 500mg") is None
+    assert again.stats()["hits"] == 1 and again.stats()["hit_rate"] == 0.5
+
+    changed = NerMemo("fp2", max_entries=2, persist_path=str(path))
+    assert changed.get("Amoxicillin") is None
+
+
+def test_extractor_skips_forward_for_memoized_lines():
+    pytest.importorskip("transformers")
+    from tests.test_ner_batching import BLOCKS, _make_extractor
+
+    ner = _make_extractor()
+    baseline = ner.classify(BLOCKS)
+    ner.memo = NerMemo("fp", max_entries=100)
+    ner.model.batches = []
+
+    assert ner.classify(BLOCKS) == baseline
+    cold = len(ner.model.batches)
+    assert ner.classify(BLOCKS + BLOCKS) == baseline + baseline
+    assert len(ner.model.batches) == cold  # lần 2: toàn bộ từ memo
+    # Lần 2: mỗi dòng (kể cả dòng rỗng) tra 1 lần dù lặp trong batch
+    assert ner.memo.stats()["hits"] == len(BLOCKS)
@@ -0,0 +1,79 @@
+"""Cache detect/recognize trên đĩa (key theo nội dung ảnh + model)."""
+import os
+
+import numpy as np
+import pytest
+
+from core.phase_a.s3_ocr.ocr_cache import OcrDiskCache, image_digest
+
+POLY = [[10, 10], [290, 10], [290, 40], [10, 40]]
+
+
+def test_put_get_round_trip(tmp_path):
+    cache = OcrDiskCache(str(tmp_path))
+    key = cache.make_key("rec", "vgg_transformer", "abc")
+
+    assert cache.get(key) is None
+    cache.put(key, [[0, "Paracetamol 500mg", 0.93]])
+    assert cache.get(key) == [[0, "Paracetamol 500mg", 0.93]]
+    assert cache.make_key("rec", "vgg_seq2seq", "abc") != key
+
+
+def test_eviction_keeps_size_under_bound(tmp_path):
+    cache = OcrDiskCache(str(tmp_path), max_mb=0.01)
+    for i in range(40):
+        cache.put(cache.make_key(i), ["x" * 1000])
+
+    total = sum(size for _, size, _ in cache._entries())
+    assert total <= cache.max_bytes
+    assert cache.get(cache.make_key(39)) is not None
+    assert cache.get(cache.make_key(0)) is None
+
+
+def test_image_digest_depends_on_content():
+    image = np.zeros((20, 30, 3), np.uint8)
+    other = image.copy()
+    other[0, 0, 0] = 1
+    assert image_digest(image) == image_digest(image.copy())
+    assert image_digest(image) != image_digest(other)
+    assert image_digest(image[:, :15]) == image_digest(np.zeros((20, 15, 3), np.uint8))
+
+
+class _Det:
+    def __init__(self):
+        self.calls = 0
+
+    def predict(self, _image):
+        self.calls += 1
+        return [{"dt_polys": [np.array(POLY)]}]
+
+
+class _Rec:
+    def __init__(self):
+        self.calls = 0
+
+    def predict_batch(self, crops, return_prob=False):
+        self.calls += 1
+        return ["Omeprazol 20mg"] * len(crops), [0.8] * len(crops)
+
+
+def test_hybrid_module_skips_models_on_cache_hit(tmp_path):
+    pytest.importorskip("torch")
+    from core.phase_a.s3_ocr.ocr_engine import HybridOcrModule
+
+    ocr = HybridOcrModule(device="cpu", cache_dir=str(tmp_path))
+    ocr._det_engine, ocr._rec_engine = _Det(), _Rec()
+    image = np.full((80, 300, 3), 255, np.uint8)
+
+    first = ocr.extract(image)
+    second = ocr.extract(image)
+
+    assert ocr._det_engine.calls == 1 and ocr._rec_engine.calls == 1
+    assert second.to_dicts() == first.to_dicts()
+    assert second.text_blocks[0].text == "Omeprazol 20mg"
+
+    # Cache hit không cần load model
+    cold = HybridOcrModule(device="cpu", cache_dir=str(tmp_path))
+    assert cold.extract(image).to_dicts() == first.to_dicts()
+    assert cold._det_engine is None and cold._rec_engine is None
+    assert os.listdir(tmp_path)
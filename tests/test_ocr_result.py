@@ -0,0 +1,87 @@
+"""OcrResult dạng cột + TextBlock __slots__."""
+import numpy as np
+import pytest
+
+from core.phase_a.s3_ocr.base import OcrResult, TextBlock
+
+
+def _box(x1, y1, x2, y2):
+    return [[x1, y1], [x2, y1], [x2, y2], [x1, y2]]
+
+
+BLOCKS = [
+    TextBlock("1", 0.98, _box(20, 200, 45, 230)),
+    TextBlock("Paracetamol 500mg", 0.91237, _box(100, 200, 500, 230)),
+    TextBlock("10", 0.9, _box(600, 200, 650, 230)),
+    TextBlock("Viên", 0.87, _box(700, 200, 760, 230)),
+]
+
+
+def test_text_block_is_slotted_and_comparable():
+    block = TextBlock("Viên", 0.9, _box(0, 0, 1, 1))
+    assert not hasattr(block, "__dict__")
+    assert block == TextBlock("Viên", 0.9, _box(0, 0, 1, 1))
+    assert "Viên" in repr(block)
+
+
+def test_columns_from_text_blocks():
+    result = OcrResult(text_blocks=BLOCKS, module_name="hybrid")
+
+    assert len(result) == 4
+    assert result.boxes.shape == (4, 4, 2) and result.boxes.dtype == np.int32
+    assert result.texts[1] == "Paracetamol 500mg"
+    assert result.raw_text == "1\nParacetamol 500mg\n10\nViên"
+    assert result.text_blocks is result.text_blocks
+    assert result.text_blocks[0] is BLOCKS[0]
+    assert result.to_dicts()[1] == {
+        "text": "Paracetamol 500mg",
+        "confidence": 0.9124,
+        "bbox": _box(100, 200, 500, 230),
+    }
+
+
+def test_text_blocks_are_built_lazily_from_columns():
+    result = OcrResult(
+        boxes=np.array([_box(0, 0, 10, 5)]),
+        texts=["Omeprazol"],
+        confidences=[0.5],
+    )
+    assert result.text_blocks == [TextBlock("Omeprazol", 0.5, _box(0, 0, 10, 5))]
+    assert result.rects().tolist() == [[0, 0, 10, 5]]
+
+    with pytest.raises(ValueError):
+        OcrResult(texts=["a", "b"], confidences=[1.0])
+
+
+def test_non_quad_polygon_becomes_bounding_rect():
+    result = OcrResult(text_blocks=[TextBlock("x", 1.0, [[0, 0], [8, 2], [4, 9]])])
+    assert result.boxes[0].tolist() == _box(0, 0, 8, 9)
+
+
+def test_group_by_stt_uses_columns():
+    from core.phase_a.s3_ocr.ocr_engine import group_by_stt
+
+    columnar = OcrResult(
+        boxes=np.array([b.bbox for b in BLOCKS]),
+        texts=[b.text for b in BLOCKS],
+        confidences=[b.confidence for b in BLOCKS],
+    )
+    assert group_by_stt(columnar) == group_by_stt(list(BLOCKS))
+
+
+def test_run_ocr_columnar_offsets_rects():
+    from core.pipeline import MedicinePipeline
+
+    class _Ocr:
+        def extract(self, _img):
+            return OcrResult(text_blocks=BLOCKS)
+
+    pipe = MedicinePipeline()
+    pipe._ocr = _Ocr()
+    blocks = pipe._run_ocr(np.zeros((10, 10, 3), np.uint8), bbox_offset=(100, 200))
+
+    assert blocks[1] == {
+        "text": "Paracetamol 500mg",
+        "bbox": [200, 400, 600, 430],
+        "confidence": 0.9124,
+    }
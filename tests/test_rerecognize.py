@@ -0,0 +1,73 @@
+"""Confidence thật + nhận dạng lại chọn lọc (beam search) cho tên thuốc."""
+import numpy as np
+import pytest
+
+from core.phase_a.s3_ocr.base import TextBlock
+
+
+def _block(text, conf):
+    return TextBlock(text=text, confidence=conf, bbox=[[0, 0], [1, 0], [1, 1], [0, 1]])
+
+
+def test_select_lines_only_low_confidence_drug_titles_within_budget():
+    from core.phase_a.s3_ocr.rerecognize import select_lines
+
+    blocks = [
+        _block("Paracetamol 500mg", 0.6),
+        _block("Ngày uống 2 lần", 0.3),
+        _block("10", 0.2),
+        _block("Amoxicillin 250mg", 0.5),
+        _block("Omeprazol 20mg", 0.95),
+    ] + [_block("Viên", 0.4)] * 5
+
+    assert select_lines(blocks, threshold=0.8, max_fraction=0.2) == [3, 0]
+    assert select_lines(blocks, threshold=0.8, max_fraction=0.1) == [3]
+
+
+def _tiny(eos_bias=1.5):
+    pytest.importorskip("torch")
+    pytest.importorskip("vietocr")
+    pytest.importorskip("torchvision")
+    from tests.test_fast_decode import _images, _tiny_predictor
+
+    from core.phase_a.s3_ocr.fast_decode import CachedGreedyRecognizer
+
+    return CachedGreedyRecognizer(_tiny_predictor(eos_bias)), _images()
+
+
+def test_teacher_forced_score_matches_greedy_confidence():
+    from core.phase_a.s3_ocr.rerecognize import SelectiveReRecognizer
+
+    engine, imgs = _tiny()
+    refiner = SelectiveReRecognizer(engine)
+    for img in imgs[:3]:
+        tensor = refiner._tensor(img)
+        ids, probs = engine.translate(tensor)
+        assert refiner.score(tensor, ids[0]) == pytest.approx(probs[0], abs=1e-5)
+
+
+def test_refine_never_lowers_confidence():
+    from core.phase_a.s3_ocr.rerecognize import SelectiveReRecognizer
+
+    engine, imgs = _tiny()
+    refiner = SelectiveReRecognizer(engine)
+    for img in imgs[:3]:
+        text, conf = engine.predict(img, return_prob=True)
+        new_text, new_conf = refiner.refine([img, imgs[-1]], text, conf)
+        assert new_conf >= conf
+        assert new_text == text or new_conf > conf
+
+
+def test_recognize_batch_reports_sequence_probability():
+    from core.phase_a.s3_ocr.ocr_engine import HybridOcrModule
+
+    engine, _ = _tiny(eos_bias=1.0)
+    ocr = HybridOcrModule(device="cpu")
+    ocr._rec_engine = engine
+    rng = np.random.default_rng(1)
+    image = rng.integers(0, 255, (80, 300, 3), dtype=np.uint8)
+    polys = [[[10, 10], [290, 10], [290, 40], [10, 40]]]
+
+    blocks = ocr._recognize_batch(image, polys)
+    assert len(blocks) == 1
+    assert 0.0 < blocks[0].confidence < 1.0
@@ -0,0 +1,80 @@
+"""Tách từ tiếng Việt: cache theo dòng, từ điển longest-match có kiểm định."""
+import json
+
+from core.phase_a.s5_classify import segmenter as seg
+from core.phase_a.s5_classify.segmenter import (
+    LongestMatch,
+    Segmenter,
+    consistent_phrases,
+    load_dictionary,
+    mine_phrases,
+    pre_tokenize,
+    token_agreement,
+)
+
+# Mẫu đã tách như prepare_ner_data (underthesea)
+SAMPLES = [
+    ["1)", "Hoạt_huyết_dưỡng", "não", "SL", ":", "30", "Viên"],
+    ["Bác_sĩ", "điều_trị", "Ghi_chú", "Uống", "0,5", "viên"],
+    ["Bác_sĩ", "điều_trị", "Ghi", "chú", "Huyết_áp", ":"],
+    ["Ghi", "chú", "Bác_sĩ", "điều_trị", "BS."],
+]
+
+
+def test_pre_tokenize_keeps_stt_numbers_and_abbreviations():
+    assert pre_tokenize("1) Huyết áp: 120/80, BS. A (J02)") == [
+        "1)", "Huyết", "áp", ":", "120/80", ",", "BS.", "A", "(", "J02", ")",
+    ]
+
+
+def test_longest_match_prefers_longest_phrase():
+    matcher = LongestMatch(["hoạt huyết", "hoạt_huyết_dưỡng", "bác sĩ"])
+    assert matcher.segment("HOẠT HUYẾT DƯỠNG NÃO, Bác sĩ") == "HOẠT_HUYẾT_DƯỠNG NÃO , Bác_sĩ"
+
+
+def test_phrases_kept_only_when_underthesea_merges_them():
+    mined = mine_phrases(SAMPLES, min_count=2)
+    assert mined == ["bác sĩ", "điều trị"]
+    # "ghi chú": gộp 1 / tách 2 → bỏ; cụm drug DB chưa gặp → giữ
+    kept = consistent_phrases(SAMPLES, mined + ["ghi chú", "đinh lăng"])
+    assert kept == ["bác sĩ", "đinh lăng", "điều trị"]
+
+
+def test_token_agreement():
+    ref = ["Bác_sĩ", "điều_trị", ":"]
+    assert token_agreement(ref, ref) == 1.0
+    assert token_agreement(["Bác", "sĩ", "điều_trị", ":"], ref) == 2 * 2 / 7
+
+
+def test_segmenter_caches_normalized_lines():
+    calls = []
+
+    class _Dict(LongestMatch):
+        def segment(self, text):
+            calls.append(text)
+            return super().segment(text)
+
+    segmenter = Segmenter(cache_size=10, dictionary=_Dict(["bác sĩ"]))
+    out = segmenter.segment_many(["Bác sĩ  khám", "Bác sĩ khám", "", "Bác sĩ khám"])
+    assert out == ["Bác_sĩ khám", "Bác_sĩ khám", "", "Bác_sĩ khám"]
+    assert calls == ["Bác sĩ khám"]
+    segmenter.segment("Bác sĩ khám")
+    assert calls == ["Bác sĩ khám"] and segmenter.stats()["hits"] == 1
+    assert segmenter.stats()["backend"] == "dictionary"
+
+    plain = Segmenter(cache_size=0, use_underthesea=False)
+    assert plain.backend == "whitespace" and plain.segment(" Bác sĩ ") == "Bác sĩ"
+
+
+def test_dictionary_loaded_only_above_agreement(tmp_path, monkeypatch):
+    path = tmp_path / "segmenter_dict.json"
+    path.write_text(json.dumps({"phrases": ["bác sĩ"], "agreement": 0.95}), encoding="utf-8")
+    assert load_dictionary(path, min_agreement=0.98) is None
+    assert len(load_dictionary(path, min_agreement=0.9)) == 1
+    assert load_dictionary(tmp_path / "missing.json", 0.9) is None
+
+    monkeypatch.setattr(seg, "_shared", None)
+    monkeypatch.setattr("core.config.SEGMENT_DICT_PATH", str(path))
+    monkeypatch.setattr("core.config.SEGMENT_DICT_MIN_AGREEMENT", 0.9)
+    assert seg.shared_segmenter().backend == "dictionary"
+    assert seg.shared_segmenter() is seg.shared_segmenter()
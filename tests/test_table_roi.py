@@ -0,0 +1,76 @@
+"""Table ROI stage: OCR chỉ trong bảng thuốc, bbox map về ảnh gốc."""
+import numpy as np
+
+
+class _FakeTableDetector:
+    def __init__(self, roi):
+        self._roi = roi
+
+    def locate(self, _img):
+        return self._roi
+
+
+class _FakeResult:
+    def __init__(self, text_blocks):
+        self.text_blocks = text_blocks
+
+
+class _RecordingOcr:
+    def __init__(self, roi_blocks, full_blocks):
+        self.calls = []
+        self._roi_blocks = roi_blocks
+        self._full_blocks = full_blocks
+
+    def extract(self, _img, roi=None):
+        self.calls.append(roi)
+        return _FakeResult(self._roi_blocks if roi is not None else self._full_blocks)
+
+
+def test_expand_roi_pads_clips_and_rejects_tiny_boxes():
+    from core.phase_a.s1_detect.table_detector import expand_roi
+
+    assert expand_roi((10, 30, 390, 280), (300, 400, 3), padding=20) == (0, 10, 400, 300)
+    assert expand_roi((10, 10, 20, 20), (300, 400, 3), padding=0) is None
+
+
+def test_detect_polys_roi_maps_back_to_full_image(monkeypatch):
+    from core.phase_a.s3_ocr.ocr_engine import HybridOcrModule
+
+    ocr = HybridOcrModule(device="cpu")
+    seen = {}
+
+    def _fake_detect(image):
+        seen["shape"] = image.shape
+        return [[[1, 2], [11, 2], [11, 12], [1, 12]]]
+
+    monkeypatch.setattr(ocr, "_detect_polys", _fake_detect)
+    img = np.zeros((300, 400, 3), dtype=np.uint8)
+
+    polys = ocr._detect_polys_roi(img, (100, 50, 300, 250))
+
+    assert seen["shape"] == (200, 200, 3)
+    assert polys == [[[101, 52], [111, 52], [111, 62], [101, 62]]]
+
+
+def test_pipeline_ocr_uses_table_roi_and_falls_back_when_empty():
+    from core.pipeline import MedicinePipeline
+
+    img = np.zeros((300, 400, 3), dtype=np.uint8)
+
+    pipe = MedicinePipeline()
+    pipe._table_detector = _FakeTableDetector((0, 10, 400, 300))
+    pipe._ocr = _RecordingOcr(roi_blocks=["drug"], full_blocks=["header", "drug"])
+    assert pipe._ocr_extract(img).text_blocks == ["drug"]
+    assert pipe._ocr.calls == [(0, 10, 400, 300)]
+
+    pipe._ocr = _RecordingOcr(roi_blocks=[], full_blocks=["header", "drug"])
+    assert pipe._ocr_extract(img).text_blocks == ["header", "drug"]
+    assert pipe._ocr.calls == [(0, 10, 400, 300), None]
+
+
+def test_pipeline_without_table_weights_uses_full_image(tmp_path):
+    from core.pipeline import MedicinePipeline
+
+    pipe = MedicinePipeline(table_weights=str(tmp_path / "missing.pt"))
+    assert pipe._locate_table_roi(np.zeros((10, 10, 3), dtype=np.uint8)) is None
+    assert pipe.get_model_info()["table_roi_loaded"] is False
@@ -0,0 +1,51 @@
+"""Thread budget chung cho torch / Paddle / OpenCV."""
+import os
+
+import pytest
+
+from core.shared import thread_budget
+
+
+@pytest.fixture
+def fresh_budget(monkeypatch):
+    torch = pytest.importorskip("torch")
+    cv2 = pytest.importorskip("cv2")
+    saved = (torch.get_num_threads(), cv2.getNumThreads())
+    for name in thread_budget.THREAD_ENV_VARS + ("MEDICINEAPP_THREADS", "MEDICINEAPP_WORKERS"):
+        monkeypatch.delenv(name, raising=False)
+    monkeypatch.setattr(thread_budget, "_budget", None)
+    yield
+    for name in thread_budget.THREAD_ENV_VARS:
+        os.environ.pop(name, None)
+    torch.set_num_threads(saved[0])
+    cv2.setNumThreads(saved[1])
+
+
+def test_resolve_budget_precedence(fresh_budget, monkeypatch):
+    monkeypatch.setattr(os, "cpu_count", lambda: 8)
+    assert thread_budget.resolve_budget() == (8, 1)
+    assert thread_budget.resolve_budget(workers=4) == (2, 4)
+
+    monkeypatch.setenv("MEDICINEAPP_WORKERS", "2")
+    assert thread_budget.resolve_budget() == (4, 2)
+    monkeypatch.setenv("MEDICINEAPP_THREADS", "3")
+    assert thread_budget.resolve_budget() == (3, 2)
+    assert thread_budget.resolve_budget(threads=1) == (1, 2)
+
+
+def test_configure_threads_applies_once(fresh_budget):
+    import cv2
+    import torch
+
+    assert thread_budget.paddle_cpu_threads() is None
+    info = thread_budget.configure_threads(2, workers=3)
+
+    assert torch.get_num_threads() == 2
+    assert cv2.getNumThreads() == 2
+    assert thread_budget.paddle_cpu_threads() == 2
+    assert info["threads_per_worker"] == 2 and info["workers"] == 3
+    assert info["env"]["OMP_NUM_THREADS"] == "2"
+
+    # Lần gọi sau không đổi budget (trừ khi force)
+    assert thread_budget.configure_threads(1)["threads_per_worker"] == 2
+    assert thread_budget.configure_threads(1, force=True)["torch_threads"] == 1
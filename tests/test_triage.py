@@ -0,0 +1,50 @@
+"""Triage trước NER: dòng chắc chắn không phải tên thuốc không chạy PhoBERT."""
+import pytest
+
+from core.phase_a.s5_classify.triage import LineTriage
+
+
+@pytest.mark.parametrize("text,reason", [
+    ("20", "no_alpha"),
+    ("13/05/2021 23:31:47", "no_alpha"),
+    ("Viên", "unit"),
+    ("500 mg", "dosage"),
+    ("Ngày uống 2 lần, mỗi lần 1 viên", "instruction"),
+    ("2) Sáng 1 viên", "instruction"),
+    ("SL: 30 Viên", "instruction"),
+    ("ĐƠN THUỐC BHYT", "header"),
+    ("Chẩn đoán: viêm họng cấp", "header"),
+])
+def test_non_drug_lines_skipped(text, reason):
+    assert LineTriage().reason(text) == reason
+
+
+@pytest.mark.parametrize("text,is_row", [
+    ("Paracetamol 500mg uống sau ăn", False),
+    ("500mg Amoxicillin", False),
+    ("Vitamin C", False),
+    ("Thuốc điều trị Omeprazol 20mg", True),  # ô nội dung dòng thuốc: không xét header
+])
+def test_drug_lines_kept(text, is_row):
+    assert LineTriage().reason(text, is_row=is_row) is None
+
+
+def test_classify_skips_model_for_triaged_lines():
+    pytest.importorskip("torch")
+    pytest.importorskip("transformers")
+    from tests.test_ner_batching import _make_extractor
+
+    ner = _make_extractor()
+    ner.triage = LineTriage()
+    blocks = [
+        {"text": "ĐƠN THUỐC BHYT", "bbox": [0, 0, 1, 1]},
+        {"text": "1 | Paracetamol 500mg | 20 | Viên", "bbox": [0, 1, 1, 2]},
+        {"text": "Ngày uống 2 lần", "bbox": [0, 2, 1, 3]},
+        {"text": "Omeprazol 20mg", "bbox": [0, 3, 1, 4]},
+    ]
+    results = ner.classify(blocks)
+    assert sum(rows for rows, _ in ner.model.batches) == 2
+    assert [r["extracted"]["triage"] for r in results] == ["header", "", "instruction", ""]
+    assert results[0]["label"] == results[2]["label"] == "other"
+    assert results[2]["extracted"]["instruction"] == "Ngày uống 2 lần"
+    assert ner.triage.stats()["skipped"] == 2